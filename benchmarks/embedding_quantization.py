@@ -0,0 +1,154 @@
+"""
+Embedding Quantization Benchmark
+
+Measures how much memory the float16 / int8 embedding storage modes save and
+how closely their retrieval rankings agree with full precision.
+
+For every agent in a population, each stored memory embedding (up to
+--queries per agent) is used as a focal-point embedding. All of the agent's
+memories are ranked by cosine similarity with full precision vectors and with
+the quantized vectors, and the two rankings are compared:
+
+- top-k overlap: |top_k(full) ∩ top_k(quantized)| / k
+- Spearman rank correlation over all memories
+
+No API calls are made; only the embeddings already stored on disk are used.
+
+Usage:
+    python -m benchmarks.embedding_quantization
+    python -m benchmarks.embedding_quantization --population Synthetic --top-k 10 --queries 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from simulation_engine.settings import POPULATIONS_DIR
+from generative_agent.modules.cognitive.memory_stream import load_embeddings, convert_embeddings
+
+
+def python_list_nbytes(embeddings):
+    """Approximate size of a dict of lists of Python floats (vectors only)."""
+    total = 0
+    for vector in embeddings.values():
+        total += sys.getsizeof(vector) + sum(sys.getsizeof(v) for v in vector)
+    return total
+
+
+def rank_positions(scores):
+    """Rank of every entry (0 = most similar)."""
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(len(order))
+    return ranks
+
+
+def spearman(scores_a, scores_b):
+    ranks_a = rank_positions(scores_a).astype(np.float64)
+    ranks_b = rank_positions(scores_b).astype(np.float64)
+    if ranks_a.std() == 0 or ranks_b.std() == 0:
+        return 1.0
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+
+def cosine_scores(matrix, query):
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    norms[norms == 0] = 1.0
+    return matrix @ query / norms
+
+
+def benchmark_agent(embeddings, mode, top_k, max_queries, rng):
+    contents = list(embeddings.keys())
+    full = np.array([embeddings[c] for c in contents], dtype=np.float64)
+
+    start = time.time()
+    quantized = convert_embeddings(embeddings, mode)
+    encode_time = time.time() - start
+    approx = np.array([quantized[c] for c in contents], dtype=np.float64)
+
+    query_rows = np.arange(len(contents))
+    if len(query_rows) > max_queries:
+        query_rows = rng.choice(query_rows, max_queries, replace=False)
+
+    k = min(top_k, len(contents))
+    overlaps, correlations = [], []
+    for row in query_rows:
+        # The query is always the full precision focal-point embedding, as it
+        # would be when it comes fresh from the embedding API.
+        query = full[row]
+        full_scores = cosine_scores(full, query)
+        approx_scores = cosine_scores(approx, query)
+        top_full = set(np.argsort(-full_scores, kind="stable")[:k])
+        top_approx = set(np.argsort(-approx_scores, kind="stable")[:k])
+        overlaps.append(len(top_full & top_approx) / k)
+        correlations.append(spearman(full_scores, approx_scores))
+
+    return {
+        "nodes": len(contents),
+        "full_bytes": python_list_nbytes(embeddings),
+        "quantized_bytes": quantized.nbytes(),
+        "encode_seconds": encode_time,
+        "top_k_overlap": float(np.mean(overlaps)) if overlaps else 1.0,
+        "spearman": float(np.mean(correlations)) if correlations else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark quantized embedding storage against full precision')
+    parser.add_argument('--population', default='Synthetic', help='Population to benchmark (default: Synthetic)')
+    parser.add_argument('--modes', nargs='+', default=['float16', 'int8'], help='Quantized modes to compare (default: float16 int8)')
+    parser.add_argument('--top-k', type=int, default=10, help='k for the top-k overlap (default: 10, the retrieve() default n_count)')
+    parser.add_argument('--queries', type=int, default=50, help='Maximum focal points per agent (default: 50)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for query sampling (default: 0)')
+    args = parser.parse_args()
+
+    population_path = f"{POPULATIONS_DIR}/{args.population}"
+    agent_ids = sorted(d for d in os.listdir(population_path)
+                       if os.path.isdir(os.path.join(population_path, d)) and not d.startswith('.'))
+
+    for mode in args.modes:
+        rng = np.random.default_rng(args.seed)
+        totals = {"nodes": 0, "full_bytes": 0, "quantized_bytes": 0, "encode_seconds": 0.0}
+        overlaps, correlations = [], []
+
+        print(f"=== {mode} vs float64 (top-{args.top_k}) ===")
+        for agent_id in agent_ids:
+            memory_stream_folder = f"{population_path}/{agent_id}/memory_stream"
+            if not os.path.isdir(memory_stream_folder):
+                continue
+            embeddings = load_embeddings(memory_stream_folder, "float64")
+            if not embeddings:
+                continue
+
+            result = benchmark_agent(embeddings, mode, args.top_k, args.queries, rng)
+            for key in totals:
+                totals[key] += result[key]
+            overlaps.append(result["top_k_overlap"])
+            correlations.append(result["spearman"])
+            print(f"  {agent_id:<20} nodes={result['nodes']:<5} "
+                  f"top-k overlap={result['top_k_overlap']:.4f} "
+                  f"spearman={result['spearman']:.4f} "
+                  f"memory={result['full_bytes'] / 1e6:.2f}MB -> {result['quantized_bytes'] / 1e6:.3f}MB")
+
+        if not overlaps:
+            print("  No embeddings found.")
+            continue
+
+        ratio = totals["full_bytes"] / max(totals["quantized_bytes"], 1)
+        print(f"  {'TOTAL':<20} nodes={totals['nodes']:<5} "
+              f"top-k overlap={np.mean(overlaps):.4f} "
+              f"spearman={np.mean(correlations):.4f} "
+              f"memory={totals['full_bytes'] / 1e6:.2f}MB -> {totals['quantized_bytes'] / 1e6:.3f}MB "
+              f"({ratio:.0f}x smaller, encoded in {totals['encode_seconds']:.3f}s)")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Markov Scoring Cassette Check
+
+Validates the batched partner scoring of
+GenerativeAgent.get_markov_buying_interest_scores against the per-pair
+scoring on a fixed cassette: a JSON file mapping the SHA-256 of each prompt
+to the LLM response it got, and of each retrieval focal point to its
+embedding. Recording the cassette calls the API once per prompt and focal
+point (OPENAI_API_KEY required); replaying it is deterministic and offline.
+
+For every agent the check compares the raw 0-100 scores (mean absolute
+difference, Spearman rank correlation) and the softmax probabilities (largest
+absolute difference), and counts the LLM calls of each mode.
+
+Usage:
+    python -m benchmarks.markov_scoring_cassette --record
+    python -m benchmarks.markov_scoring_cassette
+    python -m benchmarks.markov_scoring_cassette --agents mei_chen pema_sherpa carlos_mendez
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import simulation_engine.gpt_structure as gpt_structure
+import generative_agent.modules.cognitive.memory_stream as memory_stream_module
+from simulation_engine.markov_agent_chain import load_agents_for_chain
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes", "markov_scoring.json")
+
+
+class Cassette:
+    """
+    gpt_request and get_text_embedding replacements that replay (and
+    optionally record) API results by the hash of their input.
+    """
+
+    def __init__(self, path, record):
+        self.path = path
+        self.record = record
+        self.responses = {}
+        self.embeddings = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.responses = data.get("responses", {})
+            self.embeddings = data.get("embeddings", {})
+        self.calls = 0
+        self._request = gpt_structure.gpt_request
+        self._embedding = memory_stream_module.get_text_embedding
+
+    def _replay(self, store, text, call):
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if key not in store:
+            if not self.record:
+                raise KeyError(f"Input {key[:12]} is not on the cassette; run with --record")
+            store[key] = call()
+        return store[key]
+
+    def request(self, prompt, *args, **kwargs):
+        self.calls += 1
+        return self._replay(self.responses, prompt, lambda: self._request(prompt, *args, **kwargs))
+
+    def embedding(self, text, *args, **kwargs):
+        return self._replay(self.embeddings, text, lambda: self._embedding(text, *args, **kwargs))
+
+    def install(self):
+        gpt_structure.gpt_request = self.request
+        memory_stream_module.get_text_embedding = self.embedding
+
+    def uninstall(self):
+        gpt_structure.gpt_request = self._request
+        memory_stream_module.get_text_embedding = self._embedding
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({"responses": self.responses, "embeddings": self.embeddings}, f, sort_keys=True)
+
+
+def spearman(a, b):
+    """Spearman rank correlation of two equally long score lists (ties get average ranks)."""
+    def ranks(values):
+        values = np.asarray(values, dtype=float)
+        order = values.argsort(kind="stable")
+        result = np.empty(len(values))
+        result[order] = np.arange(len(values))
+        for value in np.unique(values):
+            tied = values == value
+            result[tied] = result[tied].mean()
+        return result
+    ra, rb = ranks(a), ranks(b)
+    if ra.std() == 0 or rb.std() == 0:
+        return 1.0 if np.array_equal(ra, rb) else 0.0
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare batched and per-pair Markov partner scoring on a cassette')
+    parser.add_argument('--population', default='Synthetic', help='Population to load the agents from (default: Synthetic)')
+    parser.add_argument('--agents', nargs='+', default=None, help='Agent ids (default: every agent in the population)')
+    parser.add_argument('--cassette', default=DEFAULT_CASSETTE, help='Cassette file')
+    parser.add_argument('--record', action='store_true', help='Call the LLM for prompts missing from the cassette and save it')
+    parser.add_argument('--token-budget', type=int, default=None, help='Token budget of the batched prompts')
+    parser.add_argument('--max-mean-abs-diff', type=float, default=15.0, help='Largest accepted mean |batched - per-pair| raw score')
+    parser.add_argument('--min-spearman', type=float, default=0.5, help='Smallest accepted mean rank correlation')
+    args = parser.parse_args()
+
+    from simulation_engine.settings import POPULATIONS_DIR
+    agent_ids = args.agents or sorted(name for name in os.listdir(f"{POPULATIONS_DIR}/{args.population}")
+                                      if os.path.isdir(f"{POPULATIONS_DIR}/{args.population}/{name}"))
+    agents = load_agents_for_chain(args.population, agent_ids)
+    names = [agent.scratch.get_fullname() for agent in agents]
+
+    cassette = Cassette(args.cassette, args.record)
+    cassette.install()
+    budget = {} if args.token_budget is None else {"token_budget": args.token_budget}
+    rows = []
+    calls = {"per-pair": 0, "batched": 0}
+    try:
+        for agent, name in zip(agents, names):
+            others = [other for other in names if other != name]
+            start = cassette.calls
+            pair_raw = agent.get_markov_buying_interest_raw_scores(others, batched=False)
+            calls["per-pair"] += cassette.calls - start
+            start = cassette.calls
+            batch_raw = agent.get_markov_buying_interest_raw_scores(others, batched=True, **budget)
+            calls["batched"] += cassette.calls - start
+            # Same prompts as above, so these replay from the cassette.
+            pair_probs = agent.get_markov_buying_interest_scores(others, temperature=12.0, batched=False)
+            batch_probs = agent.get_markov_buying_interest_scores(others, temperature=12.0, batched=True, **budget)
+
+            pair = [pair_raw[other] for other in others]
+            batch = [batch_raw[other] for other in others]
+            rows.append({
+                "agent": name,
+                "mean_abs_diff": float(np.mean(np.abs(np.subtract(pair, batch)))),
+                "spearman": spearman(pair, batch),
+                "max_prob_diff": max(abs(pair_probs[other] - batch_probs[other]) for other in others)
+            })
+    finally:
+        cassette.uninstall()
+        if args.record:
+            cassette.save()
+
+    print(f"=== Batched vs per-pair partner scoring ({len(agents)} agents) ===")
+    print(f"  LLM calls: per-pair {calls['per-pair']}, batched {calls['batched']}")
+    for row in rows:
+        print(f"  {row['agent']:<20} mean |diff| {row['mean_abs_diff']:6.2f}  "
+              f"spearman {row['spearman']:5.2f}  max prob diff {row['max_prob_diff']:.3f}")
+    mean_abs_diff = float(np.mean([row["mean_abs_diff"] for row in rows]))
+    mean_spearman = float(np.mean([row["spearman"] for row in rows]))
+    print(f"  overall: mean |diff| {mean_abs_diff:.2f}, mean spearman {mean_spearman:.2f}")
+
+    if mean_abs_diff > args.max_mean_abs_diff or mean_spearman < args.min_spearman:
+        print("FAILED: batched scores diverge from the per-pair scores")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Trade Throughput Benchmark
+
+Measures trades per second through ConversationTradeAnalyzer.execute_trade
+with the LLM replaced by a canned trade-analysis response, comparing:
+
+- legacy: execute_seller_trade + execute_buyer_trade, each followed by a full
+  agent save()
+- atomic: execute_trade_atomic (validate, apply with rollback, one combined
+  inventory/scratch write)
+
+The two agents are copied into a scratch population first, so the benchmark
+never writes to the source population; the copy is removed afterwards.
+
+Usage:
+    python -m benchmarks.trade_throughput
+    python -m benchmarks.trade_throughput --population Synthetic --seller mei_chen --buyer pema_sherpa --trades 200
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from simulation_engine.settings import POPULATIONS_DIR
+from generative_agent.generative_agent import GenerativeAgent
+import generative_agent.modules.conversation_trade_analyzer as trade_module
+from generative_agent.modules.conversation_trade_analyzer import ConversationTradeAnalyzer
+
+BENCH_POPULATION = "_trade_benchmark"
+
+
+def mock_chat_safe_generate(response):
+    """A chat_safe_generate replacement that always returns the given trade JSON."""
+    def generate(*args, **kwargs):
+        return response, None, None, None
+    return generate
+
+
+def legacy_execute(analyzer, agents, trade_data, testing_mode):
+    seller_success = analyzer.execute_seller_trade(agents, trade_data, testing_mode)
+    buyer_success = analyzer.execute_buyer_trade(agents, trade_data, testing_mode)
+    return seller_success, buyer_success
+
+
+def run(analyzer, agents, trades, testing_mode, executor=None):
+    """Run execute_trade `trades` times and return (trades per second, executed count)."""
+    original = analyzer.execute_trade_atomic
+    if executor is not None:
+        analyzer.execute_trade_atomic = lambda a, t, m=False: executor(analyzer, a, t, m)
+    executed = 0
+    start = time.time()
+    try:
+        for step in range(trades):
+            result = analyzer.execute_trade(agents, f"bench_{step}", "[A]: deal\n", "benchmark",
+                                            time_step=step, testing_mode=testing_mode)
+            executed += bool(result and result.get("executed"))
+    finally:
+        analyzer.execute_trade_atomic = original
+    elapsed = time.time() - start
+    return trades / elapsed if elapsed > 0 else float("inf"), executed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark trade execution throughput with a mocked LLM')
+    parser.add_argument('--population', default='Synthetic', help='Population to copy the agents from (default: Synthetic)')
+    parser.add_argument('--seller', default='mei_chen', help='Seller agent id (default: mei_chen)')
+    parser.add_argument('--buyer', default='pema_sherpa', help='Buyer agent id (default: pema_sherpa)')
+    parser.add_argument('--trades', type=int, default=100, help='Trades per run (default: 100)')
+    args = parser.parse_args()
+
+    bench_folder = f"{POPULATIONS_DIR}/{BENCH_POPULATION}"
+    original_generate = trade_module.chat_safe_generate
+    try:
+        for agent_id in (args.seller, args.buyer):
+            shutil.copytree(f"{POPULATIONS_DIR}/{args.population}/{agent_id}", f"{bench_folder}/{agent_id}",
+                            dirs_exist_ok=True)
+
+        seller = GenerativeAgent(BENCH_POPULATION, args.seller)
+        buyer = GenerativeAgent(BENCH_POPULATION, args.buyer)
+        # The population is read from the copied meta.json; point saves at the copy.
+        for agent in (seller, buyer):
+            agent.population = agent.forked_population = BENCH_POPULATION
+        item_name = next(name for name in seller.inventory.items if name != "digital cash")
+        # Enough stock and cash that no run ever fails validation.
+        seller.inventory.add_item(item_name, args.trades * 4, 0)
+        buyer.inventory.add_item("digital cash", args.trades * 40.0, 0, 1.0)
+
+        response = json.dumps({
+            "participants": {"seller": seller.scratch.get_fullname(), "buyer": buyer.scratch.get_fullname()},
+            "items": [{"name": item_name, "quantity": 1, "value": 10.0}]
+        })
+        trade_module.chat_safe_generate = mock_chat_safe_generate(response)
+
+        analyzer = ConversationTradeAnalyzer()
+        agents = [seller, buyer]
+        # execute_trade prints every trade; keep the report readable.
+        stdout = sys.stdout
+        results = {}
+        try:
+            sys.stdout = open(os.devnull, "w")
+            for label, executor, testing_mode in [
+                ("legacy, in memory", legacy_execute, True),
+                ("atomic, in memory", None, True),
+                ("legacy, persisted", legacy_execute, False),
+                ("atomic, persisted", None, False),
+            ]:
+                results[label] = run(analyzer, agents, args.trades, testing_mode, executor)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        print(f"=== {args.trades} trades of 1 {item_name}: {args.seller} -> {args.buyer} ===")
+        for label, (rate, executed) in results.items():
+            print(f"  {label:<20} {rate:10.1f} trades/s  ({executed} executed)")
+    finally:
+        trade_module.chat_safe_generate = original_generate
+        shutil.rmtree(bench_folder, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Warm Start Benchmark
+
+Compares loading a whole population from the agent store with loading it
+from a population snapshot (see generative_agent.population_snapshot). Every
+agent is loaded in full (memory stream nodes and embeddings materialized),
+so the timings cover everything a simulation reads before its first step.
+
+The snapshot is exported to a temporary file first (the export time is
+reported too); nothing is written to the agent store.
+
+Usage:
+    python -m benchmarks.warm_start
+    python -m benchmarks.warm_start --population Synthetic --embedding-mode int8 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from simulation_engine.settings import EMBEDDING_STORAGE_MODE
+from generative_agent.agent_store import get_agent_store
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.population_snapshot import export_population, SnapshotAgentStore, VECTOR_DTYPES
+
+
+def load_population(store, population, embedding_mode):
+    agents = []
+    for agent_id in store.list_agents(population):
+        agents.append(GenerativeAgent(population, agent_id, embedding_mode=embedding_mode, store=store))
+    return agents
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = function()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Population warm start benchmark')
+    parser.add_argument('--population', default='Synthetic')
+    parser.add_argument('--embedding-mode', default=EMBEDDING_STORAGE_MODE, choices=list(VECTOR_DTYPES))
+    parser.add_argument('--repeat', type=int, default=3, help='Best of this many loads')
+    args = parser.parse_args()
+
+    store = get_agent_store()
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, f"{args.population}.agsnap")
+        export_time, count = timed(lambda: export_population(args.population, path, store=store,
+                                                             embedding_mode=args.embedding_mode), 1)
+        store_time, _ = timed(lambda: load_population(store, args.population, args.embedding_mode), args.repeat)
+        snapshot_time, _ = timed(lambda: load_population(SnapshotAgentStore(path), args.population,
+                                                         args.embedding_mode), args.repeat)
+
+        print()
+        print(f"Population: {args.population} ({count} agents), embedding mode {args.embedding_mode}")
+        print(f"Snapshot: {os.path.getsize(path) / 1e6:.1f} MB, exported in {export_time:.2f}s")
+        print(f"{'source':<14}{'load (s)':>10}")
+        print(f"{'agent store':<14}{store_time:>10.3f}")
+        print(f"{'snapshot':<14}{snapshot_time:>10.3f}")
+        if snapshot_time > 0:
+            print(f"Speedup: {store_time / snapshot_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
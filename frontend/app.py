@@ -6,6 +6,7 @@ Provides REST API and serves frontend for real-time simulation visualization.
 
 from flask import Flask, jsonify, request, render_template, send_from_directory
 from flask_cors import CORS
+import argparse
 import threading
 import time
 import sys
@@ -17,11 +18,23 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
 
 from simulation_engine.markov_agent_chain import MarkovAgentChain, load_agents_for_chain
+from simulation_engine.transition_matrix import as_transition_matrix
 from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.agent_store import get_agent_store
+from generative_agent.population_snapshot import SnapshotAgentStore
 
 app = Flask(__name__)
 CORS(app)
 
+# Agents are read from the agent store, or from a population snapshot when the
+# app is started with --snapshot
+agent_store = get_agent_store()
+
+def population_name() -> str:
+    """The population served: the snapshot's, or Synthetic."""
+    return getattr(agent_store, 'population', 'Synthetic')
+
+
 # Global simulation state
 simulation_thread: Optional[threading.Thread] = None
 markov_chain: Optional[MarkovAgentChain] = None
@@ -40,7 +53,7 @@ def run_simulation_background(agent_names, num_steps, context, self_reflection_p
         print(f"Starting simulation with {len(agent_names)} agents for {num_steps} steps")
 
         # Load agents
-        agents = load_agents_for_chain("Synthetic", agent_names)
+        agents = load_agents_for_chain(population_name(), agent_names, store=agent_store)
 
         if len(agents) < 2:
             print("Error: Need at least 2 agents")
@@ -83,87 +96,93 @@ def index():
 @app.route('/api/agents', methods=['GET'])
 def get_agents():
     """Get list of available agents with their details."""
-    population = request.args.get('population', 'Synthetic')
+    population = request.args.get('population', population_name())
 
-    # Get available agents from the population directory
-    population_path = os.path.join(parent_dir, "agent_bank", "populations", population)
+    # Get available agents from the agent store
+    agent_ids = agent_store.list_agents(population)
 
-    if not os.path.exists(population_path):
+    if not agent_ids:
         return jsonify({'error': 'Population not found'}), 404
 
     agents_data = []
 
-    # List directories in population
-    for agent_id in os.listdir(population_path):
-        agent_dir = os.path.join(population_path, agent_id)
-        if os.path.isdir(agent_dir):
-            try:
-                # Load agent to get details
-                agent = GenerativeAgent(population, agent_id)
-
-                # Safely get occupation
-                occupation = getattr(agent.scratch, 'occupation', None)
-                if not occupation:
-                    # Try to extract from self_description or use default
-                    occupation = 'Merchant'
-
-                # Get personality traits directly from scratch attributes
-                personality_data = {
-                    'extraversion': getattr(agent.scratch, 'extraversion', 0),
-                    'agreeableness': getattr(agent.scratch, 'agreeableness', 0),
-                    'conscientiousness': getattr(agent.scratch, 'conscientiousness', 0),
-                    'neuroticism': getattr(agent.scratch, 'neuroticism', 0),
-                    'openness': getattr(agent.scratch, 'openness', 0)
-                }
-
-                # Get inventory details
-                inventory = []
-                if hasattr(agent, 'inventory'):
-                    for item_name, item_data in agent.inventory.items.items():
-                        # item_data is an InventoryItem object, not a dict
-                        inventory.append({
-                            'name': item_name,
-                            'quantity': getattr(item_data, 'quantity', 0),
-                            'base_value': getattr(item_data, 'value', 0),
-                        })
-
-                agents_data.append({
-                    'id': agent_id,
-                    'name': agent.scratch.get_fullname(),
-                    'age': getattr(agent.scratch, 'age', 0),
-                    'sex': getattr(agent.scratch, 'sex', 'N/A'),
-                    'gender': getattr(agent.scratch, 'sex', 'N/A'),
-                    'education': getattr(agent.scratch, 'education', 'N/A'),
-                    'race': getattr(agent.scratch, 'race', 'N/A'),
-                    'ethnicity': getattr(agent.scratch, 'ethnicity', 'N/A'),
-                    'political_ideology': getattr(agent.scratch, 'political_ideology', 'N/A'),
-                    'political_party': getattr(agent.scratch, 'political_party', 'N/A'),
-                    'census_division': getattr(agent.scratch, 'census_division', 'N/A'),
-                    'occupation': occupation,
-                    'address': getattr(agent.scratch, 'address', 'Unknown'),
-                    'personality': personality_data,
-                    'self_description': getattr(agent.scratch, 'self_description', ''),
-                    'fact_sheet': getattr(agent.scratch, 'fact_sheet', ''),
-                    'speech_pattern': getattr(agent.scratch, 'speech_pattern', ''),
-                    'inventory': inventory,
-                    'inventory_count': len(agent.inventory.items) if hasattr(agent, 'inventory') else 0
-                })
-            except Exception as e:
-                print(f"Error loading agent {agent_id}: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
+    for agent_id in agent_ids:
+        try:
+            # Load agent profile (scratch + inventory) to get details;
+            # the memory stream is never read for the listing
+            agent = GenerativeAgent(population, agent_id, load_mode="profile", store=agent_store)
+
+            # Safely get occupation
+            occupation = getattr(agent.scratch, 'occupation', None)
+            if not occupation:
+                # Try to extract from self_description or use default
+                occupation = 'Merchant'
+
+            # Get personality traits directly from scratch attributes
+            personality_data = {
+                'extraversion': getattr(agent.scratch, 'extraversion', 0),
+                'agreeableness': getattr(agent.scratch, 'agreeableness', 0),
+                'conscientiousness': getattr(agent.scratch, 'conscientiousness', 0),
+                'neuroticism': getattr(agent.scratch, 'neuroticism', 0),
+                'openness': getattr(agent.scratch, 'openness', 0)
+            }
+
+            # Get inventory details
+            inventory = []
+            if hasattr(agent, 'inventory'):
+                for item_name, item_data in agent.inventory.items.items():
+                    # item_data is an InventoryItem object, not a dict
+                    inventory.append({
+                        'name': item_name,
+                        'quantity': getattr(item_data, 'quantity', 0),
+                        'base_value': getattr(item_data, 'value', 0),
+                    })
+
+            agents_data.append({
+                'id': agent_id,
+                'name': agent.scratch.get_fullname(),
+                'age': getattr(agent.scratch, 'age', 0),
+                'sex': getattr(agent.scratch, 'sex', 'N/A'),
+                'gender': getattr(agent.scratch, 'sex', 'N/A'),
+                'education': getattr(agent.scratch, 'education', 'N/A'),
+                'race': getattr(agent.scratch, 'race', 'N/A'),
+                'ethnicity': getattr(agent.scratch, 'ethnicity', 'N/A'),
+                'political_ideology': getattr(agent.scratch, 'political_ideology', 'N/A'),
+                'political_party': getattr(agent.scratch, 'political_party', 'N/A'),
+                'census_division': getattr(agent.scratch, 'census_division', 'N/A'),
+                'occupation': occupation,
+                'address': getattr(agent.scratch, 'address', 'Unknown'),
+                'personality': personality_data,
+                'self_description': getattr(agent.scratch, 'self_description', ''),
+                'fact_sheet': getattr(agent.scratch, 'fact_sheet', ''),
+                'speech_pattern': getattr(agent.scratch, 'speech_pattern', ''),
+                'inventory': inventory,
+                'inventory_count': len(agent.inventory.items) if hasattr(agent, 'inventory') else 0
+            })
+        except Exception as e:
+            print(f"Error loading agent {agent_id}: {e}")
+            import traceback
+            traceback.print_exc()
+            continue
 
     return jsonify({'agents': agents_data, 'population': population})
 
 
+@app.route('/api/items/<item_name>', methods=['GET'])
+def get_item_holders(item_name):
+    """Agents holding an item, read from the agent store without loading the agents."""
+    population = request.args.get('population', population_name())
+    return jsonify({'item': item_name, 'population': population,
+                    'holders': agent_store.item_holders(population, item_name)})
+
+
 @app.route('/api/agent/<agent_id>', methods=['GET'])
 def get_agent_details(agent_id):
     """Get detailed information for a specific agent."""
-    population = request.args.get('population', 'Synthetic')
+    population = request.args.get('population', population_name())
 
     try:
-        agent = GenerativeAgent(population, agent_id)
+        agent = GenerativeAgent(population, agent_id, load_mode="lazy", store=agent_store)
 
         # Get inventory details
         inventory = []
@@ -338,8 +357,7 @@ def get_network():
     try:
         # Use cached transition matrix if available, otherwise create it
         if simulation_transition_matrix is not None:
-            import numpy as np
-            transition_matrix = np.array(simulation_transition_matrix)
+            transition_matrix = as_transition_matrix(simulation_transition_matrix)
         else:
             transition_matrix = markov_chain.create_agent_transition_matrix(
                 len(simulation_agents_loaded),
@@ -358,4 +376,9 @@ def get_network():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Markov agent simulation frontend')
+    parser.add_argument('--snapshot', default=None, help='Serve the agents of a population snapshot file')
+    args = parser.parse_args()
+    if args.snapshot:
+        agent_store = SnapshotAgentStore(args.snapshot)
     app.run(debug=True, host='0.0.0.0', port=5002, threaded=True)
\ No newline at end of file
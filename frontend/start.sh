@@ -8,4 +8,4 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-python app.py
\ No newline at end of file
+python app.py "$@"
\ No newline at end of file
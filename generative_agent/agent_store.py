@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+"""
+Agent Stores
+
+Where GenerativeAgent reads and writes its state. Two backends:
+
+- FolderAgentStore (AGENT_STORE = "folder"): the agent bank layout, one
+  folder of JSON files per agent under <root>/<population>/<agent id>/,
+  including copy-on-write forks (see population_fork).
+- SQLiteAgentStore (AGENT_STORE = "sqlite"): one SQLite database (WAL mode,
+  so readers such as the web UI never block a running simulation) with
+  tables for meta, scratch, memory nodes, embeddings (BLOBs), inventory
+  items, records and production plans. Saves are one transaction that only
+  inserts the nodes, embeddings and records added since the last save (plus
+  the last_retrieved updates of older nodes) and replaces the small
+  components, and agents can be queried across a population with query()
+  without loading them.
+
+Components are exchanged in their packaged (JSON) form. The agent is passed
+along so that a store can keep its bookkeeping on it: which folder or rows
+the agent was read from and how much of it is already stored.
+
+Usage (copy a population from the agent bank folders into the database):
+    python -m generative_agent.agent_store --import Synthetic
+    python -m generative_agent.agent_store --import Synthetic_Base --db agent_bank/agents.db
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from simulation_engine.settings import POPULATIONS_DIR, EMBEDDING_STORAGE_MODE, AGENT_STORE, AGENT_STORE_DB
+from simulation_engine.global_methods import create_folder_if_not_there, write_json_files_atomically
+from generative_agent.modules.cognitive.memory_stream import (QuantizedEmbeddings, convert_embeddings, save_embeddings,
+                                                              copy_embeddings, embeddings_file)
+from generative_agent.modules.cognitive.scratch import Scratch
+from generative_agent.population_fork import (read_fork, write_fork, is_frozen, resolve_scratch, resolve_nodes,
+                                              resolve_embeddings, resolve_inventory)
+
+# What a forked agent inherited from its parent; nothing for regular agents.
+NO_FORK_BASE = {"nodes": 0, "embeddings": frozenset(), "records": 0, "scratch": None}
+
+
+class AgentStore(ABC):
+    """Interface of the agent storage backends; a backend implements every abstract method."""
+
+    @abstractmethod
+    def list_populations(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def list_agents(self, population: str) -> List[str]:
+        ...
+
+    def exists(self, population: str, agent_id: str) -> bool:
+        return agent_id in self.list_agents(population)
+
+    @abstractmethod
+    def item_holders(self, population: str, item_name: str) -> List[Dict[str, Any]]:
+        """[{"agent_id", "quantity", "value"}] of the agents of a population holding an item."""
+
+    @abstractmethod
+    def read_meta(self, agent, population: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        """The agent's meta, or None when there is no such agent."""
+
+    @abstractmethod
+    def read_scratch(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def read_nodes(self, agent, population: str, agent_id: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def read_embeddings(self, agent, population: str, agent_id: str, mode: str) -> Any:
+        ...
+
+    @abstractmethod
+    def read_inventory(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        """{"items": [...], "records": [...], "production_plans": [...]}"""
+
+    @abstractmethod
+    def initialize(self, agent, population: str, agent_id: str) -> bool:
+        """Create the empty storage of a new agent; False if it already exists."""
+
+    @abstractmethod
+    def write(self, agent, population: str, agent_id: str):
+        """Store the whole agent under population/agent_id."""
+
+    @abstractmethod
+    def write_inventories(self, agents: List[Any]):
+        """Store the inventory and scratch of several agents in place, as one unit (a trade)."""
+
+    @abstractmethod
+    def import_folder(self, population: str, agent_id: str, folder: str):
+        """Replace the stored agent with the contents of an agent bank folder."""
+
+
+# ##############################################################################
+# ###                          FOLDER AGENT STORE                            ###
+# ##############################################################################
+
+class FolderAgentStore(AgentStore):
+    """Agents as folders of JSON files: <root>/<population>/<agent id>/."""
+
+    def __init__(self, root: str = POPULATIONS_DIR):
+        self.root = root
+
+    def folder(self, population: str, agent_id: str) -> str:
+        return f"{self.root}/{population}/{agent_id}"
+
+    def list_populations(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if self.list_agents(name))
+
+    def list_agents(self, population: str) -> List[str]:
+        population_path = f"{self.root}/{population}"
+        if not os.path.isdir(population_path):
+            return []
+        return sorted(name for name in os.listdir(population_path)
+                      if not name.startswith('.') and os.path.exists(f"{population_path}/{name}/meta.json"))
+
+    def exists(self, population: str, agent_id: str) -> bool:
+        return os.path.exists(f"{self.folder(population, agent_id)}/meta.json")
+
+    def item_holders(self, population: str, item_name: str) -> List[Dict[str, Any]]:
+        holders = []
+        for agent_id in self.list_agents(population):
+            inventory_data, _ = resolve_inventory(self.folder(population, agent_id))
+            for item in inventory_data.get("items", []):
+                if item["name"] == item_name and item["quantity"] > 0:
+                    holders.append({"agent_id": agent_id, "quantity": item["quantity"], "value": item.get("value", 0.0)})
+        return holders
+
+    def read_meta(self, agent, population: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        folder = self.folder(population, agent_id)
+        # A forked agent folder only holds what changed since the fork and
+        # reads the rest from its parent. _fork_base records how much of
+        # each component was inherited, so that write() only stores the rest.
+        agent._fork_parent = read_fork(folder)
+        agent._fork_base = dict(NO_FORK_BASE, embeddings=set())
+        # The folder the agent was read from. write() uses it to avoid
+        # rewriting memory stream files that were never loaded.
+        agent._source_folder = folder
+        if not os.path.exists(f"{folder}/scratch.json") and agent._fork_parent is None:
+            return None
+        with open(f"{folder}/meta.json") as json_file:
+            return json.load(json_file)
+
+    def read_scratch(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        scratch, inherited = resolve_scratch(self.folder(population, agent_id))
+        if inherited:
+            agent._fork_base["scratch"] = json.dumps(scratch, sort_keys=True)
+        return scratch
+
+    def read_nodes(self, agent, population: str, agent_id: str) -> List[Dict[str, Any]]:
+        nodes, agent._fork_base["nodes"] = resolve_nodes(self.folder(population, agent_id))
+        return nodes
+
+    def read_embeddings(self, agent, population: str, agent_id: str, mode: str) -> Any:
+        embeddings, agent._fork_base["embeddings"] = resolve_embeddings(self.folder(population, agent_id), mode)
+        return embeddings
+
+    def read_inventory(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        inventory_data, agent._fork_base["records"] = resolve_inventory(self.folder(population, agent_id))
+        return inventory_data
+
+    def initialize(self, agent, population: str, agent_id: str) -> bool:
+        folder = self.folder(population, agent_id)
+        agent._source_folder = folder
+        agent._fork_parent = None
+        agent._fork_base = dict(NO_FORK_BASE)
+        if os.path.exists(f"{folder}/meta.json"):
+            return False
+
+        print(f"Initializing {agent_id}:{population}'s agent storage.")
+        create_folder_if_not_there(f"{folder}/memory_stream")
+        print(f"-- Created {folder}/memory_stream")
+        files = {f"{folder}/meta.json": {"population": population,
+                                         "id": agent_id,
+                                         "forked_population": population,
+                                         "forked_id": agent_id},
+                 f"{folder}/scratch.json": Scratch().package(),
+                 f"{folder}/memory_stream/embeddings.json": {},
+                 f"{folder}/memory_stream/nodes.json": [],
+                 f"{folder}/inventory.json": {"items": [], "records": [], "production_plans": []}}
+        for path, data in files.items():
+            with open(path, "w") as json_file:
+                json.dump(data, json_file, indent=2)
+        return True
+
+    def write(self, agent, population: str, agent_id: str):
+        folder = self.folder(population, agent_id)
+        write_agent_folder(agent, folder)
+        agent._source_folder = folder
+
+    def write_inventories(self, agents: List[Any]):
+        files = {}
+        for agent in agents:
+            folder = self.folder(agent.population, agent.id)
+            check_writable(folder)
+            files[f"{folder}/inventory.json"] = package_folder_inventory(agent)
+            files[f"{folder}/scratch.json"] = agent.scratch.package()
+        write_json_files_atomically(files)
+
+    def import_folder(self, population: str, agent_id: str, folder: str):
+        # The storage is replaced as a whole, so embeddings stored in another
+        # format than the snapshot's, or the delta files of a forked agent,
+        # are not left behind.
+        storage = self.folder(population, agent_id)
+        shutil.rmtree(storage, ignore_errors=True)
+        shutil.copytree(folder, storage)
+
+
+def check_writable(folder: str):
+    if is_frozen(folder):
+        raise ValueError(f"{folder} is the parent snapshot of forked agents and cannot be modified; "
+                         f"save the agent to another population or fork it first.")
+
+
+def package_folder_inventory(agent) -> Dict[str, Any]:
+    """The agent's inventory.json: a fork leaves the records from before the fork to its parent."""
+    inventory_summary = agent.package_inventory()
+    fork_base = getattr(agent, "_fork_base", None) or NO_FORK_BASE
+    if getattr(agent, "_fork_parent", None) is not None:
+        inventory_summary["records"] = inventory_summary["records"][fork_base["records"]:]
+    return inventory_summary
+
+
+def write_agent_folder(agent, folder: str):
+    """
+    Write the agent's memory stream, scratch, inventory and meta files to a
+    folder in the agent bank layout. A forked agent only writes what changed
+    since the fork, and stays a fork of the same parent.
+    """
+    check_writable(folder)
+    create_folder_if_not_there(f"{folder}/memory_stream")
+    fork_parent = getattr(agent, "_fork_parent", None)
+    fork_base = getattr(agent, "_fork_base", None) or NO_FORK_BASE
+    if fork_parent is not None:
+        write_fork(folder, fork_parent)
+
+    # Parts of a lazily loaded memory stream that were never materialized are
+    # unchanged on disk: they are left alone when we save in place, and
+    # copied verbatim when we save somewhere else. An agent read from another
+    # store has no source folder, so its memory stream is always written.
+    nodes_loaded, embeddings_loaded = agent.memory_stream.is_materialized()
+    source = getattr(agent, "_source_folder", None)
+    if source is None:
+        nodes_loaded = embeddings_loaded = True
+    if embeddings_loaded:
+        embeddings = agent.memory_stream.embeddings
+        if fork_parent is not None:
+            inherited = fork_base["embeddings"]
+            delta = {content: embeddings[content] for content in embeddings if content not in inherited}
+            embeddings = QuantizedEmbeddings(embeddings.mode, delta) if isinstance(embeddings, QuantizedEmbeddings) else delta
+        save_embeddings(embeddings, f"{folder}/memory_stream")
+    elif source != folder and os.path.exists(embeddings_file(f"{source}/memory_stream")):
+        copy_embeddings(f"{source}/memory_stream", f"{folder}/memory_stream")
+    if nodes_loaded:
+        with open(f"{folder}/memory_stream/nodes.json", "w") as json_file:
+            json.dump([node.package() for node in agent.memory_stream.seq_nodes[fork_base["nodes"]:]],
+                      json_file, indent=2)
+    elif source != folder and os.path.exists(f"{source}/memory_stream/nodes.json"):
+        shutil.copyfile(f"{source}/memory_stream/nodes.json", f"{folder}/memory_stream/nodes.json")
+
+    # A fork whose scratch is still the parent's keeps reading it from the parent.
+    agent_scratch_summary = agent.scratch.package()
+    if fork_base["scratch"] == json.dumps(agent_scratch_summary, sort_keys=True):
+        if os.path.exists(f"{folder}/scratch.json"):
+            os.remove(f"{folder}/scratch.json")
+    else:
+        with open(f"{folder}/scratch.json", "w") as json_file:
+            json.dump(agent_scratch_summary, json_file, indent=2)
+
+    with open(f"{folder}/inventory.json", "w") as json_file:
+        json.dump(package_folder_inventory(agent), json_file, indent=2)
+
+    with open(f"{folder}/meta.json", "w") as json_file:
+        json.dump(agent.package(), json_file, indent=2)
+
+
+# ##############################################################################
+# ###                          SQLITE AGENT STORE                            ###
+# ##############################################################################
+
+# Numeric columns without a declared type keep the ints and floats of the
+# JSON files as they are.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    population TEXT NOT NULL, agent_id TEXT NOT NULL,
+    forked_population TEXT, forked_id TEXT,
+    PRIMARY KEY (population, agent_id));
+CREATE TABLE IF NOT EXISTS scratch (
+    population TEXT NOT NULL, agent_id TEXT NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (population, agent_id));
+CREATE TABLE IF NOT EXISTS nodes (
+    population TEXT NOT NULL, agent_id TEXT NOT NULL, node_id INTEGER NOT NULL,
+    node_type TEXT, content TEXT, importance, created, last_retrieved, pointer_id TEXT,
+    PRIMARY KEY (population, agent_id, node_id));
+CREATE TABLE IF NOT EXISTS embeddings (
+    population TEXT NOT NULL, agent_id TEXT NOT NULL, content TEXT NOT NULL,
+    dtype TEXT NOT NULL, scale REAL, vector BLOB NOT NULL,
+    PRIMARY KEY (population, agent_id, content));
+CREATE TABLE IF NOT EXISTS items (
+    population TEXT NOT NULL, agent_id TEXT NOT NULL, name TEXT NOT NULL,
+    quantity, value, production_cost, description TEXT, created, last_modified,
+    PRIMARY KEY (population, agent_id, name));
+CREATE TABLE IF NOT EXISTS records (
+    population TEXT NOT NULL, agent_id TEXT NOT NULL, seq INTEGER NOT NULL,
+    record_id, action TEXT, item_name TEXT, quantity, time_step, description TEXT, trade_partner TEXT,
+    PRIMARY KEY (population, agent_id, seq));
+CREATE TABLE IF NOT EXISTS plans (
+    population TEXT NOT NULL, agent_id TEXT NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL,
+    PRIMARY KEY (population, agent_id, seq));
+CREATE INDEX IF NOT EXISTS nodes_by_type ON nodes (population, agent_id, node_type, created);
+CREATE INDEX IF NOT EXISTS items_by_name ON items (name, population);
+CREATE INDEX IF NOT EXISTS records_by_action ON records (population, agent_id, action, time_step);
+CREATE INDEX IF NOT EXISTS records_by_item ON records (item_name, action, time_step);
+"""
+
+NODE_COLUMNS = ("node_id", "node_type", "content", "importance", "created", "last_retrieved", "pointer_id")
+ITEM_COLUMNS = ("name", "quantity", "value", "production_cost", "description", "created", "last_modified")
+RECORD_COLUMNS = ("record_id", "action", "item_name", "quantity", "time_step", "description", "trade_partner")
+EMBEDDING_DTYPES = {"float64": np.float64, "float16": np.float16, "int8": np.int8}
+
+
+def _node_row(node: Dict[str, Any]) -> Tuple:
+    return tuple(json.dumps(node[column]) if column == "pointer_id" else node[column] for column in NODE_COLUMNS)
+
+
+def _embedding_rows(embeddings: Any, start: int = 0) -> List[Tuple]:
+    """(content, dtype, scale, vector bytes) of the embeddings from the start-th on, in insertion order."""
+    if isinstance(embeddings, QuantizedEmbeddings):
+        arrays = embeddings.to_arrays()
+        contents = arrays["contents"].tolist()
+        scales = arrays.get("scales")
+        return [(contents[row], embeddings.mode, float(scales[row]) if scales is not None else None,
+                 arrays["vectors"][row].tobytes())
+                for row in range(start, len(contents))]
+    return [(content, "float64", None, np.asarray(vector, dtype=np.float64).tobytes())
+            for content, vector in islice(embeddings.items(), start, None)]
+
+
+def _decode_embeddings(rows: List[Tuple], mode: str) -> Any:
+    """Embeddings in the requested mode from (content, dtype, scale, vector) rows."""
+    dtypes = {row[1] for row in rows}
+    if len(dtypes) == 1 and dtypes != {"float64"}:
+        # One quantized block, used as stored
+        stored_mode = dtypes.pop()
+        vectors = np.stack([np.frombuffer(row[3], dtype=EMBEDDING_DTYPES[stored_mode]) for row in rows])
+        scales = np.array([row[2] for row in rows], dtype=np.float32) if stored_mode == "int8" else None
+        embeddings = QuantizedEmbeddings.from_arrays(stored_mode, [row[0] for row in rows], vectors, scales)
+        return convert_embeddings(embeddings, mode)
+    embeddings = {}
+    for content, dtype, scale, vector in rows:
+        values = np.frombuffer(vector, dtype=EMBEDDING_DTYPES[dtype]).astype(np.float64)
+        embeddings[content] = (values * scale if dtype == "int8" else values).tolist()
+    return convert_embeddings(embeddings, mode)
+
+
+class SQLiteAgentStore(AgentStore):
+    """Agents as rows of one SQLite database, keyed by (population, agent_id)."""
+
+    def __init__(self, path: str = AGENT_STORE_DB):
+        self.path = path
+        # sqlite3 connections are not shared across threads (the production
+        # phase loads memory streams on worker threads): one per thread.
+        self._local = threading.local()
+        create_folder_if_not_there(path)
+        self.connection().executescript(SCHEMA)
+
+    def __reduce__(self):
+        # Connections stay with their process: a pickled store (e.g. sent to
+        # a loading worker) opens its own.
+        return (SQLiteAgentStore, (self.path,))
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def query(self, sql: str, parameters: Tuple = ()) -> List[Dict[str, Any]]:
+        """
+        Rows of a read-only query across agents, as dicts, e.g. who holds an item:
+            store.query("SELECT population, agent_id, quantity FROM items WHERE name = ?", ("bread",))
+        """
+        cursor = self.connection().execute(sql, parameters)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def list_populations(self) -> List[str]:
+        return [row[0] for row in self.connection().execute("SELECT DISTINCT population FROM meta ORDER BY population")]
+
+    def list_agents(self, population: str) -> List[str]:
+        return [row[0] for row in self.connection().execute(
+            "SELECT agent_id FROM meta WHERE population = ? ORDER BY agent_id", (population,))]
+
+    def exists(self, population: str, agent_id: str) -> bool:
+        return self.connection().execute("SELECT 1 FROM meta WHERE population = ? AND agent_id = ?",
+                                         (population, agent_id)).fetchone() is not None
+
+    def item_holders(self, population: str, item_name: str) -> List[Dict[str, Any]]:
+        return self.query("SELECT agent_id, quantity, value FROM items "
+                          "WHERE name = ? AND population = ? AND quantity > 0 ORDER BY agent_id",
+                          (item_name, population))
+
+    # Reads. _store_marks records where the agent was read from and how many
+    # nodes, embeddings and records of it are stored, so write() only
+    # inserts what was added since.
+
+    def _marks(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        marks = getattr(agent, "_store_marks", None)
+        if not marks or marks["location"] != (population, agent_id):
+            marks = {"location": (population, agent_id), "nodes": None, "last_retrieved": None,
+                     "embeddings": None, "records": None}
+            agent._store_marks = marks
+        return marks
+
+    def read_meta(self, agent, population: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        agent._store_marks = None
+        self._marks(agent, population, agent_id)
+        row = self.connection().execute(
+            "SELECT forked_population, forked_id FROM meta WHERE population = ? AND agent_id = ?",
+            (population, agent_id)).fetchone()
+        if row is None:
+            return None
+        return {"population": population, "id": agent_id, "forked_population": row[0], "forked_id": row[1]}
+
+    def read_scratch(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        row = self.connection().execute("SELECT data FROM scratch WHERE population = ? AND agent_id = ?",
+                                        (population, agent_id)).fetchone()
+        return json.loads(row[0]) if row else Scratch().package()
+
+    def read_nodes(self, agent, population: str, agent_id: str) -> List[Dict[str, Any]]:
+        rows = self.connection().execute(
+            f"SELECT {', '.join(NODE_COLUMNS)} FROM nodes WHERE population = ? AND agent_id = ? ORDER BY node_id",
+            (population, agent_id)).fetchall()
+        nodes = []
+        for row in rows:
+            node = dict(zip(NODE_COLUMNS, row))
+            node["pointer_id"] = json.loads(node["pointer_id"])
+            nodes.append(node)
+        marks = self._marks(agent, population, agent_id)
+        marks["nodes"] = len(nodes)
+        marks["last_retrieved"] = [node["last_retrieved"] for node in nodes]
+        return nodes
+
+    def read_embeddings(self, agent, population: str, agent_id: str, mode: str) -> Any:
+        rows = self.connection().execute(
+            "SELECT content, dtype, scale, vector FROM embeddings WHERE population = ? AND agent_id = ? ORDER BY rowid",
+            (population, agent_id)).fetchall()
+        self._marks(agent, population, agent_id)["embeddings"] = len(rows)
+        return _decode_embeddings(rows, mode)
+
+    def read_inventory(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        connection = self.connection()
+        key = (population, agent_id)
+        items = [dict(zip(ITEM_COLUMNS, row)) for row in connection.execute(
+            f"SELECT {', '.join(ITEM_COLUMNS)} FROM items WHERE population = ? AND agent_id = ? ORDER BY rowid", key)]
+        records = [dict(zip(RECORD_COLUMNS, row)) for row in connection.execute(
+            f"SELECT {', '.join(RECORD_COLUMNS)} FROM records WHERE population = ? AND agent_id = ? ORDER BY seq", key)]
+        plans = [json.loads(row[0]) for row in connection.execute(
+            "SELECT data FROM plans WHERE population = ? AND agent_id = ? ORDER BY seq", key)]
+        self._marks(agent, population, agent_id)["records"] = len(records)
+        return {"items": items, "records": records, "production_plans": plans}
+
+    # Writes
+
+    def initialize(self, agent, population: str, agent_id: str) -> bool:
+        agent._store_marks = {"location": (population, agent_id), "nodes": 0, "last_retrieved": [],
+                              "embeddings": 0, "records": 0}
+        if self.exists(population, agent_id):
+            return False
+        print(f"Initializing {agent_id}:{population}'s agent storage.")
+        with self.transaction() as connection:
+            self._write_meta(connection, (population, agent_id), {"forked_population": population,
+                                                                  "forked_id": agent_id})
+            self._write_scratch(connection, (population, agent_id), Scratch().package())
+        return True
+
+    def write(self, agent, population: str, agent_id: str):
+        key = (population, agent_id)
+        marks = getattr(agent, "_store_marks", None) or {}
+        in_place = marks.get("location") == key
+        nodes_loaded, embeddings_loaded = agent.memory_stream.is_materialized()
+        if not in_place and not marks:
+            # Never read from this store: everything is written
+            nodes_loaded = embeddings_loaded = True
+        with self.transaction() as connection:
+            self._write_meta(connection, key, agent.package())
+            self._write_scratch(connection, key, agent.scratch.package())
+            if nodes_loaded:
+                self._write_nodes(connection, key, agent, marks if in_place else {})
+            elif not in_place:
+                self._copy_rows(connection, "nodes", marks["location"], key)
+            if embeddings_loaded:
+                start = marks.get("embeddings") if in_place and marks.get("embeddings") is not None else None
+                if start is None:
+                    connection.execute("DELETE FROM embeddings WHERE population = ? AND agent_id = ?", key)
+                rows = _embedding_rows(agent.memory_stream.embeddings, start or 0)
+                connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)",
+                                       [key + row for row in rows])
+                embeddings_count = (start or 0) + len(rows)
+            elif not in_place:
+                self._copy_rows(connection, "embeddings", marks["location"], key)
+            self._write_inventory(connection, key, agent, marks if in_place else {})
+
+        new_marks = {"location": key, "nodes": None, "last_retrieved": None,
+                     "embeddings": None, "records": len(agent.inventory.records)}
+        if nodes_loaded:
+            new_marks["nodes"] = len(agent.memory_stream.seq_nodes)
+            new_marks["last_retrieved"] = [node.last_retrieved for node in agent.memory_stream.seq_nodes]
+        if embeddings_loaded:
+            new_marks["embeddings"] = embeddings_count
+        agent._store_marks = new_marks
+
+    def write_inventories(self, agents: List[Any]):
+        with self.transaction() as connection:
+            for agent in agents:
+                key = (agent.population, agent.id)
+                marks = getattr(agent, "_store_marks", None) or {}
+                in_place = marks.get("location") == key
+                self._write_scratch(connection, key, agent.scratch.package())
+                self._write_inventory(connection, key, agent, marks if in_place else {})
+        for agent in agents:
+            marks = self._marks(agent, agent.population, agent.id)
+            marks["records"] = len(agent.inventory.records)
+
+    def import_folder(self, population: str, agent_id: str, folder: str):
+        key = (population, agent_id)
+        with open(f"{folder}/meta.json") as json_file:
+            meta = json.load(json_file)
+        scratch, _ = resolve_scratch(folder)
+        nodes, _ = resolve_nodes(folder)
+        embeddings, _ = resolve_embeddings(folder, EMBEDDING_STORAGE_MODE)
+        inventory, _ = resolve_inventory(folder)
+        with self.transaction() as connection:
+            for table in ("nodes", "embeddings", "items", "records", "plans"):
+                connection.execute(f"DELETE FROM {table} WHERE population = ? AND agent_id = ?", key)
+            self._write_meta(connection, key, meta)
+            self._write_scratch(connection, key, scratch)
+            connection.executemany(f"INSERT INTO nodes VALUES (?, ?, {', '.join('?' * len(NODE_COLUMNS))})",
+                                   [key + _node_row(node) for node in nodes])
+            connection.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)",
+                                   [key + row for row in _embedding_rows(embeddings)])
+            self._replace_items_and_plans(connection, key, inventory.get("items", []),
+                                          inventory.get("production_plans", []))
+            connection.executemany(f"INSERT INTO records VALUES (?, ?, ?, {', '.join('?' * len(RECORD_COLUMNS))})",
+                                   [key + (seq,) + tuple(record.get(column, "") for column in RECORD_COLUMNS)
+                                    for seq, record in enumerate(inventory.get("records", []))])
+
+    def _write_meta(self, connection: sqlite3.Connection, key: Tuple[str, str], meta: Dict[str, Any]):
+        connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?)",
+                           key + (meta.get("forked_population"), meta.get("forked_id")))
+
+    def _write_scratch(self, connection: sqlite3.Connection, key: Tuple[str, str], scratch: Dict[str, Any]):
+        connection.execute("INSERT OR REPLACE INTO scratch VALUES (?, ?, ?)", key + (json.dumps(scratch),))
+
+    def _write_nodes(self, connection: sqlite3.Connection, key: Tuple[str, str], agent, marks: Dict[str, Any]):
+        seq_nodes = agent.memory_stream.seq_nodes
+        start = marks.get("nodes")
+        if start is None or start > len(seq_nodes):
+            connection.execute("DELETE FROM nodes WHERE population = ? AND agent_id = ?", key)
+            start = 0
+        else:
+            # Retrieval updates last_retrieved of stored nodes
+            stored = marks["last_retrieved"]
+            connection.executemany(
+                "UPDATE nodes SET last_retrieved = ? WHERE population = ? AND agent_id = ? AND node_id = ?",
+                [(node.last_retrieved,) + key + (node.node_id,)
+                 for node, last_retrieved in zip(seq_nodes[:start], stored) if node.last_retrieved != last_retrieved])
+        connection.executemany(f"INSERT OR REPLACE INTO nodes VALUES (?, ?, {', '.join('?' * len(NODE_COLUMNS))})",
+                               [key + _node_row(node.package()) for node in seq_nodes[start:]])
+
+    def _write_inventory(self, connection: sqlite3.Connection, key: Tuple[str, str], agent, marks: Dict[str, Any]):
+        inventory = agent.inventory
+        self._replace_items_and_plans(connection, key, [item.package() for item in inventory.items.values()],
+                                      agent.plan.package())
+        # Records are append-only, but a rollback may have dropped some
+        records = inventory.records
+        start = marks.get("records")
+        start = 0 if start is None else min(start, len(records))
+        connection.execute("DELETE FROM records WHERE population = ? AND agent_id = ? AND seq >= ?", key + (start,))
+        connection.executemany(f"INSERT INTO records VALUES (?, ?, ?, {', '.join('?' * len(RECORD_COLUMNS))})",
+                               [key + (seq,) + tuple(getattr(record, column) for column in RECORD_COLUMNS)
+                                for seq, record in enumerate(records[start:], start)])
+
+    def _replace_items_and_plans(self, connection: sqlite3.Connection, key: Tuple[str, str],
+                                 items: List[Dict[str, Any]], plans: List[Dict[str, Any]]):
+        connection.execute("DELETE FROM items WHERE population = ? AND agent_id = ?", key)
+        connection.executemany(f"INSERT INTO items VALUES (?, ?, {', '.join('?' * len(ITEM_COLUMNS))})",
+                               [key + tuple(item.get(column) for column in ITEM_COLUMNS) for item in items])
+        connection.execute("DELETE FROM plans WHERE population = ? AND agent_id = ?", key)
+        connection.executemany("INSERT INTO plans VALUES (?, ?, ?, ?)",
+                               [key + (seq, json.dumps(plan)) for seq, plan in enumerate(plans)])
+
+    def _copy_rows(self, connection: sqlite3.Connection, table: str, source: Tuple[str, str], target: Tuple[str, str]):
+        """Copy an agent's rows of a table to another agent without reading them into Python."""
+        columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")][2:]
+        connection.execute(f"DELETE FROM {table} WHERE population = ? AND agent_id = ?", target)
+        connection.execute(f"INSERT INTO {table} SELECT ?, ?, {', '.join(columns)} FROM {table} "
+                           f"WHERE population = ? AND agent_id = ? ORDER BY rowid", target + source)
+
+
+# ##############################################################################
+# ###                           DEFAULT STORE                                ###
+# ##############################################################################
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_agent_store() -> AgentStore:
+    """The store selected by AGENT_STORE, shared by every agent."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            if AGENT_STORE == "sqlite":
+                _default_store = SQLiteAgentStore(AGENT_STORE_DB)
+            elif AGENT_STORE == "folder":
+                _default_store = FolderAgentStore(POPULATIONS_DIR)
+            else:
+                raise ValueError(f"Unknown AGENT_STORE '{AGENT_STORE}'. Expected 'folder' or 'sqlite'.")
+        return _default_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy agent bank populations into a SQLite agent store')
+    parser.add_argument('--import', dest='populations', nargs='+', required=True, help='Populations to import')
+    parser.add_argument('--db', default=AGENT_STORE_DB, help='Database file (default: AGENT_STORE_DB)')
+    args = parser.parse_args()
+
+    folders = FolderAgentStore(POPULATIONS_DIR)
+    store = SQLiteAgentStore(args.db)
+    for population in args.populations:
+        agent_ids = folders.list_agents(population)
+        for agent_id in agent_ids:
+            store.import_folder(population, agent_id, folders.folder(population, agent_id))
+        print(f"Imported {len(agent_ids)} agents of {population} into {args.db}")
+
+
+if __name__ == '__main__':
+    main()
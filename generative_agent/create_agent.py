@@ -24,12 +24,16 @@ Examples:
     # Batch creation with custom starting cash for all agents
     python -m generative_agent.create_agent --all --money 20000
     python -m generative_agent.create_agent --all --population Synthetic_Base --text inventory.txt --money 15000
+
+    # Batch creation building 16 agents at a time
+    python -m generative_agent.create_agent --all --workers 16
 """
 
 import argparse
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add parent directory to path for imports
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -37,11 +41,13 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from simulation_engine.gpt_structure import chat_safe_generate
-from simulation_engine.settings import LLM_VERS
+from simulation_engine.settings import LLM_VERS, BUILD_MAX_WORKERS
+from generative_agent.agent_store import get_agent_store
 from generative_agent.generative_agent import GenerativeAgent
 
 
-def generate_agent_memories_from_scratch(agent_name, population_name, output_file_path=None, digital_money=10000):
+def generate_agent_memories_from_scratch(agent_name, population_name, output_file_path=None, digital_money=10000,
+                                         create_structure=True):
     """
     Generate comprehensive agent memories using only scratch data.
 
@@ -50,6 +56,7 @@ def generate_agent_memories_from_scratch(agent_name, population_name, output_fil
         population_name (str): The population name (e.g., "Synthetic_Base")
         output_file_path (str): Optional path for output file. If None, saves to testing/memories/{agent_name}_memories.py
         digital_money (float): Starting digital cash amount (default: 10000)
+        create_structure (bool): Also create the agent's directories (default: True)
 
     Returns:
         str: Path to the generated memory file
@@ -110,15 +117,16 @@ def generate_agent_memories_from_scratch(agent_name, population_name, output_fil
     with open(output_file_path, 'w') as f:
         f.write(generated_content)
 
-    # Create agent directory structure in both Synthetic_Base and Synthetic populations
-    create_agent_structure(agent_name, scratch_data, digital_money)
-
     print(f"Generated memories saved to: {output_file_path}")
-    print(f"Created agent structure for {agent_name} in Synthetic_Base and Synthetic populations with ${digital_money} starting cash")
+
+    # Create agent directory structure in both Synthetic_Base and Synthetic populations
+    if create_structure:
+        create_agent_structure(agent_name, scratch_data, digital_money)
+        print(f"Created agent structure for {agent_name} in Synthetic_Base and Synthetic populations with ${digital_money} starting cash")
     return output_file_path
 
 
-def create_agent_structure(agent_name, scratch_data, digital_money=10000):
+def create_agent_structure(agent_name, scratch_data, digital_money=10000, populations=("Synthetic_Base", "Synthetic")):
     """
     Create complete agent directory structure in both Synthetic_Base and Synthetic populations.
 
@@ -126,8 +134,8 @@ def create_agent_structure(agent_name, scratch_data, digital_money=10000):
         agent_name (str): The agent's identifier
         scratch_data (dict): The agent's scratch data
         digital_money (float): Starting digital cash amount (default: 10000)
+        populations (tuple): Populations to create the structure in (default: Synthetic_Base and Synthetic)
     """
-    populations = ["Synthetic_Base", "Synthetic"]
 
     for population in populations:
         agent_dir = f"agent_bank/populations/{population}/{agent_name}"
@@ -295,6 +303,22 @@ def setup_agent_with_generated_inventory(agent_name, inventory_code):
     for m in memories:
         agent.remember(m)
 
+    add_generated_inventory(agent, agent_name, inventory_code)
+
+    # Save to Synthetic population
+    agent.save("Synthetic", agent_name)
+    print(f"Agent {agent_name} saved to Synthetic population")
+
+
+def add_generated_inventory(agent, agent_name, inventory_code):
+    """
+    Execute generated inventory code on an agent (without saving it).
+
+    Args:
+        agent (GenerativeAgent): The agent to add the inventory to
+        agent_name (str): The agent's identifier
+        inventory_code (str): Generated Python code with agent.add_to_inventory() calls
+    """
     # Execute the generated inventory code
     # Create a safe namespace for execution
     namespace = {'agent': agent}
@@ -308,10 +332,6 @@ def setup_agent_with_generated_inventory(agent_name, inventory_code):
         print("=" * 50)
         raise Exception(f"Failed to execute inventory code: {str(e)}")
 
-    # Save to Synthetic population
-    agent.save("Synthetic", agent_name)
-    print(f"Agent {agent_name} saved to Synthetic population")
-
 
 def create_agent(agent_name, population_name, text_file_name, digital_money=10000):
     """
@@ -354,7 +374,64 @@ def create_agent(agent_name, population_name, text_file_name, digital_money=1000
     return memory_file_path
 
 
-def create_all_agents(population_name='Synthetic_Base', text_file_name='inventory.txt', digital_money=10000):
+def build_agents(agent_names, prepare, source_population="Synthetic_Base", target_population="Synthetic",
+                 max_workers=BUILD_MAX_WORKERS):
+    """
+    Build many agents concurrently: load each from source_population, add its
+    seed memories (importance scores and embeddings batched, see
+    GenerativeAgent.remember_all) and its inventory, and save it to
+    target_population once, at the end.
+
+    Args:
+        agent_names (list): The agents' identifiers
+        prepare (callable): prepare(agent_name) -> (memories, setup_inventory), run
+            first on the agent's worker thread; setup_inventory(agent) adds the
+            starting inventory without saving the agent (or is None)
+        source_population (str): Population the agents are loaded from (default: Synthetic_Base)
+        target_population (str): Population the built agents are saved to (default: Synthetic)
+        max_workers (int): Agents built concurrently; 1 builds them one at a time (default: BUILD_MAX_WORKERS)
+
+    Returns:
+        dict: Dictionary with agent names as keys and status (success/error) as values
+    """
+    store = get_agent_store()
+
+    def build(agent_name):
+        memories, setup_inventory = prepare(agent_name)
+        if not store.exists(source_population, agent_name):
+            raise FileNotFoundError(f"{agent_name} not found in {source_population}")
+        agent = GenerativeAgent(source_population, agent_name)
+        agent.remember_all(memories)
+        if setup_inventory is not None:
+            setup_inventory(agent)
+        agent.save(target_population, agent_name)
+        return len(memories)
+
+    results = {}
+
+    def record(agent_name, run):
+        try:
+            count = run()
+            results[agent_name] = "SUCCESS"
+            print(f"[{len(results)}/{len(agent_names)}] ✓ {agent_name} built ({count} memories)")
+        except Exception as e:
+            results[agent_name] = f"ERROR: {str(e)}"
+            print(f"[{len(results)}/{len(agent_names)}] ✗ Failed to build {agent_name}: {str(e)}")
+
+    if max_workers and max_workers > 1 and len(agent_names) > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(agent_names))) as pool:
+            futures = {pool.submit(build, agent_name): agent_name for agent_name in agent_names}
+            for future in as_completed(futures):
+                record(futures[future], future.result)
+    else:
+        for agent_name in agent_names:
+            record(agent_name, lambda: build(agent_name))
+
+    return {agent_name: results[agent_name] for agent_name in agent_names}
+
+
+def create_all_agents(population_name='Synthetic_Base', text_file_name='inventory.txt', digital_money=10000,
+                      max_workers=BUILD_MAX_WORKERS):
     """
     Create all agents found in the specified population directory.
 
@@ -362,6 +439,7 @@ def create_all_agents(population_name='Synthetic_Base', text_file_name='inventor
         population_name (str): The population directory to scan (default: Synthetic_Base)
         text_file_name (str): Name of inventory text file (default: inventory.txt)
         digital_money (float): Starting digital cash amount for all agents (default: 10000)
+        max_workers (int): Agents built concurrently (default: BUILD_MAX_WORKERS)
 
     Returns:
         dict: Dictionary with agent names as keys and status (success/error) as values
@@ -384,32 +462,28 @@ def create_all_agents(population_name='Synthetic_Base', text_file_name='inventor
     print(f"Starting digital cash for all agents: ${digital_money}")
     print("="*50)
 
-    results = {}
-
-    for agent_name in agent_dirs:
-        print(f"\nProcessing agent: {agent_name}")
-        print("-"*50)
+    def prepare(agent_name):
+        # Validate agent has required files
+        scratch_path = f"{population_path}/{agent_name}/scratch.json"
+        text_file_path = f"{population_path}/{agent_name}/{text_file_name}"
 
-        try:
-            # Validate agent has required files
-            scratch_path = f"{population_path}/{agent_name}/scratch.json"
-            text_file_path = f"{population_path}/{agent_name}/{text_file_name}"
+        if not os.path.exists(scratch_path):
+            raise FileNotFoundError(f"Missing scratch.json for {agent_name}")
 
-            if not os.path.exists(scratch_path):
-                raise FileNotFoundError(f"Missing scratch.json for {agent_name}")
+        if not os.path.exists(text_file_path):
+            raise FileNotFoundError(f"Missing {text_file_name} for {agent_name}")
 
-            if not os.path.exists(text_file_path):
-                raise FileNotFoundError(f"Missing {text_file_name} for {agent_name}")
+        generate_agent_memories_from_scratch(agent_name, population_name, digital_money=digital_money,
+                                             create_structure=False)
+        inventory_code = generate_agent_inventory_code(agent_name, population_name, text_file_name)
 
-            # Create the agent
-            memory_file_path = create_agent(agent_name, population_name, text_file_name, digital_money)
-            results[agent_name] = "SUCCESS"
-            print(f"✓ {agent_name} created successfully")
+        # Only the base structure: the built agent is written to Synthetic once, at the end
+        with open(scratch_path, 'r') as f:
+            scratch_data = json.load(f)
+        create_agent_structure(agent_name, scratch_data, digital_money, populations=("Synthetic_Base",))
+        return load_agent_memories(agent_name), lambda agent: add_generated_inventory(agent, agent_name, inventory_code)
 
-        except Exception as e:
-            results[agent_name] = f"ERROR: {str(e)}"
-            print(f"✗ Failed to create {agent_name}: {str(e)}")
-            continue
+    results = build_agents(agent_dirs, prepare, max_workers=max_workers)
 
     # Print summary
     print("\n" + "="*50)
@@ -442,6 +516,8 @@ def main():
     parser.add_argument('--output', help='Optional output path for memory file')
     parser.add_argument('--all', action='store_true', help='Create all agents found in the population directory')
     parser.add_argument('--money', type=float, default=10000, help='Starting digital cash amount (default: 10000)')
+    parser.add_argument('--workers', type=int, default=BUILD_MAX_WORKERS,
+                        help=f'Agents built concurrently with --all (default: {BUILD_MAX_WORKERS})')
 
     args = parser.parse_args()
 
@@ -449,7 +525,7 @@ def main():
         if args.all:
             # Create all agents in the population
             print(f"Creating all agents from {args.population} population...")
-            results = create_all_agents(args.population, args.text, args.money)
+            results = create_all_agents(args.population, args.text, args.money, args.workers)
             sys.exit(0 if all(v == "SUCCESS" for v in results.values()) else 1)
 
         else:
@@ -1,23 +1,100 @@
 import json
-import os
 
 from typing import Dict, List, Optional, Union, Any
+from concurrent.futures import Executor
 
-from generative_agent.modules.cognitive.memory_stream import MemoryStream
+from generative_agent.modules.cognitive.memory_stream import MemoryStream, LazyMemoryStream
 from generative_agent.modules.cognitive.scratch import Scratch
 from generative_agent.modules.cognitive.inventory import Inventory
 from generative_agent.modules.cognitive.working_memory import WorkingMemory
 from generative_agent.modules.cognitive.plan import Plan
 from generative_agent.modules.conversation_interaction import utterance_conversation_based
+from generative_agent.agent_store import AgentStore, get_agent_store, write_agent_folder
 from simulation_engine.settings import *
 from simulation_engine.global_methods import *
 
+# How much of an agent's storage is read when it is constructed. See 
+# GenerativeAgent.__init__. 
+AGENT_LOAD_MODES = ("full", "lazy", "profile")
+
+
+def buying_interest_probabilities(raw_scores: Dict[str, float], temperature: float = 10.0) -> Dict[str, float]: 
+  """
+  Softmax of raw 0-100 buying interest scores (see 
+  GenerativeAgent.get_markov_buying_interest_raw_scores). 
+
+  Parameters:
+    raw_scores: Dict mapping agent names to raw scores
+    temperature: Temperature parameter for softmax (higher = more uniform, lower = more peaked)
+  Returns:
+    Dict mapping agent names to probabilities (sum to 1.0)
+  """
+  import math
+
+  # Apply softmax to convert scores to probability distribution
+  # First normalize scores to reduce extreme differences
+  scores_list = list(raw_scores.values())
+  mean_score = sum(scores_list) / len(scores_list)
+  
+  # Center scores around mean to reduce variance
+  centered_scores = {}
+  for agent, score in raw_scores.items():
+    centered_scores[agent] = score - mean_score
+  
+  # Apply softmax with temperature scaling
+  exp_scores = {}
+  for agent, centered_score in centered_scores.items():
+    exp_scores[agent] = math.exp(centered_score / temperature)
+  
+  # Calculate sum for normalization
+  total_exp = sum(exp_scores.values())
+  
+  # Convert to probabilities
+  probabilities = {}
+  for agent, exp_score in exp_scores.items():
+    probabilities[agent] = exp_score / total_exp
+  
+  return probabilities
+
+
+def save_inventories(agents: List["GenerativeAgent"]) -> None: 
+  """
+  Saves the inventory and scratch (which holds the sales failure counters) 
+  of several agents in place as one unit, e.g. both sides of a trade. 
+
+  Parameters:
+    agents: Agents sharing one agent store. 
+  Returns: 
+    None
+  """
+  agents[0]._store.write_inventories(agents)
+
+
 # ############################################################################
 # ###                        GENERATIVE AGENT CLASS                        ###
 # ############################################################################
 
 class GenerativeAgent: 
-  def __init__(self, population: str, agent_id: str):
+  def __init__(self, population: str, agent_id: str, load_mode: str = "full", 
+               embedding_mode: str = EMBEDDING_STORAGE_MODE, 
+               store: Optional[AgentStore] = None):
+    """
+    Loads a generative agent from the agent store. 
+
+    Parameters:
+      population: The population the agent belongs to.
+      agent_id: The id of the agent.
+      load_mode: How much of the agent's storage to read up front. 
+        "full" reads everything. "lazy" reads meta, scratch and inventory, 
+        and defers the memory stream (nodes.json and embeddings.json) until 
+        it is first accessed. "profile" only reads meta and scratch; the 
+        memory stream, inventory and plan are all loaded on first access. 
+      embedding_mode: In-memory (and on-save) storage of the memory stream 
+        embeddings: "float64", "float16" or "int8". Embeddings stored in 
+        another format are converted on load. 
+      store: The AgentStore to read from and save to (default: the one 
+        selected by AGENT_STORE). 
+    """
     self.population: str
     self.id: str
     self.forked_population: str
@@ -28,47 +105,74 @@ class GenerativeAgent:
     self.working_memory: WorkingMemory
     self.plan: Plan
 
-    # The location of the population folder for the agent. 
-    agent_folder = f"{POPULATIONS_DIR}/{population}/{agent_id}"
+    if load_mode not in AGENT_LOAD_MODES: 
+      raise ValueError(f"Unknown load_mode '{load_mode}'. "
+                       f"Expected one of {AGENT_LOAD_MODES}.")
+
+    self._store = store or get_agent_store()
 
-    # We stop the process if the agent storage folder already exists. 
-    if not check_if_file_exists(f"{agent_folder}/scratch.json"):
+    # We stop the process if the agent does not exist in the store. 
+    meta = self._store.read_meta(self, population, agent_id)
+    if meta is None: 
       print ("Generative agent does not exist in the current location.")
       return 
     
     # Loading the agent's memories. 
-    with open(f"{agent_folder}/meta.json") as json_file:
-      meta = json.load(json_file)
-    with open(f"{agent_folder}/scratch.json") as json_file:
-      scratch = json.load(json_file)
-    with open(f"{agent_folder}/memory_stream/embeddings.json") as json_file:
-      embeddings = json.load(json_file)
-    with open(f"{agent_folder}/memory_stream/nodes.json") as json_file:
-      nodes = json.load(json_file)
-    
-    # Loading inventory data
-    inventory_data = {"items": [], "records": []}
-    if check_if_file_exists(f"{agent_folder}/inventory.json"):
-      with open(f"{agent_folder}/inventory.json") as json_file:
-        inventory_data = json.load(json_file)
+    scratch = self._store.read_scratch(self, population, agent_id)
 
     self.population = meta["population"] 
     self.id = meta["id"] 
     self.forked_population = meta["population"] 
     self.forked_id = meta["id"]
     self.scratch = Scratch(scratch)
-    self.memory_stream = MemoryStream(nodes, embeddings)
-    self.inventory = Inventory(inventory_data.get("items", []), inventory_data.get("records", []), inventory_data.get("production_plans", []))
-    self.plan = Plan(inventory_data.get("production_plans", []))
     self.working_memory = WorkingMemory()
+
+    if load_mode == "full": 
+      embeddings = self._store.read_embeddings(self, population, agent_id, embedding_mode)
+      nodes = self._store.read_nodes(self, population, agent_id)
+      self.memory_stream = MemoryStream(nodes, embeddings, embedding_mode)
+    else: 
+      self.memory_stream = LazyMemoryStream(
+        lambda: self._store.read_nodes(self, population, agent_id), 
+        lambda: self._store.read_embeddings(self, population, agent_id, embedding_mode))
+
+    # In "profile" mode the inventory and plan are loaded by __getattr__ the
+    # first time either of them is accessed. 
+    if load_mode == "profile": 
+      self._pending_inventory = (population, agent_id)
+    else: 
+      self._load_inventory(population, agent_id)
     
     print (f"Loaded {agent_id}:{population}")
 
+  def __getattr__(self, name: str) -> Any: 
+    # Only reached when the regular attribute lookup fails, i.e., for the 
+    # components that a "profile" load deferred. 
+    if name in ("inventory", "plan") and "_pending_inventory" in self.__dict__: 
+      self._load_inventory(*self.__dict__.pop("_pending_inventory"))
+      return getattr(self, name)
+    raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+  def _load_inventory(self, population: str, agent_id: str) -> None: 
+    """
+    Loads the inventory (including production plans) from the agent store. 
+
+    Parameters:
+      population: The population the agent is stored under. 
+      agent_id: The id the agent is stored under. 
+    Returns: 
+      None
+    """
+    inventory_data = self._store.read_inventory(self, population, agent_id)
+
+    self.inventory = Inventory(inventory_data.get("items", []), inventory_data.get("records", []), inventory_data.get("production_plans", []))
+    self.plan = Plan(inventory_data.get("production_plans", []))
+
   def initialize(self, population: str, agent_id: str) -> None: 
     """
-    Initializes the agent storage folder and its components files init. The 
-    folder that is created contains everything that a generative agent needs
-    to contain, from its memory stream to scratch memory.  
+    Initializes the agent storage and its components. The storage that is 
+    created contains everything that a generative agent needs to contain, 
+    from its memory stream to scratch memory.  
 
     Parameters:
       population: The current population.
@@ -76,46 +180,10 @@ class GenerativeAgent:
     Returns: 
       None
     """
-    # The location of the population folder for the agent. 
-    agent_folder = f"{POPULATIONS_DIR}/{population}/{agent_id}"
-
-    # We stop the process if the agent storage folder already exists. 
-    if check_if_file_exists(f"{agent_folder}/meta.json"):
+    # We stop the process if the agent storage already exists. 
+    if not self._store.initialize(self, population, agent_id): 
       print ("Init not run as the agent storage folder already exists")
 
-    else: 
-      # Creating the agent storage folder.
-      print (f"Initializing {agent_id}:{population}'s agent storage.")
-      create_folder_if_not_there(agent_folder)
-      print (f"-- Created {agent_folder}")
-      create_folder_if_not_there(f"{agent_folder}/memory_stream")
-      print (f"-- Created {agent_folder}/memory_stream")
-
-      # Initializing meta file
-      with open(f"{agent_folder}/meta.json", "w") as file:
-        meta = {"population": population, 
-                "id": agent_id,
-                "forked_population": population,
-                "forked_id": agent_id}
-        json.dump(meta, file, indent=2)  
-
-      # Initializing scratch
-      with open(f"{agent_folder}/scratch.json", "w") as file:
-        scratch = Scratch().package()
-        json.dump(scratch, file, indent=2)  
-
-      # Initializing embeddings
-      with open(f"{agent_folder}/memory_stream/embeddings.json", "w") as file:
-        json.dump({}, file, indent=2)  
-
-      # Initializing nodes
-      with open(f"{agent_folder}/memory_stream/nodes.json", "w") as file:
-        json.dump([], file, indent=2)      
-
-      # Initializing inventory
-      with open(f"{agent_folder}/inventory.json", "w") as file:
-        json.dump({"items": [], "records": [], "production_plans": []}, file, indent=2)
-
     # Initialize with empty data
     self.population = population
     self.id = agent_id
@@ -166,36 +234,46 @@ class GenerativeAgent:
     self.population = save_population
     self.id = save_id
 
-    # Name of the agent and the current save location. 
-    storage = f"{POPULATIONS_DIR}/{save_population}/{save_id}"
-    create_folder_if_not_there(storage)
-    create_folder_if_not_there(f"{storage}/memory_stream")
-    
-    # Saving the agent's memory stream. This includes saving the embeddings 
-    # as well as the nodes. 
-    with open(f"{storage}/memory_stream/embeddings.json", "w") as json_file:
-      json.dump(self.memory_stream.embeddings, 
-                json_file)
-    with open(f"{storage}/memory_stream/nodes.json", "w") as json_file:
-      json.dump([node.package() for node in self.memory_stream.seq_nodes], 
-                json_file, indent=2)
-
-    # Saving the agent's scratch memories. 
-    with open(f"{storage}/scratch.json", "w") as json_file:
-      agent_scratch_summary = self.scratch.package()
-      json.dump(agent_scratch_summary, json_file, indent=2)
-
-    # Saving the agent's inventory (including production plans).
-    with open(f"{storage}/inventory.json", "w") as json_file:
-      inventory_summary = self.inventory.package()
-      # Sync production plans from Plan module to inventory
-      inventory_summary["production_plans"] = self.plan.package()
-      json.dump(inventory_summary, json_file, indent=2)
-
-    # Saving the agent's meta information. 
-    with open(f"{storage}/meta.json", "w") as json_file:
-      agent_meta_summary = self.package()
-      json.dump(agent_meta_summary, json_file, indent=2)
+    self._store.write(self, save_population, save_id)
+
+  def save_snapshot(self, folder: str) -> None: 
+    """
+    Writes a copy of the agent's storage to folder, in the agent bank folder 
+    layout whatever the agent store, e.g. for a simulation checkpoint. 
+    Unlike save(), the agent keeps its population, id and storage location. 
+
+    Parameters:
+      folder: The folder to write the agent's files to. 
+    Returns: 
+      None
+    """
+    write_agent_folder(self, folder)
+
+  def package_inventory(self) -> Dict[str, Any]: 
+    """
+    Packaging the agent's inventory, with the production plans synced from 
+    the Plan module, for saving. 
+
+    Parameters:
+      None
+    Returns: 
+      packaged dictionary
+    """
+    inventory_summary = self.inventory.package()
+    inventory_summary["production_plans"] = self.plan.package()
+    return inventory_summary
+
+  def save_inventory(self) -> None: 
+    """
+    Saves only the inventory and scratch of the agent, in place. Much cheaper 
+    than save() since the memory stream is not rewritten. 
+
+    Parameters:
+      None
+    Returns: 
+      None
+    """
+    save_inventories([self])
 
   def remember(self, content: str, time_step: int = 0) -> None: 
     """
@@ -209,6 +287,18 @@ class GenerativeAgent:
     """
     self.memory_stream.remember(content, time_step)
 
+  def remember_all(self, contents: List[str], time_step: int = 0) -> None: 
+    """
+    Add many observations to the memory stream with batched importance 
+    scoring and embedding (see MemoryStream.remember_all). 
+
+    Parameters:
+      contents: The contents of the memory records, in order. 
+    Returns: 
+      None
+    """
+    self.memory_stream.remember_all(contents, time_step)
+
   def reflect(self, 
               anchor: str, 
               reflection_count: int = 5, 
@@ -337,32 +427,44 @@ class GenerativeAgent:
     """
     return self.plan.execute_production_plan(self, plan, time_step)
 
-  def get_items_to_produce_from_sales(self, max_items: int = 5) -> List[str]:
+  def get_items_to_produce_from_sales(self, max_items: int = 5, time_step: Optional[int] = None) -> List[str]:
     """
     Get items to produce based on recent sales activity.
 
     Parameters:
         max_items: Maximum number of items to return (default 5)
+        time_step: Current time step, for the demand forecast
 
     Returns:
         List of item names from recent sales, up to max_items
     """
-    return self.plan.get_items_to_produce(self, max_items)
+    return self.plan.get_items_to_produce(self, max_items, time_step)
 
-  def create_production_plans_for_recent_sales(self, time_step: int = 0, max_items: int = 5) -> List[Dict[str, Any]]:
+  def create_production_plans_for_recent_sales(self, time_step: int = 0, max_items: int = 5, 
+                                               items: Optional[List[str]] = None, 
+                                               executor: Optional[Executor] = None, 
+                                               batched: bool = PRODUCTION_PLANNING_BATCHED, 
+                                               forecast_mode: Optional[str] = PRODUCTION_FORECAST_MODE) -> List[Dict[str, Any]]:
     """
     Create production plans for items based on recent sales activity.
 
     Parameters:
         time_step: Current time step
         max_items: Maximum number of items to plan for
+        items: Plan only for these items instead of the recent sales
+        executor: Plan the items concurrently on this executor
+        batched: Plan every item with one LLM prompt
+        forecast_mode: "prior", "only" or None (see Plan)
 
     Returns:
         List of production plan dictionaries
     """
-    return self.plan.create_production_plans_for_recent_sales(self, time_step, max_items)
+    return self.plan.create_production_plans_for_recent_sales(self, time_step, max_items, items, executor, batched, 
+                                                              forecast_mode)
 
-  def get_markov_buying_interest_scores(self, other_agents: List[str], temperature: float = 10.0) -> Dict[str, float]:
+  def get_markov_buying_interest_scores(self, other_agents: List[str], temperature: float = 10.0,
+                                        batched: bool = MARKOV_SCORING_BATCHED,
+                                        token_budget: int = MARKOV_SCORING_TOKEN_BUDGET) -> Dict[str, float]:
     """
     Apply markov_probs_v1.txt scoring system to evaluate buying interest in other agents.
     Returns a probability distribution using softmax.
@@ -370,12 +472,31 @@ class GenerativeAgent:
     Parameters:
       other_agents: List of other agent names to score
       temperature: Temperature parameter for softmax (higher = more uniform, lower = more peaked)
+      batched: Score all agents in one prompt per token_budget chunk instead of one prompt each
+      token_budget: Estimated prompt tokens per batched request
     Returns:
       Dict mapping agent names to probabilities (sum to 1.0)
     """
+    raw_scores = self.get_markov_buying_interest_raw_scores(other_agents, batched, token_budget)
+    return buying_interest_probabilities(raw_scores, temperature)
+
+  def get_markov_buying_interest_raw_scores(self, other_agents: List[str], batched: bool = MARKOV_SCORING_BATCHED,
+                                            token_budget: int = MARKOV_SCORING_TOKEN_BUDGET) -> Dict[str, float]:
+    """
+    Raw 0-100 buying interest scores of other agents, before the softmax of 
+    get_markov_buying_interest_scores. Agents that cannot be scored get a 
+    neutral 50.
+
+    Parameters:
+      other_agents: List of other agent names to score
+      batched: One prompt per token_budget chunk listing every agent 
+        (markov_probs_batch_v1.txt) instead of one prompt per agent 
+        (markov_probs_v1.txt)
+      token_budget: Estimated prompt tokens per batched request
+    Returns:
+      Dict mapping agent names to scores
+    """
     from simulation_engine.gpt_structure import gpt_request
-    import math
-    import json
     
     # Get agent persona information
     persona_info = f"{self.scratch.get_fullname()}\n"
@@ -383,74 +504,69 @@ class GenerativeAgent:
     persona_info += f"Political Ideology: {self.scratch.political_ideology}\n"
     persona_info += f"Self Description: {self.scratch.self_description}\n"
     persona_info += f"Fact Sheet: {self.scratch.fact_sheet}\n"
+
+    # Relevant memories about every agent, in one retrieval pass
+    retrieved_memories = self.memory_stream.retrieve(list(other_agents), 0, n_count=5) if other_agents else {}
+    memories_texts = {}
+    for agent_name in other_agents:
+      if retrieved_memories.get(agent_name):
+        memories_texts[agent_name] = "\n".join([f"Memory: {mem.content}" for mem in retrieved_memories[agent_name]])
+      else:
+        memories_texts[agent_name] = "No specific memories about this character."
     
     # Load the markov probability prompt template
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    template_path = os.path.join(
-      project_root,
-      "simulation_engine",
-      "prompt_template",
-      "generative_agent",
-      "interaction",
-      "utternace",
-      "markov_probs_v1.txt",
-    )
-    with open(template_path, "r") as f:
+    template_dir = f"{LLM_PROMPT_DIR}/generative_agent/interaction/utternace"
+    template_name = "markov_probs_batch_v1.txt" if batched else "markov_probs_v1.txt"
+    with open(f"{template_dir}/{template_name}", "r") as f:
       prompt_template = f.read()
-    
-    # Evaluate each agent one at a time
+
     raw_scores = {}
-    
-    for agent_name in other_agents:
-      # Get relevant memories about this specific agent
-      retrieved_memories = self.memory_stream.retrieve([agent_name], 0, n_count=5)
-      
-      if agent_name in retrieved_memories and retrieved_memories[agent_name]:
-        memories_text = "\n".join([f"Memory: {mem.content}" for mem in retrieved_memories[agent_name]])
-      else:
-        memories_text = "No specific memories about this character."
-              
-      # Format the prompt for this specific agent
-      prompt = prompt_template.replace("!<INPUT 0>!", persona_info)
-      prompt = prompt.replace("!<INPUT 1>!", agent_name)
-      prompt = prompt.replace("!<INPUT 2>!", memories_text)
-      
-      # Get response from LLM for this agent
-      try:
-        response = gpt_request(prompt)
-        
-        # Parse JSON response
-        score_data = json.loads(response)
-        raw_scores[agent_name] = score_data.get("score", 50)  # Default to neutral if missing
+    if not batched:
+      # Evaluate each agent one at a time
+      for agent_name in other_agents:
+        # Format the prompt for this specific agent
+        prompt = prompt_template.replace("!<INPUT 0>!", persona_info)
+        prompt = prompt.replace("!<INPUT 1>!", agent_name)
+        prompt = prompt.replace("!<INPUT 2>!", memories_texts[agent_name])
         
+        # Get response from LLM for this agent
+        try:
+          response = gpt_request(prompt)
+          
+          # Parse JSON response
+          score_data = json.loads(response)
+          raw_scores[agent_name] = score_data.get("score", 50)  # Default to neutral if missing
+          
+        except Exception as e:
+          print(f"Error getting score for {agent_name} from {self.scratch.get_fullname()}: {e}")
+          raw_scores[agent_name] = 50  # Neutral fallback
+      return raw_scores
+
+    # Evaluate all agents together, in chunks that fit the token budget
+    header = prompt_template.replace("!<INPUT 0>!", persona_info)
+    blocks = [f"### {agent_name}\n{memories_texts[agent_name]}\n" for agent_name in other_agents]
+    budget = max(token_budget - estimate_tokens(header), 1)
+    for chunk in chunk_by_token_budget(list(range(len(other_agents))), blocks, budget):
+      names = [other_agents[i] for i in chunk]
+      prompt = header.replace("!<INPUT 1>!", "\n".join(blocks[i] for i in chunk))
+      scores = {}
+      try:
+        # Room for one JSON entry per agent in the answer
+        response = gpt_request(prompt, max_tokens=max(MAX_TOKENS_CONV, 20 * len(names)))
+        score_data = extract_first_json_dict(response) or {}
+        scores = score_data.get("scores", score_data)
+        if not isinstance(scores, dict):
+          scores = {}
       except Exception as e:
-        print(f"Error getting score for {agent_name} from {self.scratch.get_fullname()}: {e}")
-        raw_scores[agent_name] = 50  # Neutral fallback
-    
-    # Apply softmax to convert scores to probability distribution
-    # First normalize scores to reduce extreme differences
-    scores_list = list(raw_scores.values())
-    mean_score = sum(scores_list) / len(scores_list)
-    
-    # Center scores around mean to reduce variance
-    centered_scores = {}
-    for agent, score in raw_scores.items():
-      centered_scores[agent] = score - mean_score
-    
-    # Apply softmax with temperature scaling
-    exp_scores = {}
-    for agent, centered_score in centered_scores.items():
-      exp_scores[agent] = math.exp(centered_score / temperature)
-    
-    # Calculate sum for normalization
-    total_exp = sum(exp_scores.values())
-    
-    # Convert to probabilities
-    probabilities = {}
-    for agent, exp_score in exp_scores.items():
-      probabilities[agent] = exp_score / total_exp
-    
-    return probabilities
+        print(f"Error getting batched scores from {self.scratch.get_fullname()}: {e}")
+      for agent_name in names:
+        try:
+          raw_scores[agent_name] = float(scores[agent_name])
+        except (KeyError, TypeError, ValueError):
+          if scores:
+            print(f"No score for {agent_name} from {self.scratch.get_fullname()}, using 50")
+          raw_scores[agent_name] = 50  # Neutral fallback
+    return raw_scores
 
   def Act(self, conversation_id: str, curr_dialogue: List[List[str]], context: str = "", time_step: int = 0) -> str:
     """
@@ -460,6 +576,7 @@ class GenerativeAgent:
       conversation_id: Unique identifier for this conversation session
       curr_dialogue: List of [speaker, message] pairs
       context: Context for the conversation
+      time_step: Turn index within the conversation (not the simulation step)
     Returns: 
       Generated response string
     """
@@ -0,0 +1,82 @@
+from typing import Dict, Iterable, Optional
+import math
+from simulation_engine.settings import PRODUCTION_FORECAST_ALPHA, PRODUCTION_FORECAST_HORIZON, PRODUCTION_FORECAST_WINDOW
+
+class DemandForecast:
+    """
+    Sales forecast of one item: exponentially smoothed sales velocity (units
+    per step) projected over the next horizon steps, against current stock.
+    """
+    __slots__ = ("item_name", "velocity", "demand", "stock", "horizon")
+
+    def __init__(self, item_name: str, velocity: float, stock: float, horizon: int):
+        self.item_name = item_name
+        self.velocity = velocity
+        self.demand = velocity * horizon
+        self.stock = stock
+        self.horizon = horizon
+
+    @property
+    def covered(self) -> bool:
+        """Whether current stock covers the forecast demand."""
+        return self.stock >= self.demand
+
+    @property
+    def suggested_quantity(self) -> int:
+        """Units to produce to cover the forecast demand."""
+        return max(0, math.ceil(self.demand - self.stock))
+
+    def describe(self) -> str:
+        return (f"about {self.velocity:.2f} units sold per step, {self.demand:.1f} units expected over the next "
+                f"{self.horizon} steps; suggested production {self.suggested_quantity} units")
+
+
+def smoothed_velocity(units_by_step: Dict[int, float], end_step: int, alpha: float) -> float:
+    """
+    Simple exponential smoothing of units sold per step, from the first step
+    with a sale to end_step. Steps without sales count as 0 units.
+    """
+    level = 0.0
+    previous = None
+    for step in sorted(units_by_step):
+        if previous is not None:
+            # Steps in between sold nothing
+            level *= (1 - alpha) ** (step - previous - 1)
+        level = alpha * units_by_step[step] + (1 - alpha) * level
+        previous = step
+    if previous is not None and end_step > previous:
+        level *= (1 - alpha) ** (end_step - previous)
+    return level
+
+
+def forecast_demand(agent, time_step: Optional[int] = None, item_names: Optional[Iterable[str]] = None,
+                    alpha: float = PRODUCTION_FORECAST_ALPHA, horizon: int = PRODUCTION_FORECAST_HORIZON,
+                    window: int = PRODUCTION_FORECAST_WINDOW) -> Dict[str, DemandForecast]:
+    """
+    Forecast demand from the agent's sell_item records of the last window steps.
+
+    Parameters:
+        agent: The GenerativeAgent instance
+        time_step: Current time step (never earlier than the latest sale)
+        item_names: Items to forecast (default: every item sold in the window)
+        alpha: Smoothing factor; higher values weigh recent sales more
+        horizon: Steps of demand to cover (the next production cycle)
+        window: Steps of sales history considered
+
+    Returns:
+        {item name: DemandForecast}
+    """
+    latest = agent.inventory.get_records("sell_item", last_n=1)
+    latest_step = int(latest[0].time_step) if latest else 0
+    time_step = latest_step if time_step is None else max(int(time_step), latest_step)
+
+    units_by_item: Dict[str, Dict[int, float]] = {}
+    for record in agent.inventory.get_records("sell_item", start_step=time_step - window + 1):
+        units = units_by_item.setdefault(record.item_name, {})
+        step = int(record.time_step)
+        units[step] = units.get(step, 0.0) + abs(record.quantity)
+
+    names = list(item_names) if item_names is not None else list(units_by_item)
+    return {name: DemandForecast(name, smoothed_velocity(units_by_item.get(name, {}), time_step, alpha),
+                                 agent.inventory.get_item_quantity(name), horizon)
+            for name in names}
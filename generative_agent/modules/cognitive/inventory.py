@@ -1,7 +1,14 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Tuple, Union
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+import itertools
 import json
+import sys
 
 class InventoryItem:
+    __slots__ = ("name", "quantity", "value", "production_cost", "description", "created", "last_modified")
+
     def __init__(self, item_dict: Dict[str, Any]):
         self.name = item_dict["name"]
         self.quantity = item_dict["quantity"]
@@ -31,14 +38,19 @@ class InventoryItem:
         }
 
 class InventoryRecord:
+    # Records are the bulk of a long-running agent's inventory: no per-instance
+    # __dict__, and the few distinct action / item / partner strings are
+    # interned so every record shares them instead of holding its own copy.
+    __slots__ = ("record_id", "action", "item_name", "quantity", "time_step", "description", "trade_partner")
+
     def __init__(self, record_dict: Dict[str, Any]):
         self.record_id = record_dict["record_id"]
-        self.action = record_dict["action"]  # "add", "remove", "trade_failed", "receive_payment", "sell_item", "make_payment", "buy_item"
-        self.item_name = record_dict["item_name"]
+        self.action = sys.intern(record_dict["action"])  # "add", "remove", "trade_failed", "receive_payment", "sell_item", "make_payment", "buy_item"
+        self.item_name = sys.intern(record_dict["item_name"])
         self.quantity = record_dict["quantity"]
         self.time_step = record_dict["time_step"]
         self.description = record_dict.get("description", "")
-        self.trade_partner = record_dict.get("trade_partner", "")
+        self.trade_partner = sys.intern(record_dict.get("trade_partner", ""))
 
     def package(self) -> Dict[str, Any]:
         return {
@@ -51,26 +63,103 @@ class InventoryRecord:
             "trade_partner": self.trade_partner
         }
 
+class RecordIndex:
+    """
+    Positions (into Inventory.records) of the records sharing one key, kept
+    both in insertion order and sorted by time_step so that history and
+    time-range lookups cost O(log n + result) instead of a full scan.
+    Records may be appended out of step order (e.g. when a checkpoint is
+    restored or a forked agent adds to its parent's records), hence the
+    separate sorted view.
+    """
+    __slots__ = ("positions", "sorted_steps", "sorted_positions")
+
+    def __init__(self):
+        self.positions = array("q")
+        self.sorted_steps = array("d")
+        self.sorted_positions = array("q")
+
+    def add(self, position: int, time_step: float):
+        self.positions.append(position)
+        if not self.sorted_steps or time_step >= self.sorted_steps[-1]:
+            self.sorted_steps.append(time_step)
+            self.sorted_positions.append(position)
+        else:
+            i = bisect_right(self.sorted_steps, time_step)
+            self.sorted_steps.insert(i, time_step)
+            self.sorted_positions.insert(i, position)
+
+    def select(self, start_step: Optional[float] = None, end_step: Optional[float] = None) -> List[int]:
+        """Positions in insertion order with start_step <= time_step <= end_step."""
+        if start_step is None and end_step is None:
+            return list(self.positions)
+        lo = 0 if start_step is None else bisect_left(self.sorted_steps, start_step)
+        hi = len(self.sorted_steps) if end_step is None else bisect_right(self.sorted_steps, end_step)
+        return sorted(self.sorted_positions[lo:hi])
+
+    def truncate(self, length: int):
+        """Drop every position >= length (used when records are rolled back)."""
+        del self.positions[bisect_left(self.positions, length):]
+        keep = [i for i, position in enumerate(self.sorted_positions) if position < length]
+        self.sorted_steps = array("d", (self.sorted_steps[i] for i in keep))
+        self.sorted_positions = array("q", (self.sorted_positions[i] for i in keep))
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+# Inventory versions are drawn from one process-wide counter, so a version
+# identifies a state of one particular inventory and can key caches that hold
+# several agents' inventories at once.
+_inventory_versions = itertools.count(1)
+
+
 class Inventory:
     def __init__(self, items_data: List[Dict[str, Any]] = None, records_data: List[Dict[str, Any]] = None, plans_data: List[Dict[str, Any]] = None):
         self.items: Dict[str, InventoryItem] = {}
         self.records: List[InventoryRecord] = []
         self.production_plans: List[Dict[str, Any]] = []
+        # Record indexes keyed by (action, item_name); None is the wildcard,
+        # so (action, None) covers every item and (None, item_name) every action.
+        self._record_index: Dict[Tuple[Optional[str], Optional[str]], RecordIndex] = {}
+        # Running aggregates, updated on every mutation instead of being
+        # recomputed from the items on each call.
+        self._total_value = 0.0
+        self._total_quantity = 0
+        # Derived views (items-with-values dict, prompt text) for the current
+        # version; cleared whenever the version changes.
+        self._cache: Dict[str, Any] = {}
+        self.version = next(_inventory_versions)
 
         if items_data:
             for item_data in items_data:
                 item = InventoryItem(item_data)
                 self.items[item.name] = item
+                self._total_value += item.get_total_value()
+                self._total_quantity += item.quantity
 
         if records_data:
             for record_data in records_data:
                 record = InventoryRecord(record_data)
+                self._index_record(len(self.records), record)
                 self.records.append(record)
 
         if plans_data:
             self.production_plans = plans_data.copy()
         
 
+    def _touch(self):
+        """Mark the inventory as changed: new version, derived views dropped."""
+        self.version = next(_inventory_versions)
+        self._cache.clear()
+
+    def _index_record(self, position: int, record: InventoryRecord):
+        for key in ((record.action, record.item_name), (record.action, None), (None, record.item_name)):
+            index = self._record_index.get(key)
+            if index is None:
+                index = self._record_index[key] = RecordIndex()
+            index.add(position, record.time_step)
+
     def _add_record(self, action: str, item_name: str, quantity: int, time_step: int, description: str = "", trade_partner: str = ""):
         record_dict = {
             "record_id": len(self.records),
@@ -82,10 +171,53 @@ class Inventory:
             "trade_partner": trade_partner
         }
         record = InventoryRecord(record_dict)
+        self._index_record(len(self.records), record)
         self.records.append(record)
+        self._touch()
+
+    def clear(self):
+        """Remove all items and records (production plans are kept)."""
+        self.items.clear()
+        self.records.clear()
+        self._record_index.clear()
+        self._total_value = 0.0
+        self._total_quantity = 0
+        self._touch()
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Capture the current items, record count and aggregates so that a
+        multi-step change (e.g. one side of a trade) can be undone with
+        rollback(). Records are append-only, so only their count is kept.
+        """
+        return {
+            "items": {name: item.package() for name, item in self.items.items()},
+            "record_count": len(self.records),
+            "total_value": self._total_value,
+            "total_quantity": self._total_quantity
+        }
+
+    def rollback(self, checkpoint: Dict[str, Any]):
+        """Restore the inventory to the state captured by checkpoint()."""
+        self.items = {name: InventoryItem(item_dict) for name, item_dict in checkpoint["items"].items()}
+        record_count = checkpoint["record_count"]
+        if len(self.records) > record_count:
+            del self.records[record_count:]
+            for key in list(self._record_index):
+                index = self._record_index[key]
+                index.truncate(record_count)
+                if not len(index):
+                    del self._record_index[key]
+        self._total_value = checkpoint["total_value"]
+        self._total_quantity = checkpoint["total_quantity"]
+        self._touch()
 
     def add_item(self, name: str, quantity: int, time_step: int, value: float = 0.0, production_cost: float = 0.0, description: str = ""):
+        self._add_item(name, quantity, time_step, value, production_cost, description)
+
+    def _add_item(self, name: str, quantity: int, time_step: int, value: float = 0.0, production_cost: float = 0.0, description: str = "", action: str = "add", trade_partner: str = ""):
         if name in self.items:
+            self._total_value -= self.items[name].get_total_value()
             # When adding to existing item, keep the existing value unless new value is provided
             if value > 0.0:
                 # Update the weighted average value
@@ -115,20 +247,28 @@ class Inventory:
             }
             self.items[name] = InventoryItem(item_dict)
 
-        self._add_record("add", name, quantity, time_step, description)
+        self._total_value += self.items[name].get_total_value()
+        self._total_quantity += quantity
+        self._add_record(action, name, quantity, time_step, description, trade_partner)
 
     def remove_item(self, name: str, quantity: int, time_step: int, description: str = "") -> bool:
+        return self._remove_item(name, quantity, time_step, description)
+
+    def _remove_item(self, name: str, quantity: int, time_step: int, description: str = "", action: str = "remove", trade_partner: str = "") -> bool:
         if name not in self.items:
             return False
         
         if self.items[name].quantity < quantity:
             return False
         
+        self._total_value -= self.items[name].get_total_value()
         self.items[name].quantity -= quantity
         self.items[name].last_modified = time_step
+        self._total_value += self.items[name].get_total_value()
+        self._total_quantity -= quantity
         
         
-        self._add_record("remove", name, quantity, time_step, description)
+        self._add_record(action, name, quantity, time_step, description, trade_partner)
         return True
 
     def trade_item(self, item_name: str, quantity: int, is_giving: bool, time_step: int, trade_partner: str = "", value: float = 0.0, description: str = "") -> bool:
@@ -146,17 +286,13 @@ class Inventory:
 
     def receive_payment(self, payment_amount: float, time_step: int, payer: str = "", description: str = ""):
         """Record receiving payment (typically digital cash)."""
-        self.add_item("digital cash", payment_amount, time_step, 1.0, 0.0, description)
-        self.records[-1].action = "receive_payment"
-        self.records[-1].trade_partner = payer
+        self._add_item("digital cash", payment_amount, time_step, 1.0, 0.0, description, "receive_payment", payer)
         return True
 
     def sell_item(self, item_name: str, quantity: int, time_step: int, buyer: str = "", price_per_unit: float = 0.0, description: str = "") -> bool:
         """Record selling an item (removes from inventory)."""
-        success = self.remove_item(item_name, quantity, time_step, description)
+        success = self._remove_item(item_name, quantity, time_step, description, "sell_item", buyer)
         if success:
-            self.records[-1].action = "sell_item"
-            self.records[-1].trade_partner = buyer
             # Also record receiving payment if price is specified
             if price_per_unit > 0:
                 total_payment = quantity * price_per_unit
@@ -165,17 +301,11 @@ class Inventory:
 
     def make_payment(self, payment_amount: float, time_step: int, recipient: str = "", description: str = "") -> bool:
         """Record making a payment (removes digital cash from inventory)."""
-        success = self.remove_item("digital cash", payment_amount, time_step, description)
-        if success:
-            self.records[-1].action = "make_payment"
-            self.records[-1].trade_partner = recipient
-        return success
+        return self._remove_item("digital cash", payment_amount, time_step, description, "make_payment", recipient)
 
     def buy_item(self, item_name: str, quantity: int, time_step: int, seller: str = "", price_per_unit: float = 0.0, production_cost: float = 0.0, description: str = ""):
         """Record buying an item (adds to inventory)."""
-        self.add_item(item_name, quantity, time_step, price_per_unit, production_cost, description)
-        self.records[-1].action = "buy_item"
-        self.records[-1].trade_partner = seller
+        self._add_item(item_name, quantity, time_step, price_per_unit, production_cost, description, "buy_item", seller)
         # Also record making payment if price is specified
         if price_per_unit > 0:
             total_payment = quantity * price_per_unit
@@ -208,87 +338,102 @@ class Inventory:
         return {name: item.quantity for name, item in self.items.items()}
 
     def get_all_items_with_values(self) -> Dict[str, Dict[str, float]]:
-        """Get all items with their quantities and values."""
-        return {name: {
-            "quantity": item.quantity,
-            "value_per_unit": item.value,
-            "production_cost_per_unit": item.production_cost,
-            "total_value": item.get_total_value(),
-            "total_production_cost": item.get_total_production_cost()
-        } for name, item in self.items.items()}
+        """Get all items with their quantities and values (a copy of the view cached per version)."""
+        if "items_with_values" not in self._cache:
+            self._cache["items_with_values"] = {name: {
+                "quantity": item.quantity,
+                "value_per_unit": item.value,
+                "production_cost_per_unit": item.production_cost,
+                "total_value": item.get_total_value(),
+                "total_production_cost": item.get_total_production_cost()
+            } for name, item in self.items.items()}
+        return {name: dict(values) for name, values in self._cache["items_with_values"].items()}
+
+    def get_items_text(self) -> str:
+        """The items-with-values view rendered for prompts (cached per version)."""
+        if "items_text" not in self._cache:
+            self._cache["items_text"] = str(self.get_all_items_with_values())
+        return self._cache["items_text"]
 
     def get_total_items_count(self) -> int:
-        return sum(item.quantity for item in self.items.values())
+        return self._total_quantity
 
     def get_total_inventory_value(self) -> float:
         """Get the total value of entire inventory."""
-        return sum(item.get_total_value() for item in self.items.values())
+        return self._total_value
 
     def get_unique_items_count(self) -> int:
         return len(self.items)
 
-    def get_trade_history(self, item_name: str = None) -> List[Dict[str, Any]]:
+    def get_records(self, actions: Union[str, Iterable[str], None] = None, item_name: str = None, start_step: float = None, end_step: float = None, last_n: int = None) -> List[InventoryRecord]:
+        """
+        Get records by action(s) and/or item, served from the record indexes.
+
+        Parameters:
+            actions: An action or list of actions (None for any action)
+            item_name: Only records for this item (None for any item)
+            start_step: Only records with time_step >= start_step
+            end_step: Only records with time_step <= end_step
+            last_n: Only the last n matching records
+
+        Returns:
+            Matching records in the order they were recorded
+        """
+        if actions is None and item_name is None:
+            if start_step is None and end_step is None:
+                selected = self.records
+            else:
+                selected = [record for record in self.records
+                            if (start_step is None or record.time_step >= start_step)
+                            and (end_step is None or record.time_step <= end_step)]
+            return list(selected[-last_n:] if last_n else selected)
+
+        if actions is None or isinstance(actions, str):
+            actions = [actions]
+        position_lists = []
+        for action in actions:
+            index = self._record_index.get((action, item_name))
+            if index is not None:
+                position_lists.append(index.select(start_step, end_step))
+        if not position_lists:
+            return []
+
+        positions = position_lists[0] if len(position_lists) == 1 else list(merge(*position_lists))
+        if last_n:
+            positions = positions[-last_n:]
+        return [self.records[position] for position in positions]
+
+    def count_records(self, action: str = None, item_name: str = None) -> int:
+        """Number of records for an action and/or item, without scanning."""
+        if action is None and item_name is None:
+            return len(self.records)
+        index = self._record_index.get((action, item_name))
+        return len(index) if index is not None else 0
+
+    def get_trade_history(self, item_name: str = None, start_step: float = None, end_step: float = None) -> List[Dict[str, Any]]:
         """Get history of trading transactions (now includes sell_item and buy_item)."""
-        trades = []
-        for record in self.records:
-            if record.action in ["sell_item", "buy_item"]:
-                if item_name is None or record.item_name == item_name:
-                    trades.append(record.package())
-        return trades
+        return [record.package() for record in self.get_records(["sell_item", "buy_item"], item_name, start_step, end_step)]
     
-    def get_failed_trade_history(self, item_name: str = None) -> List[Dict[str, Any]]:
+    def get_failed_trade_history(self, item_name: str = None, start_step: float = None, end_step: float = None) -> List[Dict[str, Any]]:
         """Get history of failed trade attempts."""
-        failed_trades = []
-        for record in self.records:
-            if record.action == "trade_failed":
-                if item_name is None or record.item_name == item_name:
-                    failed_trades.append(record.package())
-        return failed_trades
+        return [record.package() for record in self.get_records("trade_failed", item_name, start_step, end_step)]
     
-    def get_payment_history(self, item_name: str = None) -> List[Dict[str, Any]]:
+    def get_payment_history(self, item_name: str = None, start_step: float = None, end_step: float = None) -> List[Dict[str, Any]]:
         """Get history of payments (both made and received)."""
-        payments = []
-        for record in self.records:
-            if record.action in ["receive_payment", "make_payment"]:
-                if item_name is None or record.item_name == item_name:
-                    payments.append(record.package())
-        return payments
+        return [record.package() for record in self.get_records(["receive_payment", "make_payment"], item_name, start_step, end_step)]
     
-    def get_sales_history(self, item_name: str = None) -> List[Dict[str, Any]]:
+    def get_sales_history(self, item_name: str = None, start_step: float = None, end_step: float = None) -> List[Dict[str, Any]]:
         """Get history of sales transactions."""
-        sales = []
-        for record in self.records:
-            if record.action == "sell_item":
-                if item_name is None or record.item_name == item_name:
-                    sales.append(record.package())
-        return sales
+        return [record.package() for record in self.get_records("sell_item", item_name, start_step, end_step)]
     
-    def get_purchase_history(self, item_name: str = None) -> List[Dict[str, Any]]:
+    def get_purchase_history(self, item_name: str = None, start_step: float = None, end_step: float = None) -> List[Dict[str, Any]]:
         """Get history of purchase transactions."""
-        purchases = []
-        for record in self.records:
-            if record.action == "buy_item":
-                if item_name is None or record.item_name == item_name:
-                    purchases.append(record.package())
-        return purchases
+        return [record.package() for record in self.get_records("buy_item", item_name, start_step, end_step)]
     
     def get_transaction_summary(self) -> Dict[str, int]:
         """Get a summary count of all transaction types."""
-        summary = {
-            "sell_item": 0,
-            "buy_item": 0,
-            "receive_payment": 0,
-            "make_payment": 0,
-            "trade_failed": 0,
-            "add": 0,
-            "remove": 0
-        }
-        
-        for record in self.records:
-            if record.action in summary:
-                summary[record.action] += 1
-        
-        return summary
+        return {action: self.count_records(action) for action in
+                ["sell_item", "buy_item", "receive_payment", "make_payment", "trade_failed", "add", "remove"]}
     
     def add_production_plan(self, item_name: str, planned_quantity: int, reasoning: str, time_step: int):
         """Add a production plan to the inventory."""
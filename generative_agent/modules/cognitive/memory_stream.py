@@ -1,7 +1,9 @@
-from typing import List, Dict, Any, Tuple, Union, Optional
+from typing import List, Dict, Any, Tuple, Union, Optional, Callable
+from collections.abc import MutableMapping
 import random
 import string
 
+import numpy as np
 from numpy import dot
 from numpy.linalg import norm
 
@@ -99,15 +101,278 @@ def top_highest_x_values(d: Dict[Any, float], x: int) -> Dict[Any, float]:
   return top_v
 
 
+# ##############################################################################
+# ###                          EMBEDDING STORAGE                             ###
+# ##############################################################################
+
+EMBEDDING_MODES = ("float64", "float16", "int8")
+
+
+class QuantizedEmbeddings(MutableMapping): 
+  """
+  A content -> embedding mapping that holds the vectors in one contiguous 
+  float16 or int8 numpy block instead of Python lists of floats. 
+
+  int8 uses symmetric per-vector scalar quantization: each vector is stored 
+  as round(v / scale) with scale = max(|v|) / 127, and its scale is kept in a 
+  separate float32 array. Reading an item returns the dequantized float32 
+  vector, so callers (e.g., cos_sim) are unaffected. 
+  """
+  def __init__(self, 
+               mode: str, 
+               embeddings: Optional[Dict[str, List[float]]] = None):
+    if mode not in ("float16", "int8"): 
+      raise ValueError(f"Unsupported quantized embedding mode: {mode}")
+    self.mode = mode
+    self._index = dict()
+    self._vectors = None
+    self._scales = None
+    self._size = 0
+    if embeddings: 
+      self.update(embeddings)
+
+
+  @classmethod
+  def from_arrays(cls, 
+                  mode: str, 
+                  contents: List[str], 
+                  vectors: np.ndarray, 
+                  scales: Optional[np.ndarray] = None) -> "QuantizedEmbeddings": 
+    """
+    Build the mapping directly from already quantized arrays (e.g., the ones 
+    stored in embeddings.npz) without requantizing them. 
+    """
+    embeddings = cls(mode)
+    embeddings._index = {content: count for count, content in enumerate(contents)}
+    embeddings._vectors = np.ascontiguousarray(vectors)
+    if mode == "int8": 
+      embeddings._scales = np.ascontiguousarray(scales, dtype=np.float32)
+    embeddings._size = len(contents)
+    return embeddings
+
+
+  def _grow(self, dim: int) -> None: 
+    capacity = 0 if self._vectors is None else self._vectors.shape[0]
+    if self._size < capacity: 
+      return
+    new_capacity = max(16, capacity * 2)
+    dtype = np.int8 if self.mode == "int8" else np.float16
+    vectors = np.zeros((new_capacity, dim), dtype=dtype)
+    scales = np.zeros(new_capacity, dtype=np.float32)
+    if self._vectors is not None: 
+      vectors[:self._size] = self._vectors[:self._size]
+      if self._scales is not None: 
+        scales[:self._size] = self._scales[:self._size]
+    self._vectors = vectors
+    self._scales = scales if self.mode == "int8" else None
+
+
+  def _encode(self, row: int, vector: np.ndarray) -> None: 
+    if self.mode == "int8": 
+      scale = float(np.max(np.abs(vector))) / 127.0
+      if scale == 0: 
+        scale = 1.0
+      self._vectors[row] = np.round(vector / scale).astype(np.int8)
+      self._scales[row] = scale
+    else: 
+      self._vectors[row] = vector.astype(np.float16)
+
+
+  def __getitem__(self, content: str) -> np.ndarray: 
+    row = self._index[content]
+    vector = self._vectors[row].astype(np.float32)
+    if self.mode == "int8": 
+      vector *= self._scales[row]
+    return vector
+
+
+  def __setitem__(self, content: str, vector: List[float]) -> None: 
+    vector = np.asarray(vector, dtype=np.float32)
+    if content in self._index: 
+      row = self._index[content]
+    else: 
+      self._grow(vector.shape[0])
+      row = self._size
+      self._index[content] = row
+      self._size += 1
+    self._encode(row, vector)
+
+
+  def __delitem__(self, content: str) -> None: 
+    # Keep the block dense by moving the last row into the freed slot. 
+    row = self._index.pop(content)
+    last = self._size - 1
+    if row != last: 
+      last_content = next(k for k, v in self._index.items() if v == last)
+      self._vectors[row] = self._vectors[last]
+      if self._scales is not None: 
+        self._scales[row] = self._scales[last]
+      self._index[last_content] = row
+    self._size -= 1
+
+
+  def __iter__(self): 
+    return iter(self._index)
+
+
+  def __len__(self) -> int: 
+    return self._size
+
+
+  def __contains__(self, content: object) -> bool: 
+    return content in self._index
+
+
+  def nbytes(self) -> int: 
+    """Bytes held by the (used part of the) vector and scale blocks."""
+    if self._vectors is None: 
+      return 0
+    total = self._vectors[:self._size].nbytes
+    if self._scales is not None: 
+      total += self._scales[:self._size].nbytes
+    return total
+
+
+  def to_arrays(self) -> Dict[str, np.ndarray]: 
+    """The arrays that are written to embeddings.npz."""
+    contents = sorted(self._index, key=self._index.get)
+    arrays = {"mode": np.array(self.mode), 
+              "contents": np.array(contents, dtype=str)}
+    if self._vectors is None: 
+      arrays["vectors"] = np.zeros((0, 0), dtype=np.int8 if self.mode == "int8" else np.float16)
+    else: 
+      arrays["vectors"] = self._vectors[:self._size]
+    if self.mode == "int8": 
+      arrays["scales"] = (self._scales[:self._size] if self._scales is not None 
+                          else np.zeros(0, dtype=np.float32))
+    return arrays
+
+
+def convert_embeddings(embeddings: Union[Dict[str, List[float]], QuantizedEmbeddings], 
+                       mode: str) -> Union[Dict[str, List[float]], QuantizedEmbeddings]: 
+  """
+  Convert an embeddings mapping to the requested storage mode. 
+
+  Parameters:
+    embeddings: A plain dict of lists or a QuantizedEmbeddings mapping.
+    mode: One of EMBEDDING_MODES.
+  Returns: 
+    The embeddings in the requested mode (the same object if it already is).
+  """
+  if mode not in EMBEDDING_MODES: 
+    raise ValueError(f"Unknown embedding mode '{mode}'. "
+                     f"Expected one of {EMBEDDING_MODES}.")
+  if isinstance(embeddings, QuantizedEmbeddings): 
+    if embeddings.mode == mode: 
+      return embeddings
+    if mode == "float64": 
+      return {content: embeddings[content].astype(np.float64).tolist() 
+              for content in embeddings}
+    return QuantizedEmbeddings(mode, embeddings)
+  if mode == "float64": 
+    return embeddings
+  return QuantizedEmbeddings(mode, embeddings)
+
+
+def embeddings_file(memory_stream_folder: str) -> str: 
+  """
+  The embeddings file present in a memory_stream folder: embeddings.npz for 
+  quantized storage, embeddings.json otherwise. 
+  """
+  npz_path = f"{memory_stream_folder}/embeddings.npz"
+  if os.path.exists(npz_path): 
+    return npz_path
+  return f"{memory_stream_folder}/embeddings.json"
+
+
+def load_embeddings(memory_stream_folder: str, 
+                    mode: str = EMBEDDING_STORAGE_MODE
+                    ) -> Union[Dict[str, List[float]], QuantizedEmbeddings]: 
+  """
+  Read the embeddings stored in a memory_stream folder, in whichever format 
+  they were saved, and return them in the requested in-memory mode. 
+
+  Parameters:
+    memory_stream_folder: Path to the agent's memory_stream folder.
+    mode: One of EMBEDDING_MODES.
+  Returns: 
+    The embeddings mapping. 
+  """
+  path = embeddings_file(memory_stream_folder)
+  if path.endswith(".npz"): 
+    with np.load(path, allow_pickle=False) as data: 
+      stored_mode = str(data["mode"])
+      embeddings = QuantizedEmbeddings.from_arrays(
+        stored_mode, 
+        data["contents"].tolist(), 
+        data["vectors"], 
+        data["scales"] if "scales" in data else None)
+  else: 
+    with open(path) as json_file: 
+      embeddings = json.load(json_file)
+  return convert_embeddings(embeddings, mode)
+
+
+def save_embeddings(embeddings: Union[Dict[str, List[float]], QuantizedEmbeddings], 
+                    memory_stream_folder: str) -> None: 
+  """
+  Write the embeddings to a memory_stream folder: quantized embeddings go to 
+  embeddings.npz and full precision ones to embeddings.json. The file of the 
+  other format is removed so that the folder is never ambiguous. 
+
+  Parameters:
+    embeddings: The embeddings mapping to save.
+    memory_stream_folder: Path to the agent's memory_stream folder.
+  Returns: 
+    None
+  """
+  npz_path = f"{memory_stream_folder}/embeddings.npz"
+  json_path = f"{memory_stream_folder}/embeddings.json"
+  if isinstance(embeddings, QuantizedEmbeddings): 
+    with open(npz_path, "wb") as npz_file: 
+      np.savez(npz_file, **embeddings.to_arrays())
+    stale_path = json_path
+  else: 
+    with open(json_path, "w") as json_file:
+      json.dump(embeddings, json_file)
+    stale_path = npz_path
+  if os.path.exists(stale_path): 
+    os.remove(stale_path)
+
+
+def copy_embeddings(source_folder: str, target_folder: str) -> None: 
+  """
+  Copy the stored embeddings of one memory_stream folder to another verbatim 
+  (without parsing them), replacing whatever embeddings file was there. 
+
+  Parameters:
+    source_folder: memory_stream folder to copy from.
+    target_folder: memory_stream folder to copy to.
+  Returns: 
+    None
+  """
+  source_path = embeddings_file(source_folder)
+  target_name = os.path.basename(source_path)
+  for name in ("embeddings.json", "embeddings.npz"): 
+    if name != target_name and os.path.exists(f"{target_folder}/{name}"): 
+      os.remove(f"{target_folder}/{name}")
+  shutil.copyfile(source_path, f"{target_folder}/{target_name}")
+
+
 # ##############################################################################
 # ###                              CONCEPT NODE                              ###
 # ##############################################################################
 
 class ConceptNode: 
+  # Agents can accumulate tens of thousands of nodes; __slots__ drops the 
+  # per-instance __dict__. 
+  __slots__ = ("node_id", "node_type", "content", "importance", "created", 
+               "last_retrieved", "pointer_id")
+
   def __init__(self, node_dict: Dict[str, Any]): 
     # Loading the content of a memory node in the memory stream. 
     self.node_id = node_dict["node_id"]
-    self.node_type = node_dict["node_type"]
+    self.node_type = sys.intern(node_dict["node_type"])
     self.content = node_dict["content"]
     self.importance = node_dict["importance"]
     self.created = node_dict["created"]
@@ -143,16 +408,24 @@ class ConceptNode:
 class MemoryStream: 
   def __init__(self, 
                nodes: List[Dict[str, Any]], 
-               embeddings: Dict[str, List[float]]):
+               embeddings: Dict[str, List[float]], 
+               embedding_mode: str = EMBEDDING_STORAGE_MODE):
     # Loading the memory stream for the agent. 
-    self.seq_nodes = []
-    self.id_to_node = dict()
-    for node in nodes: 
-      new_node = ConceptNode(node)
-      self.seq_nodes += [new_node]
-      self.id_to_node[new_node.node_id] = new_node
+    self.seq_nodes, self.id_to_node = build_concept_nodes(nodes)
+    self.embeddings = convert_embeddings(embeddings, embedding_mode)
 
-    self.embeddings = embeddings
+
+  def is_materialized(self) -> Tuple[bool, bool]:
+    """
+    Whether the nodes and the embeddings of the memory stream are held in 
+    memory. A regular MemoryStream is always fully materialized. 
+
+    Parameters:
+      None
+    Returns: 
+      (nodes_loaded, embeddings_loaded)
+    """
+    return True, True
 
 
   def count_observations(self) -> int:
@@ -258,7 +531,7 @@ class MemoryStream:
       # if we are in a stateless mode. 
       if not stateless: 
         for n in master_nodes: 
-          n.retrieved_time_step = time_step
+          n.last_retrieved = time_step
         
       retrieved[focal_pt] = master_nodes
     
@@ -276,7 +549,8 @@ class MemoryStream:
                 node_type: str, 
                 content: str, 
                 importance: float, 
-                pointer_id: Optional[int]):
+                pointer_id: Optional[int], 
+                embedding: Optional[List[float]] = None):
     """
     Adding a new node to the memory stream. 
 
@@ -286,6 +560,7 @@ class MemoryStream:
       content: the str content of the memory record
       importance: int score of the importance score
       pointer_id: the str of the parent node 
+      embedding: the content's embedding, if it is already computed 
     Returns: 
       retrieved: A dictionary whose keys are a focal_pt query str, and whose
         values are a list of nodes that are retrieved for that query str. 
@@ -302,7 +577,9 @@ class MemoryStream:
 
     self.seq_nodes += [new_node]
     self.id_to_node[new_node.node_id] = new_node
-    self.embeddings[content] = get_text_embedding(content)
+    if embedding is None: 
+      embedding = get_text_embedding(content)
+    self.embeddings[content] = embedding
 
 
   def remember(self, content: str, time_step: int = 0):
@@ -310,6 +587,51 @@ class MemoryStream:
     self._add_node(time_step, "observation", content, score, None)
 
 
+  def remember_all(self, 
+                   contents: List[str], 
+                   time_step: int = 0, 
+                   importance_batch_size: int = IMPORTANCE_BATCH_SIZE, 
+                   embedding_batch_size: int = EMBEDDING_BATCH_SIZE): 
+    """
+    Add many observations at once (e.g., an agent's seed memories): they are 
+    scored importance_batch_size per importance prompt (batch_v1) and 
+    embedded embedding_batch_size per embedding request, instead of one 
+    importance and one embedding call per observation. 
+
+    Parameters:
+      contents: the str contents of the memory records, in order 
+      time_step: Current time_step 
+      importance_batch_size: observations per importance prompt 
+      embedding_batch_size: texts per embedding request 
+    Returns: 
+      None
+    """
+    scores = []
+    for start in range(0, len(contents), importance_batch_size): 
+      batch = contents[start:start + importance_batch_size]
+      batch_scores = generate_importance_score(batch)[0] if len(batch) > 1 else []
+      try: 
+        batch_scores = [float(score) for score in batch_scores]
+      except (TypeError, ValueError): 
+        batch_scores = []
+      if len(batch_scores) != len(batch): 
+        # The reply did not score every item: score them one by one. 
+        batch_scores = [generate_importance_score([content])[0][0] 
+                        for content in batch]
+      scores += batch_scores
+
+    missing = list(dict.fromkeys(content for content in contents 
+                                 if content not in self.embeddings))
+    embeddings = dict()
+    for start in range(0, len(missing), embedding_batch_size): 
+      batch = missing[start:start + embedding_batch_size]
+      embeddings.update(zip(batch, get_text_embeddings(batch)))
+
+    for content, score in zip(contents, scores): 
+      self._add_node(time_step, "observation", content, score, None, 
+                     embeddings.get(content, self.embeddings.get(content)))
+
+
   def reflect(self, 
               anchor: str, 
               reflection_count: int = 5, 
@@ -331,10 +653,104 @@ class MemoryStream:
     return reflections
 
 
+# ##############################################################################
+# ###                          LAZY MEMORY STREAM                            ###
+# ##############################################################################
+
+class LazyMemoryStream(MemoryStream): 
+  """
+  A MemoryStream that defers reading its nodes and embeddings until they are 
+  first accessed. The nodes and the embeddings are materialized separately, 
+  so that e.g., counting observations never parses the embeddings file. 
+
+  The loaders are zero-argument callables that return the same structures 
+  MemoryStream takes in its constructor (a list of node dicts and a dict of 
+  content to embedding). 
+  """
+  def __init__(self, 
+               nodes_loader: Callable[[], List[Dict[str, Any]]], 
+               embeddings_loader: Callable[[], Dict[str, List[float]]]):
+    self._nodes_loader = nodes_loader
+    self._embeddings_loader = embeddings_loader
+    self._seq_nodes = None
+    self._id_to_node = None
+    self._embeddings = None
+
+
+  def _load_nodes(self) -> None: 
+    self._seq_nodes, self._id_to_node = build_concept_nodes(
+      self._nodes_loader())
+    self._nodes_loader = None
+
+
+  def _load_embeddings(self) -> None: 
+    self._embeddings = self._embeddings_loader()
+    self._embeddings_loader = None
+
+
+  @property
+  def seq_nodes(self) -> List[ConceptNode]: 
+    if self._seq_nodes is None: 
+      self._load_nodes()
+    return self._seq_nodes
+
+  @seq_nodes.setter
+  def seq_nodes(self, value: List[ConceptNode]) -> None: 
+    self._seq_nodes = value
+    self._nodes_loader = None
+
+
+  @property
+  def id_to_node(self) -> Dict[int, ConceptNode]: 
+    if self._id_to_node is None: 
+      self._load_nodes()
+    return self._id_to_node
+
+  @id_to_node.setter
+  def id_to_node(self, value: Dict[int, ConceptNode]) -> None: 
+    self._id_to_node = value
+
+
+  @property
+  def embeddings(self) -> Dict[str, List[float]]: 
+    if self._embeddings is None: 
+      self._load_embeddings()
+    return self._embeddings
+
+  @embeddings.setter
+  def embeddings(self, value: Dict[str, List[float]]) -> None: 
+    self._embeddings = value
+    self._embeddings_loader = None
+
+
+  def is_materialized(self) -> Tuple[bool, bool]:
+    return self._seq_nodes is not None, self._embeddings is not None
+
+
 # ##############################################################################
 # ###                 HELPER FUNCTIONS FOR GENERATIVE AGENTS                 ###
 # ##############################################################################
 
+def build_concept_nodes(nodes: List[Dict[str, Any]]
+                        ) -> Tuple[List[ConceptNode], Dict[int, ConceptNode]]:
+  """
+  Turn a list of packaged node dicts into the sequential node list and the 
+  node_id lookup that a MemoryStream holds. 
+
+  Parameters:
+    nodes: List of packaged ConceptNode dicts (as stored in nodes.json)
+  Returns: 
+    (seq_nodes, id_to_node)
+  """
+  seq_nodes = []
+  id_to_node = dict()
+  for node in nodes: 
+    new_node = ConceptNode(node)
+    seq_nodes += [new_node]
+    id_to_node[new_node.node_id] = new_node
+  return seq_nodes, id_to_node
+
+
 def extract_recency(seq_nodes: List[ConceptNode]) -> Dict[int, float]:
   """
   Calculate the recency score for each node in the given sequence of 
@@ -1,10 +1,16 @@
 from typing import Dict, List, Any, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
 import json
 import os
 from simulation_engine.gpt_structure import gpt_request, generate_prompt
-from simulation_engine.settings import LLM_VERS, DEBUG
+from simulation_engine.llm_json_parser import extract_first_json_dict
+from simulation_engine.settings import (LLM_VERS, DEBUG, MAX_TOKENS_CONV, PRODUCTION_MAX_WORKERS,
+                                        PRODUCTION_PLANNING_BATCHED, PRODUCTION_FORECAST_MODE)
+from generative_agent.modules.cognitive.demand_forecast import DemandForecast, forecast_demand
 
 class ProductionPlan:
+    __slots__ = ("item_name", "planned_quantity", "reasoning", "created", "time_step")
+
     def __init__(self, plan_dict: Dict[str, Any]):
         self.item_name = plan_dict["item_name"]
         self.planned_quantity = plan_dict["planned_quantity"]
@@ -30,7 +36,8 @@ class Plan:
                 plan = ProductionPlan(plan_data)
                 self.production_plans.append(plan)
 
-    def create_production_plan_with_llm(self, agent, item_name: str, time_step: int) -> Optional[ProductionPlan]:
+    def create_production_plan_with_llm(self, agent, item_name: str, time_step: int, store: bool = True,
+                                        forecast: Optional[DemandForecast] = None) -> Optional[ProductionPlan]:
         """
         Create a production plan using LLM analysis of inventory history and memories.
 
@@ -38,6 +45,9 @@ class Plan:
             agent: The GenerativeAgent instance
             item_name: Name of the item to plan for
             time_step: Current time step
+            store: Add the plan to production_plans (concurrent callers add
+                their plans themselves, in item order)
+            forecast: Demand forecast of the item, given to the LLM as a prior
 
         Returns:
             ProductionPlan object or None if planning fails
@@ -113,7 +123,8 @@ class Plan:
             str(current_quantity),                   # INPUT 4: current inventory
             recent_sales_summary,                    # INPUT 5: recent sales
             memory_summary,                          # INPUT 6: relevant memories
-            str(max_affordable_units)                # INPUT 7: max affordable units
+            str(max_affordable_units),               # INPUT 7: max affordable units
+            forecast.describe() if forecast else "No forecast"  # INPUT 8: demand forecast
         ]
 
         prompt = generate_prompt(prompt_inputs, template_path)
@@ -147,7 +158,8 @@ class Plan:
 
         # Create and store the plan
         plan = ProductionPlan(plan_data)
-        self.production_plans.append(plan)
+        if store:
+            self.production_plans.append(plan)
 
         return plan
 
@@ -166,6 +178,170 @@ class Plan:
         #     self.production_plans.append(fallback_plan)
         #     return fallback_plan
 
+    def create_production_plans_with_llm(self, agent, item_names: List[str], time_step: int, store: bool = True,
+                                         forecasts: Optional[Dict[str, DemandForecast]] = None) -> List[ProductionPlan]:
+        """
+        Create production plans for several items with one LLM prompt.
+
+        The prompt states the agent's cash once and, per item, its stock,
+        production cost and sales and purchase summaries; memories come from
+        a single retrieval over every item plus the general business focal
+        points. Items the response leaves out, or whose quantity cannot be
+        read, are planned with their own prompt
+        (create_production_plan_with_llm).
+
+        Parameters:
+            agent: The GenerativeAgent instance
+            item_names: Names of the items to plan for
+            time_step: Current time step
+            store: Add the plans to production_plans
+            forecasts: Demand forecasts per item, given to the LLM as priors
+
+        Returns:
+            One ProductionPlan per item that could be planned, in item order
+        """
+        general_focal_points = ["production", "sales", "business"]
+        retrieved_memories = agent.memory_stream.retrieve(
+            list(dict.fromkeys(list(item_names) + general_focal_points)), time_step, n_count=10)
+
+        agent_name = agent.scratch.get_fullname()
+        available_cash = agent.get_inventory_quantity("digital cash")
+        all_items = agent.inventory.get_all_items_with_values()
+
+        forecasts = forecasts or {}
+        item_blocks = []
+        for item_name in item_names:
+            current_inventory = all_items.get(item_name, {})
+            production_cost_per_unit = current_inventory.get('production_cost_per_unit', 0.0)
+            max_affordable_units = int(available_cash / production_cost_per_unit) if production_cost_per_unit > 0 else 0
+            sales_history = agent.get_sales_history(item_name)
+            purchase_history = agent.get_purchase_history(item_name)
+            memories = [mem.content for mem in retrieved_memories.get(item_name, [])][:3]  # Top 3 memories
+            item_blocks.append(
+                f"### {item_name}\n"
+                f"- Production cost per unit: ${production_cost_per_unit:.2f}\n"
+                f"- Current inventory: {current_inventory.get('quantity', 0)} units\n"
+                f"- Recent sales: {f'{len(sales_history)} recent sales' if sales_history else 'No recent sales'}\n"
+                f"- Recent purchases: {f'{len(purchase_history)} recent purchases' if purchase_history else 'No recent purchases'}\n"
+                f"- Maximum affordable production: {max_affordable_units} units\n"
+                f"- Demand forecast: {forecasts[item_name].describe() if item_name in forecasts else 'No forecast'}\n"
+                f"- Relevant memories: {'; '.join(memories) if memories else 'No relevant memories'}\n")
+
+        general_memories = []
+        for focal_pt in general_focal_points:
+            for mem in retrieved_memories.get(focal_pt, []):
+                if mem.content not in general_memories:
+                    general_memories.append(mem.content)
+        memory_summary = "; ".join(general_memories[:3]) if general_memories else "No relevant memories"
+
+        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+        template_path = os.path.join(
+            project_root,
+            "simulation_engine",
+            "prompt_template",
+            "generative_agent",
+            "planning",
+            "production_plan_batch_v1.txt"
+        )
+
+        prompt_inputs = [
+            agent_name,                              # INPUT 0: agent name
+            f"{available_cash:.2f}",                 # INPUT 1: available cash
+            "\n".join(item_blocks),                  # INPUT 2: one block per item
+            memory_summary                           # INPUT 3: general business memories
+        ]
+
+        prompt = generate_prompt(prompt_inputs, template_path)
+        if DEBUG:
+            print('Prompt: ', prompt)
+
+        # Room for one JSON plan per item in the answer
+        response = gpt_request(prompt, model=LLM_VERS, max_tokens=max(MAX_TOKENS_CONV, 150 * len(item_names)))
+        if DEBUG:
+            print('LLM response: ', response)
+
+        plans_by_item = {}
+        failure = ""
+        if response.startswith("GENERATION ERROR"):
+            failure = f"LLM generation failed: {response}"
+        else:
+            plan_list = (extract_first_json_dict(response) or {}).get("plans")
+            if not isinstance(plan_list, list):
+                failure = "Failed to parse LLM response"
+            else:
+                for plan_data in plan_list:
+                    if isinstance(plan_data, dict) and plan_data.get("item_name") is not None:
+                        plans_by_item.setdefault(str(plan_data["item_name"]).strip().lower(), plan_data)
+        if failure and DEBUG:
+            print(failure)
+            print(f"Raw response: {response}")
+
+        plans = []
+        for item_name in item_names:
+            plan_data = plans_by_item.get(item_name.strip().lower())
+            try:
+                planned_quantity = int(float(plan_data["planned_quantity"]))
+            except (TypeError, KeyError, ValueError):
+                # Not planned by the batched response: plan the item on its own
+                if DEBUG:
+                    print(f"No plan for {item_name} in the batched response, planning it alone")
+                try:
+                    plan = self.create_production_plan_with_llm(agent, item_name, time_step, store,
+                                                                forecast=forecasts.get(item_name))
+                except Exception as e:
+                    print(f"✗ Error creating plan for {item_name}: {e}")
+                    plan = None
+                if plan:
+                    plans.append(plan)
+                continue
+            plan = ProductionPlan({
+                "item_name": item_name,
+                "planned_quantity": planned_quantity,
+                "reasoning": str(plan_data.get("reasoning", "")),
+                "created": time_step,
+                "time_step": time_step
+            })
+            if store:
+                self.production_plans.append(plan)
+            plans.append(plan)
+
+        return plans
+
+    def create_production_plans_from_forecast(self, agent, forecasts: List[DemandForecast], time_step: int,
+                                              store: bool = True) -> List[ProductionPlan]:
+        """
+        Create production plans of the forecast's suggested quantities, without
+        the LLM. Items are funded in order until the agent's cash runs out.
+
+        Parameters:
+            agent: The GenerativeAgent instance
+            forecasts: Demand forecasts of the items to plan for
+            time_step: Current time step
+            store: Add the plans to production_plans
+
+        Returns:
+            One ProductionPlan per forecast, in order
+        """
+        all_items = agent.inventory.get_all_items_with_values()
+        remaining_cash = agent.get_inventory_quantity("digital cash")
+        plans = []
+        for forecast in forecasts:
+            production_cost_per_unit = all_items.get(forecast.item_name, {}).get('production_cost_per_unit', 0.0)
+            affordable = int(remaining_cash / production_cost_per_unit) if production_cost_per_unit > 0 else 0
+            planned_quantity = min(forecast.suggested_quantity, affordable)
+            remaining_cash -= planned_quantity * production_cost_per_unit
+            plan = ProductionPlan({
+                "item_name": forecast.item_name,
+                "planned_quantity": planned_quantity,
+                "reasoning": f"Demand forecast: {forecast.describe()}",
+                "created": time_step,
+                "time_step": time_step
+            })
+            if store:
+                self.production_plans.append(plan)
+            plans.append(plan)
+        return plans
+
     def get_latest_plan(self, item_name: str) -> Optional[ProductionPlan]:
         """Get the most recent production plan for an item."""
         item_plans = [p for p in self.production_plans if p.item_name == item_name]
@@ -280,25 +456,32 @@ class Plan:
             print(f"Error executing production plan: {e}")
             return False
 
-    def get_items_to_produce(self, agent, max_items: int = 5) -> List[str]:
+    def get_items_to_produce(self, agent, max_items: int = 5, time_step: Optional[int] = None,
+                             forecast_mode: Optional[str] = PRODUCTION_FORECAST_MODE) -> List[str]:
         """
         Get items to produce based on recent sales activity.
 
+        With a forecast mode, the items sold recently are ranked by their
+        demand forecast (largest suggested production first) and the ones
+        whose stock covers the forecast demand are left out.
+
         Parameters:
             agent: The GenerativeAgent instance
             max_items: Maximum number of items to return (default 5)
+            time_step: Current time step (default: step of the latest sale)
+            forecast_mode: None lists the items of the last max_items sales
 
         Returns:
             List of item names from recent sales, up to max_items
         """
-        # Get all inventory records
-        all_records = agent.inventory.records
-
-        # Filter for sell_item records and get the last ones
-        sell_records = [record for record in all_records if record.action == "sell_item"]
+        if forecast_mode is not None:
+            forecasts = forecast_demand(agent, time_step)
+            ranked = sorted((forecast for forecast in forecasts.values() if not forecast.covered),
+                            key=lambda forecast: (-forecast.suggested_quantity, -forecast.demand, forecast.item_name))
+            return [forecast.item_name for forecast in ranked[:max_items]]
 
         # Get the last max_items sell records (or all if less than max_items)
-        recent_sales = sell_records[-max_items:] if len(sell_records) >= max_items else sell_records
+        recent_sales = agent.inventory.get_records("sell_item", last_n=max_items)
 
         # Extract unique item names from recent sales, preserving order of most recent
         items_to_produce = []
@@ -308,7 +491,11 @@ class Plan:
 
         return items_to_produce
 
-    def create_production_plans_for_recent_sales(self, agent, time_step: int = 0, max_items: int = 5) -> List[Dict[str, Any]]:
+    def create_production_plans_for_recent_sales(self, agent, time_step: int = 0, max_items: int = 5,
+                                                 items: Optional[List[str]] = None,
+                                                 executor: Optional[Executor] = None,
+                                                 batched: bool = PRODUCTION_PLANNING_BATCHED,
+                                                 forecast_mode: Optional[str] = PRODUCTION_FORECAST_MODE) -> List[Dict[str, Any]]:
         """
         Create production plans for items based on recent sales activity.
 
@@ -316,27 +503,78 @@ class Plan:
             agent: The GenerativeAgent instance
             time_step: Current time step
             max_items: Maximum number of items to plan for
+            items: Plan only for these items instead of the recent sales
+            executor: Plan the items concurrently on this executor; the
+                plans are still stored and returned in item order
+            batched: Plan every item with one LLM prompt; falls back to one
+                prompt per item if the batched call fails
+            forecast_mode: "prior" skips the items whose stock covers their
+                demand forecast and gives the forecast to the LLM, "only"
+                produces the forecast's suggested quantities without the
+                LLM, None plans every item with the LLM alone
 
         Returns:
             List of production plan dictionaries
         """
         # Get items to produce based on recent sales
-        items_to_produce = self.get_items_to_produce(agent, max_items)
+        items_to_produce = list(items) if items is not None else \
+            self.get_items_to_produce(agent, max_items, time_step, forecast_mode)
 
         if not items_to_produce:
             print("No recent sales found. No production plans created.")
             return []
 
+        forecasts = {}
+        if forecast_mode is not None:
+            forecasts = forecast_demand(agent, time_step, items_to_produce)
+            covered = [item_name for item_name in items_to_produce if forecasts[item_name].covered]
+            if covered:
+                print(f"Stock covers the forecast demand, not planning: {', '.join(covered)}")
+                items_to_produce = [item_name for item_name in items_to_produce if item_name not in covered]
+            if not items_to_produce:
+                return []
+            if forecast_mode == "only":
+                plans = self.create_production_plans_from_forecast(
+                    agent, [forecasts[item_name] for item_name in items_to_produce], time_step)
+                for plan in plans:
+                    print(f"✓ Created plan for {plan.item_name}: {plan.planned_quantity} units (forecast)")
+                return [plan.package() for plan in plans]
+
         print(f"Creating production plans for {len(items_to_produce)} items based on recent sales:")
         for item in items_to_produce:
             print(f"  - {item}")
         print()
 
+        if batched and len(items_to_produce) > 1:
+            try:
+                plans = self.create_production_plans_with_llm(agent, items_to_produce, time_step, forecasts=forecasts)
+                for plan in plans:
+                    print(f"✓ Created plan for {plan.item_name}: {plan.planned_quantity} units")
+                return [plan.package() for plan in plans]
+            except Exception as e:
+                print(f"✗ Error creating batched production plans, planning item by item: {e}")
+
+        pending = {}
+        if executor is not None and len(items_to_produce) > 1:
+            # Load a lazily loaded memory stream once, before the items
+            # retrieve from it concurrently.
+            agent.memory_stream.seq_nodes
+            agent.memory_stream.embeddings
+            pending = {item_name: executor.submit(self.create_production_plan_with_llm,
+                                                  agent, item_name, time_step, False, forecasts.get(item_name))
+                       for item_name in items_to_produce}
+
         # Create plans for each item
         plans = []
         for item_name in items_to_produce:
             try:
-                plan = self.create_production_plan_with_llm(agent, item_name, time_step)
+                if item_name in pending:
+                    plan = pending[item_name].result()
+                    if plan:
+                        self.production_plans.append(plan)
+                else:
+                    plan = self.create_production_plan_with_llm(agent, item_name, time_step,
+                                                                forecast=forecasts.get(item_name))
                 if plan:
                     plans.append(plan.package())
                     print(f"✓ Created plan for {item_name}: {plan.planned_quantity} units")
@@ -351,74 +589,102 @@ class Plan:
         """Package all plans for saving."""
         return [plan.package() for plan in self.production_plans]
 
-    def execute_production_for_all_agents(self, agents, time_step: int = 0) -> Dict[str, Any]:
+    def execute_production_for_all_agents(self, agents, time_step: int = 0,
+                                          items_by_agent: Optional[Dict[str, List[str]]] = None,
+                                          max_workers: Optional[int] = PRODUCTION_MAX_WORKERS) -> Dict[str, Any]:
         """
         Execute production planning for all agents based on their recent sales.
 
+        Agents are planned and produce on a pool of max_workers threads, and
+        the items of each agent are planned on a second pool of the same
+        size, so at most 2 * max_workers LLM calls run at once. An agent
+        executes its own plans one after the other, since they draw on the
+        same cash. Results are gathered in agent order.
+
         Parameters:
             agents: List of GenerativeAgent objects
             time_step: Current simulation time step
+            items_by_agent: Only produce for these agents, and only these
+                items ({agent name: item names}) instead of the recent sales
+            max_workers: Size of the worker pools; None or 1 runs the
+                agents one after the other
 
         Returns:
             Dict with production results for each agent
         """
-        production_results = {}
-
-        for agent in agents:
-            agent_name = agent.scratch.get_fullname()
+        selected = [agent for agent in agents
+                    if items_by_agent is None or agent.scratch.get_fullname() in items_by_agent]
+
+        if max_workers and max_workers > 1 and selected:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(selected))) as agent_pool, \
+                    ThreadPoolExecutor(max_workers=max_workers) as item_pool:
+                futures = [agent_pool.submit(self._produce_for_agent, agent, time_step, items_by_agent, item_pool)
+                           for agent in selected]
+                results = [future.result() for future in futures]
+        else:
+            results = [self._produce_for_agent(agent, time_step, items_by_agent) for agent in selected]
 
-            try:
-                # Get items to produce based on recent sales
-                items_to_produce = agent.get_items_to_produce_from_sales(max_items=5)
-
-                if items_to_produce:
-                    # Create production plans for recent sales items
-                    plans = agent.create_production_plans_for_recent_sales(time_step, max_items=5)
-
-                    executed_plans = []
-                    total_cost = 0.0
-
-                    # Execute each production plan
-                    for plan_data in plans:
-                        # Convert dict to ProductionPlan object for execution
-                        plan = ProductionPlan(plan_data)
-
-                        success = agent.execute_production_plan(plan, time_step)
-                        if success:
-                            executed_plans.append(plan_data)
-                            # Calculate cost
-                            current_inventory = agent.inventory.get_all_items_with_values().get(plan.item_name, {})
-                            production_cost = current_inventory.get("production_cost_per_unit", 0.0)
-                            total_cost += plan.planned_quantity * production_cost
-
-                    production_results[agent_name] = {
-                        'items_considered': items_to_produce,
-                        'plans_created': len(plans),
-                        'plans_executed': len(executed_plans),
-                        'total_cost': total_cost,
-                        'executed_plans': executed_plans
-                    }
-
-                    if DEBUG:
-                        print(f"  {agent_name}: {len(executed_plans)}/{len(plans)} plans executed, cost: ${total_cost:.2f}")
+        return {agent.scratch.get_fullname(): result for agent, result in zip(selected, results)}
 
-                else:
-                    production_results[agent_name] = {
-                        'items_considered': [],
-                        'plans_created': 0,
-                        'plans_executed': 0,
-                        'total_cost': 0.0,
-                        'executed_plans': []
-                    }
-                    if DEBUG:
-                        print(f"  {agent_name}: No recent sales found for production planning")
+    def _produce_for_agent(self, agent, time_step: int,
+                           items_by_agent: Optional[Dict[str, List[str]]] = None,
+                           item_executor: Optional[Executor] = None) -> Dict[str, Any]:
+        """Plan and execute production for one agent; the production result of the agent."""
+        agent_name = agent.scratch.get_fullname()
+        try:
+            # Get items to produce based on recent sales
+            if items_by_agent is not None:
+                items_to_produce = items_by_agent[agent_name]
+            else:
+                items_to_produce = agent.get_items_to_produce_from_sales(max_items=5, time_step=time_step)
 
-            except Exception as e:
-                print(f"Error in production planning for {agent_name}: {e}")
-                production_results[agent_name] = {
-                    'error': str(e),
+            if not items_to_produce:
+                if DEBUG:
+                    print(f"  {agent_name}: No recent sales found for production planning")
+                return {
+                    'items_considered': [],
+                    'plans_created': 0,
                     'plans_executed': 0,
-                    'total_cost': 0.0
+                    'total_cost': 0.0,
+                    'executed_plans': []
                 }
 
-        return production_results
\ No newline at end of file
+            # Create production plans for recent sales items
+            plans = agent.create_production_plans_for_recent_sales(
+                time_step, max_items=5, items=items_to_produce if items_by_agent is not None else None,
+                executor=item_executor)
+
+            executed_plans = []
+            total_cost = 0.0
+
+            # Execute each production plan
+            for plan_data in plans:
+                # Convert dict to ProductionPlan object for execution
+                plan = ProductionPlan(plan_data)
+
+                success = agent.execute_production_plan(plan, time_step)
+                if success:
+                    executed_plans.append(plan_data)
+                    # Calculate cost
+                    current_inventory = agent.inventory.get_all_items_with_values().get(plan.item_name, {})
+                    production_cost = current_inventory.get("production_cost_per_unit", 0.0)
+                    total_cost += plan.planned_quantity * production_cost
+
+            if DEBUG:
+                print(f"  {agent_name}: {len(executed_plans)}/{len(plans)} plans executed, cost: ${total_cost:.2f}")
+
+            return {
+                'items_considered': items_to_produce,
+                'plans_created': len(plans),
+                'plans_executed': len(executed_plans),
+                'total_cost': total_cost,
+                'executed_plans': executed_plans
+            }
+
+        except Exception as e:
+            print(f"Error in production planning for {agent_name}: {e}")
+            return {
+                'error': str(e),
+                'plans_executed': 0,
+                'total_cost': 0.0
+            }
@@ -27,6 +27,7 @@ class WorkingMemory:
         # Trade processing tracking
         self.processed_trades: Set[int] = set()  # Hashes of processed conversation segments
         self.recent_trades: List[Dict[str, Any]] = []
+        self.trade_cursor: int = 0  # Dialogue turns already settled by trade analysis
         
         # Interaction state
         self.interaction_id: str = ""
@@ -47,6 +48,7 @@ class WorkingMemory:
         self.recalled_memories.clear()
         self.processed_trades.clear()
         self.recent_trades.clear()
+        self.trade_cursor = 0
         self.recent_sales_failures.clear()
         self.has_recent_sales_failure = False
         self.interaction_id = interaction_id or str(datetime.now().timestamp())
@@ -109,7 +111,7 @@ class WorkingMemory:
             agent_desc += f"Memory: {memory}\n"
         
         # Add current inventory information
-        agent_desc += f"\nCurrent Inventory:\n{agent.get_all_items_with_values()}\n"
+        agent_desc += f"\nCurrent Inventory:\n{agent.inventory.get_items_text()}\n"
         
         # Add sales failure flag if there was a recent failure in this conversation
         if self.has_recent_sales_failure:
@@ -142,6 +144,20 @@ class WorkingMemory:
         }
         self.recent_trades.append(trade_record)
     
+    def settle_trades_through(self, turn_count: int):
+        """Mark the first turn_count dialogue turns as settled for trade analysis."""
+        self.trade_cursor = max(self.trade_cursor, turn_count)
+
+    def get_settled_trades_summary(self) -> str:
+        """Compact, one line per trade summary of the trades settled in this interaction."""
+        lines = []
+        for trade in self.recent_trades:
+            participants = trade.get('participants', {})
+            items = ", ".join(f"{item.get('quantity')} {item.get('name')} (${item.get('value')})"
+                              for item in trade.get('items', []))
+            lines.append(f"- {participants.get('seller', 'Unknown')} sold to {participants.get('buyer', 'Unknown')}: {items}")
+        return "\n".join(lines)
+    
     def record_sales_failure(self, failure_data: Dict[str, Any]):
         """Record a sales/trade failure that occurred."""
         failure_record = {
@@ -226,6 +242,7 @@ Write a concise first-person summary (2-4 sentences) of this interaction from {a
         self.inventory_snapshot.clear()
         self.processed_trades.clear()
         self.recent_trades.clear()
+        self.trade_cursor = 0
         self.recent_sales_failures.clear()
         self.has_recent_sales_failure = False
         self.interaction_id = ""
@@ -241,6 +258,7 @@ Write a concise first-person summary (2-4 sentences) of this interaction from {a
             "inventory_snapshot": self.inventory_snapshot,
             "processed_trades": list(self.processed_trades),
             "recent_trades": self.recent_trades,
+            "trade_cursor": self.trade_cursor,
             "recent_sales_failures": self.recent_sales_failures,
             "has_recent_sales_failure": self.has_recent_sales_failure,
             "interaction_id": self.interaction_id,
@@ -256,6 +274,7 @@ Write a concise first-person summary (2-4 sentences) of this interaction from {a
         self.inventory_snapshot = data.get("inventory_snapshot", {})
         self.processed_trades = set(data.get("processed_trades", []))
         self.recent_trades = data.get("recent_trades", [])
+        self.trade_cursor = data.get("trade_cursor", 0)
         self.recent_sales_failures = data.get("recent_sales_failures", [])
         self.has_recent_sales_failure = data.get("has_recent_sales_failure", False)
         self.interaction_id = data.get("interaction_id", "")
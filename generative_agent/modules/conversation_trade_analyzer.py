@@ -2,7 +2,8 @@ from typing import Dict, List, Any, Tuple, Optional, TYPE_CHECKING
 import json
 from simulation_engine.gpt_structure import chat_safe_generate
 from simulation_engine.llm_json_parser import extract_first_json_dict
-from simulation_engine.settings import LLM_VERS, LLM_ANALYZE_VERS, LLM_PROMPT_DIR
+from simulation_engine.settings import LLM_VERS, LLM_ANALYZE_VERS, LLM_PROMPT_DIR, TRADE_RULES_MIN_CONFIDENCE, DEBUG
+from generative_agent.modules.trade_extractor import RuleBasedTradeExtractor
 
 if TYPE_CHECKING:
     from generative_agent.generative_agent import GenerativeAgent
@@ -13,8 +14,77 @@ class ConversationTradeAnalyzer:
     and calculates the net result for each participant.
     """
 
-    def __init__(self, model: str = LLM_ANALYZE_VERS):
+    def __init__(self, model: str = LLM_ANALYZE_VERS, rules_min_confidence: Optional[float] = TRADE_RULES_MIN_CONFIDENCE):
         self.model = model
+        # Trades the rule-based extractor reads with at least this confidence
+        # skip the LLM call; None always uses the LLM.
+        self.rules_min_confidence = rules_min_confidence
+        self.rule_extractor = RuleBasedTradeExtractor()
+        self.extraction_counts = {"rules": 0, "llm": 0}
+        # {participant names: (inventory versions, rendered inventories JSON)}
+        self._inventories_json_cache: Dict[Tuple[str, ...], Tuple[List[Any], str]] = {}
+
+    def _inventory_items(self, agent: 'GenerativeAgent') -> List[Dict[str, Any]]:
+        """Inventory rows ({name, quantity, value}) of one agent for the analysis prompt."""
+        # get_all_items_with_values returns a dict: {name: {quantity, value_per_unit, total_value}}
+        try:
+            items_map = agent.get_all_items_with_values()
+        except Exception:
+            items_map = {}
+
+        items_list = []
+        if isinstance(items_map, dict):
+            for item_name, meta in items_map.items():
+                try:
+                    qty = int(meta.get("quantity", 0)) if isinstance(meta, dict) else 0
+                except Exception:
+                    qty = 0
+                # Include unit price so the model can compute totals via prompt
+                try:
+                    unit_price = float(
+                        (meta.get("value_per_unit") if isinstance(meta, dict) else 0.0)
+                        or (meta.get("value") if isinstance(meta, dict) else 0.0)
+                        or 0.0
+                    )
+                except Exception:
+                    unit_price = 0.0
+                items_list.append({"name": str(item_name), "quantity": qty, "value": unit_price})
+        elif isinstance(items_map, list):
+            # Fallback if a list is ever returned
+            for it in items_map:
+                if isinstance(it, dict):
+                    try:
+                        unit_price = float(it.get("value", 0.0) or 0.0)
+                    except Exception:
+                        unit_price = 0.0
+                    items_list.append({
+                        "name": str(it.get("name", "")),
+                        "quantity": int(it.get("quantity", 0) or 0),
+                        "value": unit_price
+                    })
+        return items_list
+
+    def _inventories_json(self, agents: List['GenerativeAgent']) -> str:
+        """
+        The inventories of the participants, keyed by full name, rendered as
+        JSON for the analysis prompt. The rendering is cached per group of
+        agents and reused until one of their inventories changes version.
+        """
+        names = []
+        versions = []
+        for agent in agents:
+            names.append(agent.scratch.get_fullname() if hasattr(agent.scratch, "get_fullname") else getattr(agent, "name", agent.id))
+            versions.append(getattr(getattr(agent, "inventory", None), "version", None))
+
+        key = tuple(names)
+        cached = self._inventories_json_cache.get(key)
+        if cached is not None and cached[0] == versions and None not in versions:
+            return cached[1]
+
+        inventories = {name: self._inventory_items(agent) for name, agent in zip(names, agents)}
+        inventories_json = json.dumps(inventories, indent=2)
+        self._inventories_json_cache[key] = (versions, inventories_json)
+        return inventories_json
 
     def analyze_trade(
         self,
@@ -30,51 +100,20 @@ class ConversationTradeAnalyzer:
           "items": [{"name": str, "quantity": int, "value": float}]
         }
         Also, here is the inventory for each participant, keyed by their name, with item names and quantities as close as possible to the inventory item names.
+
+        Simple offer/accept exchanges are read by the rule-based extractor;
+        the LLM is only called when its confidence is below rules_min_confidence.
         """
-        # Gather inventories for each agent, keyed by their full name
-        inventories = {}
-        for agent in agents:
-            agent_name = agent.scratch.get_fullname() if hasattr(agent.scratch, "get_fullname") else getattr(agent, "name", agent.id)
-            # get_all_items_with_values returns a dict: {name: {quantity, value_per_unit, total_value}}
-            try:
-                items_map = agent.get_all_items_with_values()
-            except Exception:
-                items_map = {}
+        if self.rules_min_confidence is not None:
+            trade, confidence = self.rule_extractor.extract(agents, conversation_text, time_step)
+            if trade is not None and confidence >= self.rules_min_confidence:
+                self.extraction_counts["rules"] += 1
+                if DEBUG:
+                    print(f"Trade read by rules (confidence {confidence:.2f}): {trade}")
+                return trade
+        self.extraction_counts["llm"] += 1
 
-            items_list = []
-            if isinstance(items_map, dict):
-                for item_name, meta in items_map.items():
-                    try:
-                        qty = int(meta.get("quantity", 0)) if isinstance(meta, dict) else 0
-                    except Exception:
-                        qty = 0
-                    # Include unit price so the model can compute totals via prompt
-                    try:
-                        unit_price = float(
-                            (meta.get("value_per_unit") if isinstance(meta, dict) else 0.0)
-                            or (meta.get("value") if isinstance(meta, dict) else 0.0)
-                            or 0.0
-                        )
-                    except Exception:
-                        unit_price = 0.0
-                    items_list.append({"name": str(item_name), "quantity": qty, "value": unit_price})
-            elif isinstance(items_map, list):
-                # Fallback if a list is ever returned
-                for it in items_map:
-                    if isinstance(it, dict):
-                        try:
-                            unit_price = float(it.get("value", 0.0) or 0.0)
-                        except Exception:
-                            unit_price = 0.0
-                        items_list.append({
-                            "name": str(it.get("name", "")),
-                            "quantity": int(it.get("quantity", 0) or 0),
-                            "value": unit_price
-                        })
-            inventories[agent_name] = items_list
-
-        # Prepare inputs for the template
-        inventories_json = json.dumps(inventories, indent=2)
+        inventories_json = self._inventories_json(agents)
 
         raw, _, _, _ = chat_safe_generate(
             prompt_input=[inventories_json, conversation_text],
@@ -370,6 +409,132 @@ class ConversationTradeAnalyzer:
             print(f"Error executing buyer trade: {e}")
             return False
 
+    def _find_agent(self, agents: List['GenerativeAgent'], name: str) -> Optional['GenerativeAgent']:
+        for agent in agents:
+            agent_name = agent.scratch.get_fullname() if hasattr(agent.scratch, "get_fullname") else getattr(agent, "name", agent.id)
+            if agent_name == name:
+                return agent
+        return None
+
+    def execute_trade_atomic(
+        self,
+        agents: List['GenerativeAgent'],
+        trade_data: Dict[str, Any],
+        testing_mode: bool = False
+    ) -> Tuple[bool, bool]:
+        """
+        Execute both sides of a trade as one transaction.
+
+        1. Validate: the seller holds every item in the needed quantity and the
+           buyer holds enough digital cash for the whole trade. If either side
+           fails, the failure is recorded for that side and nothing is applied.
+        2. Apply: sell on the seller's inventory and buy on the buyer's. If any
+           step fails or raises, both inventories are rolled back.
+        3. Persist: both agents' inventory and scratch files are written
+           together (unless in testing mode), instead of two full saves.
+
+        Args:
+            agents: List of agents involved in the conversation
+            trade_data: JSON output from analyze_trade containing participants and items
+            testing_mode: If True, don't save changes to JSON files
+
+        Returns (seller_success, buyer_success); the trade happened iff both are True.
+        """
+        participants = trade_data.get("participants", {})
+        seller_name = participants.get("seller", "")
+        buyer_name = participants.get("buyer", "")
+        time_step = trade_data.get("time_step", 0)
+        items = [item for item in trade_data.get("items", [])
+                 if item.get("name", "") and item.get("quantity", 0) > 0]
+
+        if not seller_name or not buyer_name or not items or seller_name == buyer_name:
+            return False, False
+
+        seller_agent = self._find_agent(agents, seller_name)
+        buyer_agent = self._find_agent(agents, buyer_name)
+        if not seller_agent or not buyer_agent:
+            return seller_agent is not None, buyer_agent is not None
+
+        # Phase 1: validate both sides before touching either inventory.
+        needed = {}
+        for item in items:
+            needed[item["name"]] = needed.get(item["name"], 0) + item["quantity"]
+        seller_success = True
+        for item in items:
+            item_name, quantity = item["name"], item["quantity"]
+            if not seller_agent.inventory.has_item(item_name, needed[item_name]):
+                reason = f"Insufficient inventory: needed {quantity}, have {seller_agent.inventory.get_item_quantity(item_name)}"
+                seller_agent.inventory.record_trade_failure(item_name, quantity, time_step, buyer_name, reason)
+                seller_agent.working_memory.record_sales_failure({
+                    'item_attempted': item_name,
+                    'quantity_attempted': quantity,
+                    'reason': reason,
+                    'trade_partner': buyer_name
+                })
+                seller_agent.scratch.total_sales_failures += 1
+                seller_agent.scratch.last_sales_failure_time = time_step
+                seller_success = False
+
+        buyer_success = True
+        total_cost = sum(item.get("value", 0.0) for item in items)
+        if total_cost > 0 and not buyer_agent.inventory.has_item("digital cash", total_cost):
+            reason = f"Insufficient funds: needed ${total_cost}, have ${buyer_agent.inventory.get_item_quantity('digital cash')}"
+            buyer_agent.working_memory.record_sales_failure({
+                'item_attempted': f"{len(items)} items",
+                'cost_attempted': total_cost,
+                'reason': reason,
+                'trade_partner': seller_name
+            })
+            buyer_agent.scratch.total_sales_failures += 1
+            buyer_agent.scratch.last_sales_failure_time = time_step
+            buyer_success = False
+
+        if not seller_success or not buyer_success:
+            return seller_success, buyer_success
+
+        # Phase 2: apply both sides, rolling both back on any failure.
+        seller_checkpoint = seller_agent.inventory.checkpoint()
+        buyer_checkpoint = buyer_agent.inventory.checkpoint()
+        buyer_cash = buyer_agent.inventory.get_item_quantity("digital cash")
+        try:
+            for item in items:
+                item_name, quantity = item["name"], item["quantity"]
+                price = item.get("value", 0.0)
+                sold = seller_agent.inventory.sell_item(
+                    item_name=item_name,
+                    quantity=quantity,
+                    time_step=time_step,
+                    buyer=buyer_name,
+                    price_per_unit=price / quantity,
+                    description=f"Sold {quantity} {item_name} to {buyer_name} for ${price}"
+                )
+                bought = sold and buyer_agent.inventory.buy_item(
+                    item_name=item_name,
+                    quantity=quantity,
+                    time_step=time_step,
+                    seller=seller_name,
+                    price_per_unit=price / quantity,
+                    description=f"Purchased {quantity} {item_name} from {seller_name} for ${price}"
+                )
+                if not bought:
+                    raise RuntimeError(f"could not transfer {quantity} {item_name}")
+            # buy_item does not report a failed payment, so check the cash moved.
+            paid = buyer_cash - buyer_agent.inventory.get_item_quantity("digital cash")
+            if abs(paid - total_cost) > 1e-6:
+                raise RuntimeError(f"buyer paid ${paid}, expected ${total_cost}")
+        except Exception as e:
+            print(f"Error executing trade, rolled back: {e}")
+            seller_agent.inventory.rollback(seller_checkpoint)
+            buyer_agent.inventory.rollback(buyer_checkpoint)
+            return False, False
+
+        # Phase 3: one combined write of everything the trade changed.
+        if not testing_mode:
+            from generative_agent.generative_agent import save_inventories
+            save_inventories([seller_agent, buyer_agent])
+
+        return True, True
+
     def execute_trade(
         self,
         agents: List['GenerativeAgent'],
@@ -388,15 +553,36 @@ class ConversationTradeAnalyzer:
         Args:
             testing_mode: If True, don't save inventory changes to JSON files
         """
-        # Normalize conversation text to string if a dialogue list is provided
+        # Normalize conversation text to string if a dialogue list is provided.
+        # For a dialogue list only the turns after the last settled trade are
+        # analyzed; trades already settled in this conversation are passed as
+        # a short summary so they are neither re-analyzed nor executed twice.
         normalized_text: str
+        dialogue_length = None
         if isinstance(conversation_text, list):
+            dialogue_length = len(conversation_text)
+            settled_turns = max(agent.working_memory.trade_cursor for agent in agents)
             try:
                 normalized_text = "".join(
-                    f"[{speaker}]: {message}\n" for speaker, message in conversation_text
+                    f"[{speaker}]: {message}\n" for speaker, message in conversation_text[settled_turns:]
                 )
             except Exception:
-                normalized_text = str(conversation_text)
+                normalized_text = str(conversation_text[settled_turns:])
+
+            newly_processed = [agent.working_memory.mark_conversation_processed(normalized_text) for agent in agents]
+            if not normalized_text.strip() or not any(newly_processed):
+                return {
+                    'executed': False,
+                    'trade_details': None,
+                    'conversation_id': conversation_id,
+                    'time_step': time_step,
+                    'warning': None
+                }
+
+            settled_summary = agents[0].working_memory.get_settled_trades_summary() if agents else ""
+            if settled_summary:
+                normalized_text = ("Trades already completed earlier in this conversation (do not report them again):\n"
+                                   f"{settled_summary}\n\nNew conversation turns:\n{normalized_text}")
         else:
             normalized_text = str(conversation_text)
 
@@ -412,8 +598,7 @@ class ConversationTradeAnalyzer:
         # Execute the trade if analysis was successful
         trade_executed = False
         if json_response and isinstance(json_response, dict) and json_response.get("items"):
-            seller_success = self.execute_seller_trade(agents, json_response, testing_mode)
-            buyer_success = self.execute_buyer_trade(agents, json_response, testing_mode)
+            seller_success, buyer_success = self.execute_trade_atomic(agents, json_response, testing_mode)
             trade_executed = seller_success and buyer_success
             
             if trade_executed:
@@ -422,6 +607,8 @@ class ConversationTradeAnalyzer:
                 # Record trade in working memory for each agent
                 for agent in agents:
                     agent.working_memory.record_trade(json_response)
+                    if dialogue_length is not None:
+                        agent.working_memory.settle_trades_through(dialogue_length)
                     
             else:
                 print("Trade analysis detected but execution failed")
@@ -0,0 +1,211 @@
+from typing import Dict, List, Any, Tuple, Optional, TYPE_CHECKING
+import re
+
+if TYPE_CHECKING:
+    from generative_agent.generative_agent import GenerativeAgent
+
+CASH_ITEM = "digital cash"
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "single": 1, "two": 2, "pair": 2, "couple": 2,
+    "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "dozen": 12,
+    "fifteen": 15, "twenty": 20,
+}
+
+ACCEPT_PATTERN = re.compile(
+    r"\b(deal|it'?s a deal|agreed|i agree|accept(ed)?|sold|i'?ll take|i will take|"
+    r"sounds good|you'?ve got a deal|let'?s do it|tap(ping|ped)?|paid|purchase confirmed|"
+    r"confirm(ed)?)\b", re.IGNORECASE)
+REJECT_PATTERN = re.compile(
+    r"\b(no deal|not interested|too (expensive|much|high)|can'?t afford|pass on|"
+    r"decline|no thanks|maybe later|counter ?offer|how about|would you (take|do|accept))\b",
+    re.IGNORECASE)
+PRICE_PATTERN = re.compile(r"\$\s?(\d{1,3}(?:,\d{3})+|\d+)(\.\d{1,2})?")
+UNIT_PRICE_PATTERN = re.compile(r"^\s*(each|apiece|a piece|per (unit|item|piece|jar|bottle|bag|box|pack|set|one))\b",
+                                re.IGNORECASE)
+TURN_PATTERN = re.compile(r"^\[(.+?)\]: (.*)$")
+
+
+class RuleBasedTradeExtractor:
+    """
+    Deterministic fast path for trade analysis. Reads the last turns of a
+    conversation, finds the most recent offer (item names from either
+    participant's inventory, quantities and $ prices) and a later acceptance
+    by the other participant, and returns the trade in the same shape as
+    ConversationTradeAnalyzer.analyze_trade together with a confidence score.
+    Anything it cannot read unambiguously gets a low confidence so that the
+    caller falls back to the LLM.
+    """
+
+    def __init__(self, recent_turns: int = 4):
+        self.recent_turns = recent_turns
+        # {item name: compiled pattern}
+        self._pattern_cache: Dict[str, re.Pattern] = {}
+
+    def _item_pattern(self, name: str) -> re.Pattern:
+        """
+        Pattern for one item name ("herbal_tea" also matches "herbal tea",
+        "herbal-tea" and plurals), optionally preceded by a quantity.
+        """
+        pattern = self._pattern_cache.get(name)
+        if pattern is None:
+            words = [re.escape(word) for word in re.split(r"[_\s-]+", name.lower()) if word]
+            item = r"[\s_-]+".join(words)
+            number = "|".join(["\\d+"] + sorted(NUMBER_WORDS, key=len, reverse=True))
+            pattern = self._pattern_cache[name] = re.compile(
+                rf"(?:(?<![$\d.,])\b(?P<qty>{number})\s+(?:(?!(?:and|or|for|at)\b)[a-z]+\s+){{0,2}}?(?:of\s+)?)?\b(?P<item>{item})(?:e?s)?\b",
+                re.IGNORECASE)
+        return pattern
+
+    def _item_patterns(self, agents: List['GenerativeAgent']) -> List[Tuple[str, re.Pattern]]:
+        names = set()
+        for agent in agents:
+            names.update(name for name in agent.inventory.items if name != CASH_ITEM and name.strip())
+        # Longer names first so "black_tea_tin" wins over "black_tea".
+        return [(name, self._item_pattern(name)) for name in sorted(names, key=len, reverse=True)]
+
+    @staticmethod
+    def _parse_turns(conversation_text: str) -> List[Tuple[str, str]]:
+        turns = []
+        for line in conversation_text.splitlines():
+            match = TURN_PATTERN.match(line.strip())
+            if match:
+                turns.append((match.group(1), match.group(2)))
+            elif turns and line.strip():
+                turns[-1] = (turns[-1][0], turns[-1][1] + " " + line.strip())
+        return turns
+
+    @staticmethod
+    def _parse_quantity(text: Optional[str]) -> Optional[int]:
+        if not text:
+            return None
+        text = text.lower()
+        return int(text) if text.isdigit() else NUMBER_WORDS.get(text)
+
+    def _find_offer(self, message: str, patterns: List[Tuple[str, re.Pattern]]) -> Tuple[List[Dict[str, Any]], List[Tuple[int, float, bool]]]:
+        """Item mentions [{name, quantity, start, end}] and prices [(position, amount, is_unit_price)] in one message."""
+        mentions = []
+        taken = []
+        for name, pattern in patterns:
+            for match in pattern.finditer(message):
+                span = match.span("item")
+                if any(start < span[1] and span[0] < end for start, end in taken):
+                    continue
+                taken.append(span)
+                mentions.append({"name": name, "quantity": self._parse_quantity(match.group("qty")),
+                                 "start": span[0], "end": span[1]})
+        mentions.sort(key=lambda mention: mention["start"])
+
+        prices = []
+        for match in PRICE_PATTERN.finditer(message):
+            amount = float(match.group(1).replace(",", "") + (match.group(2) or ""))
+            is_unit = bool(UNIT_PRICE_PATTERN.match(message[match.end():]))
+            prices.append((match.start(), amount, is_unit))
+        return mentions, prices
+
+    def extract(
+        self,
+        agents: List['GenerativeAgent'],
+        conversation_text: str,
+        time_step: int
+    ) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Returns (trade, confidence). trade has the analyze_trade shape
+        {"participants": {"seller", "buyer"}, "items": [{"name", "quantity", "value"}], "time_step"}
+        or is None when no offer/acceptance could be read; confidence is in [0, 1].
+        """
+        if len(agents) != 2:
+            return None, 0.0
+        names = [agent.scratch.get_fullname() for agent in agents]
+        by_name = dict(zip(names, agents))
+        turns = [turn for turn in self._parse_turns(conversation_text) if turn[0] in by_name]
+        turns = turns[-self.recent_turns:]
+        if not turns:
+            return None, 0.0
+
+        patterns = self._item_patterns(agents)
+
+        # The most recent turn that names an item and a price is the offer.
+        offer_index, mentions, prices = None, [], []
+        for index in range(len(turns) - 1, -1, -1):
+            mentions, prices = self._find_offer(turns[index][1], patterns)
+            if mentions and prices:
+                offer_index = index
+                break
+        if offer_index is None:
+            return None, 0.0
+        offer_speaker = turns[offer_index][0]
+
+        # Acceptance: a later turn by the other participant. The offer's own
+        # wording ("Great deal for you: ...") does not accept it.
+        accepted = False
+        for speaker, message in turns[offer_index + 1:]:
+            if REJECT_PATTERN.search(message):
+                accepted = False
+            elif ACCEPT_PATTERN.search(message) and speaker != offer_speaker:
+                accepted = True
+        if not accepted:
+            return None, 0.0
+
+        # The seller is whoever holds the mentioned items.
+        items = []
+        confidence = 1.0
+        seller_name = None
+        for mention in mentions:
+            holders = [name for name in names if by_name[name].inventory.has_item(mention["name"])]
+            if len(holders) != 1:
+                confidence -= 0.3
+                holders = holders or [None]
+            if seller_name is None:
+                seller_name = holders[0]
+            elif holders[0] != seller_name:
+                confidence -= 0.3
+            quantity = mention["quantity"]
+            if quantity is None:
+                quantity = 1
+                confidence -= 0.15
+            items.append({"name": mention["name"], "quantity": quantity, "value": None})
+        if seller_name is None:
+            return None, 0.0
+
+        # Merge repeated mentions of the same item.
+        merged = {}
+        for item in items:
+            if item["name"] in merged:
+                if merged[item["name"]]["quantity"] != item["quantity"]:
+                    confidence -= 0.3
+            else:
+                merged[item["name"]] = item
+        items = list(merged.values())
+
+        # Prices: one total per item, in order. A unit price ("$15 each") is
+        # multiplied by the quantity.
+        if len(prices) == len(items):
+            for item, (_, amount, is_unit) in zip(items, prices):
+                item["value"] = round(amount * item["quantity"], 2) if is_unit else amount
+        elif len(items) > 1 and len(prices) == 1 and not prices[0][2]:
+            # A single total for several items: split by the seller's unit values.
+            seller = by_name[seller_name]
+            weights = [seller.inventory.get_item_value(item["name"]) * item["quantity"] for item in items]
+            total_weight = sum(weights) or len(items)
+            for item, weight in zip(items, weights):
+                item["value"] = round(prices[0][1] * (weight or 1) / total_weight, 2)
+            confidence -= 0.2
+        else:
+            return None, 0.0
+
+        # Terms must be feasible for the inventories as they are now.
+        buyer_name = names[1] if seller_name == names[0] else names[0]
+        seller, buyer = by_name[seller_name], by_name[buyer_name]
+        if any(not seller.inventory.has_item(item["name"], item["quantity"]) for item in items):
+            confidence -= 0.3
+        if buyer.inventory.get_item_quantity(CASH_ITEM) < sum(item["value"] for item in items):
+            confidence -= 0.3
+
+        trade = {
+            "participants": {"seller": seller_name, "buyer": buyer_name},
+            "items": items,
+            "time_step": time_step
+        }
+        return trade, max(0.0, min(1.0, confidence))
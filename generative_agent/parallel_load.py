@@ -0,0 +1,215 @@
+"""
+Parallel Agent Loading
+
+Loads the agents of a population on a pool of processes. Each worker reads
+one agent's components from the agent store (parsing its JSON, most of all
+its embeddings, is the cost) and hands the embedding vectors back as one
+numpy block in shared memory, so they are copied into the parent process
+once instead of being pickled as lists of floats. Nodes, scratch and
+inventory come back as the packaged dicts.
+
+The parent builds the GenerativeAgent from those components through a
+PreloadedAgentStore, which also carries over the bookkeeping the worker's
+store made while reading (see agent_store), so saves stay incremental.
+
+A failing agent is reported and skipped; the others are still loaded. If the
+pool itself breaks (e.g. a worker is killed), the agents it did not load are
+loaded in the parent process.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from generative_agent.agent_store import AgentStore
+from generative_agent.modules.cognitive.memory_stream import QuantizedEmbeddings, convert_embeddings
+
+
+class _Bookkeeping:
+    """Stands in for the agent while a worker's store reads it."""
+
+
+def share_embeddings(embeddings: Any) -> Dict[str, Any]:
+    """
+    Copy an embeddings mapping into a shared memory block: the vectors, then
+    the int8 scales. Returns the descriptor attach_embeddings() reads.
+    """
+    if isinstance(embeddings, QuantizedEmbeddings):
+        arrays = embeddings.to_arrays()
+        mode, contents = embeddings.mode, arrays["contents"].tolist()
+        vectors, scales = arrays["vectors"], arrays.get("scales")
+    else:
+        mode, contents = "float64", list(embeddings)
+        vectors = np.array([embeddings[content] for content in contents], dtype=np.float64)
+        scales = None
+    descriptor = {"mode": mode, "contents": contents, "name": None,
+                  "shape": vectors.shape, "dtype": vectors.dtype.str}
+    if not contents:
+        return descriptor
+
+    size = vectors.nbytes + (scales.nbytes if scales is not None else 0)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    np.ndarray(vectors.shape, dtype=vectors.dtype, buffer=block.buf)[:] = vectors
+    if scales is not None:
+        np.ndarray(scales.shape, dtype=np.float32, buffer=block.buf, offset=vectors.nbytes)[:] = scales
+    descriptor["name"] = block.name
+    # The parent unlinks the block once it has copied it
+    resource_tracker.unregister(block._name, "shared_memory")
+    block.close()
+    return descriptor
+
+
+def attach_embeddings(descriptor: Dict[str, Any], mode: str) -> Any:
+    """The embeddings of a share_embeddings() descriptor, in the requested mode; frees the block."""
+    if descriptor["name"] is None:
+        return convert_embeddings({}, mode)
+    block = shared_memory.SharedMemory(name=descriptor["name"])
+    try:
+        shape, dtype = tuple(descriptor["shape"]), np.dtype(descriptor["dtype"])
+        vectors = np.ndarray(shape, dtype=dtype, buffer=block.buf).copy()
+        scales = None
+        if descriptor["mode"] == "int8":
+            scales = np.ndarray((shape[0],), dtype=np.float32, buffer=block.buf, offset=vectors.nbytes).copy()
+    finally:
+        block.close()
+        block.unlink()
+    if descriptor["mode"] == "float64":
+        embeddings = dict(zip(descriptor["contents"], vectors.tolist()))
+    else:
+        embeddings = QuantizedEmbeddings.from_arrays(descriptor["mode"], descriptor["contents"], vectors, scales)
+    return convert_embeddings(embeddings, mode)
+
+
+def read_agent_components(store: AgentStore, population: str, agent_id: str, embedding_mode: str) -> Dict[str, Any]:
+    """Worker: every component of one agent, with the embeddings in shared memory."""
+    holder = _Bookkeeping()
+    meta = store.read_meta(holder, population, agent_id)
+    if meta is None:
+        raise FileNotFoundError(f"No agent {agent_id} in population {population}")
+    components = {"meta": meta,
+                  "scratch": store.read_scratch(holder, population, agent_id),
+                  "nodes": store.read_nodes(holder, population, agent_id),
+                  "inventory": store.read_inventory(holder, population, agent_id)}
+    components["embeddings"] = share_embeddings(store.read_embeddings(holder, population, agent_id, embedding_mode))
+    components["bookkeeping"] = holder.__dict__
+    return components
+
+
+class PreloadedAgentStore(AgentStore):
+    """Serves one agent's already read components; everything else goes to store."""
+
+    def __init__(self, store: AgentStore, components: Dict[str, Any]):
+        self.store = store
+        self.components = components
+
+    def list_populations(self) -> List[str]:
+        return self.store.list_populations()
+
+    def list_agents(self, population: str) -> List[str]:
+        return self.store.list_agents(population)
+
+    def exists(self, population: str, agent_id: str) -> bool:
+        return self.store.exists(population, agent_id)
+
+    def item_holders(self, population: str, item_name: str) -> List[Dict[str, Any]]:
+        return self.store.item_holders(population, item_name)
+
+    def read_meta(self, agent, population: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        agent.__dict__.update(self.components["bookkeeping"])
+        return self.components["meta"]
+
+    def read_scratch(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        return self.components["scratch"]
+
+    def read_nodes(self, agent, population: str, agent_id: str) -> List[Dict[str, Any]]:
+        return self.components["nodes"]
+
+    def read_embeddings(self, agent, population: str, agent_id: str, mode: str) -> Any:
+        return convert_embeddings(self.components["embeddings"], mode)
+
+    def read_inventory(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        return self.components["inventory"]
+
+    def initialize(self, agent, population: str, agent_id: str) -> bool:
+        return self.store.initialize(agent, population, agent_id)
+
+    def write(self, agent, population: str, agent_id: str):
+        self.store.write(agent, population, agent_id)
+
+    def write_inventories(self, agents: List[Any]):
+        self.store.write_inventories(agents)
+
+    def import_folder(self, population: str, agent_id: str, folder: str):
+        self.store.import_folder(population, agent_id, folder)
+
+
+def load_agents_parallel(population: str, agent_ids: List[str], store: AgentStore, embedding_mode: str,
+                         max_workers: int,
+                         progress: Optional[Callable[[int, int, str, Any, Optional[Exception]], None]] = None
+                         ) -> Tuple[Dict[str, Any], Dict[str, Exception]]:
+    """
+    Fully load agents on a pool of max_workers processes.
+
+    Parameters:
+        population: Population of the agents
+        agent_ids: Agents to load
+        store: Agent store to read from (must be picklable)
+        embedding_mode: In-memory embedding mode of the agents
+        max_workers: Number of worker processes
+        progress: Called as progress(done, total, agent_id, agent, error) after each
+            agent; agent is None if it failed to load
+
+    Returns:
+        ({agent id: GenerativeAgent}, {agent id: exception}) for the loaded and the failed agents
+    """
+    from generative_agent.generative_agent import GenerativeAgent
+
+    agents: Dict[str, Any] = {}
+    errors: Dict[str, Exception] = {}
+    total = len(agent_ids)
+
+    def finish(agent_id: str, components: Optional[Dict[str, Any]] = None, error: Optional[Exception] = None):
+        if error is None:
+            try:
+                components["embeddings"] = attach_embeddings(components["embeddings"], embedding_mode)
+                agent = GenerativeAgent(population, agent_id, load_mode="full", embedding_mode=embedding_mode,
+                                        store=PreloadedAgentStore(store, components))
+                # Everything is read: later saves go straight to the store
+                agent._store = store
+                agents[agent_id] = agent
+            except Exception as e:
+                error = e
+        if error is not None:
+            errors[agent_id] = error
+        if progress is not None:
+            progress(len(agents) + len(errors), total, agent_id, agents.get(agent_id), error)
+
+    pending = list(agent_ids)
+    try:
+        with ProcessPoolExecutor(max_workers=min(max_workers, total)) as pool:
+            futures = {pool.submit(read_agent_components, store, population, agent_id, embedding_mode): agent_id
+                       for agent_id in agent_ids}
+            for future in as_completed(futures):
+                agent_id = futures[future]
+                try:
+                    components = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    finish(agent_id, error=e)
+                else:
+                    finish(agent_id, components)
+                pending.remove(agent_id)
+    except BrokenProcessPool as e:
+        print(f"Agent loading pool broke ({e}); loading {len(pending)} remaining agents in this process")
+        for agent_id in pending:
+            try:
+                components = read_agent_components(store, population, agent_id, embedding_mode)
+            except Exception as error:
+                finish(agent_id, error=error)
+            else:
+                finish(agent_id, components)
+    return agents, errors
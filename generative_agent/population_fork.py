@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Copy-on-write Population Forks
+
+Forking a population (e.g. Synthetic_Base -> Synthetic_cf1) creates, for
+every agent, a child folder holding only meta.json and fork.json, which names
+the parent agent folder. The parent becomes an immutable snapshot (a
+frozen.json marker makes GenerativeAgent.save refuse to write to it) and the
+child's own files only hold what changed since the fork:
+
+- memory_stream/nodes.json: nodes added after the parent's
+- memory_stream/embeddings.*: embeddings the parent does not have
+- inventory.json: current items and production plans, records added after
+  the parent's
+- scratch.json: only once the scratch differs from the parent's
+
+Reads fall through to the parent (recursively, so forks of forks work):
+the resolve_* functions return what a regular agent folder would hold.
+
+Usage:
+    python -m generative_agent.population_fork --parent Synthetic_Base --child Synthetic_cf1
+    python -m generative_agent.population_fork --parent Synthetic --child Synthetic_cf2 --agents mei_chen pema_sherpa
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from simulation_engine.settings import POPULATIONS_DIR, EMBEDDING_STORAGE_MODE
+from generative_agent.modules.cognitive.memory_stream import load_embeddings, convert_embeddings, embeddings_file
+
+FORK_FILE = "fork.json"
+FROZEN_FILE = "frozen.json"
+
+
+def agent_folder(population: str, agent_id: str) -> str:
+    return f"{POPULATIONS_DIR}/{population}/{agent_id}"
+
+
+def _read_json(path: str) -> Any:
+    with open(path) as json_file:
+        return json.load(json_file)
+
+
+def read_fork(folder: str) -> Optional[str]:
+    """The parent agent folder of a forked agent folder, or None."""
+    path = f"{folder}/{FORK_FILE}"
+    if not os.path.exists(path):
+        return None
+    return f"{POPULATIONS_DIR}/{_read_json(path)['parent']}"
+
+
+def write_fork(folder: str, parent_folder: str):
+    """Make folder a fork of parent_folder (both agent folders under POPULATIONS_DIR)."""
+    with open(f"{folder}/{FORK_FILE}", "w") as json_file:
+        json.dump({"parent": os.path.relpath(parent_folder, POPULATIONS_DIR)}, json_file, indent=2)
+
+
+def is_frozen(folder: str) -> bool:
+    """Whether the agent folder is the parent snapshot of forked agents."""
+    return os.path.exists(f"{folder}/{FROZEN_FILE}")
+
+
+def resolve_scratch(folder: str) -> Tuple[Dict[str, Any], bool]:
+    """The agent's scratch, and whether it was inherited from a parent."""
+    path = f"{folder}/scratch.json"
+    parent = read_fork(folder)
+    if parent is None or os.path.exists(path):
+        return _read_json(path), False
+    return resolve_scratch(parent)[0], True
+
+
+def resolve_nodes(folder: str) -> Tuple[List[Dict[str, Any]], int]:
+    """The agent's packaged memory nodes, and how many of them were inherited."""
+    path = f"{folder}/memory_stream/nodes.json"
+    own = _read_json(path) if os.path.exists(path) else []
+    parent = read_fork(folder)
+    if parent is None:
+        return own, 0
+    inherited, _ = resolve_nodes(parent)
+    return inherited + own, len(inherited)
+
+
+def resolve_embeddings(folder: str, mode: str = EMBEDDING_STORAGE_MODE) -> Tuple[Any, Set[str]]:
+    """The agent's embeddings in the requested mode, and the contents whose embedding was inherited."""
+    memory_stream_folder = f"{folder}/memory_stream"
+    if os.path.exists(embeddings_file(memory_stream_folder)):
+        own = load_embeddings(memory_stream_folder, mode)
+    else:
+        own = convert_embeddings({}, mode)
+    parent = read_fork(folder)
+    if parent is None:
+        return own, set()
+    inherited, _ = resolve_embeddings(parent, mode)
+    inherited_contents = set(inherited)
+    inherited.update(own)
+    return inherited, inherited_contents
+
+
+def resolve_inventory(folder: str) -> Tuple[Dict[str, Any], int]:
+    """The agent's inventory data, and how many of its records were inherited."""
+    path = f"{folder}/inventory.json"
+    own = _read_json(path) if os.path.exists(path) else None
+    parent = read_fork(folder)
+    if parent is None:
+        return own or {"items": [], "records": []}, 0
+    inherited, _ = resolve_inventory(parent)
+    inherited_records = inherited.get("records", [])
+    if own is None:
+        return inherited, len(inherited_records)
+    return {"items": own.get("items", []),
+            "records": inherited_records + own.get("records", []),
+            "production_plans": own.get("production_plans", [])}, len(inherited_records)
+
+
+def fork_agent(parent_population: str, agent_id: str, child_population: str, child_id: str = None) -> str:
+    """
+    Fork one agent: the child folder references the parent's files instead
+    of copying them, and the parent is frozen.
+
+    Returns:
+        The child agent folder
+    """
+    child_id = child_id or agent_id
+    parent = agent_folder(parent_population, agent_id)
+    child = agent_folder(child_population, child_id)
+    if not os.path.exists(f"{parent}/meta.json"):
+        raise FileNotFoundError(f"No agent in {parent}")
+    if os.path.exists(f"{child}/meta.json"):
+        raise FileExistsError(f"An agent already exists in {child}")
+
+    os.makedirs(child, exist_ok=True)
+    write_fork(child, parent)
+    with open(f"{child}/meta.json", "w") as json_file:
+        json.dump({"population": child_population,
+                   "id": child_id,
+                   "forked_population": parent_population,
+                   "forked_id": agent_id}, json_file, indent=2)
+    if not is_frozen(parent):
+        with open(f"{parent}/{FROZEN_FILE}", "w") as json_file:
+            json.dump({"forked_by": []}, json_file)
+    frozen = _read_json(f"{parent}/{FROZEN_FILE}")
+    frozen["forked_by"].append(f"{child_population}/{child_id}")
+    with open(f"{parent}/{FROZEN_FILE}", "w") as json_file:
+        json.dump(frozen, json_file, indent=2)
+    return child
+
+
+def fork_population(parent_population: str, child_population: str, agent_ids: List[str] = None) -> List[str]:
+    """
+    Fork every agent (or the given agents) of a population.
+
+    Returns:
+        The ids of the forked agents
+    """
+    population_path = f"{POPULATIONS_DIR}/{parent_population}"
+    if agent_ids is None:
+        agent_ids = sorted(name for name in os.listdir(population_path)
+                           if os.path.exists(f"{population_path}/{name}/meta.json"))
+    for agent_id in agent_ids:
+        fork_agent(parent_population, agent_id, child_population)
+    return agent_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fork a population copy-on-write')
+    parser.add_argument('--parent', required=True, help='Population to fork (becomes read-only)')
+    parser.add_argument('--child', required=True, help='Name of the new population')
+    parser.add_argument('--agents', nargs='+', default=None, help='Agent ids to fork (default: every agent)')
+    args = parser.parse_args()
+
+    forked = fork_population(args.parent, args.child, args.agents)
+    print(f"Forked {len(forked)} agents from {args.parent} into {args.child}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Population Snapshots
+
+A whole population in one binary file, for warm starts of large experiments:
+loading from it opens one file and parses one small JSON section per agent
+component instead of opening five files per agent and parsing every
+embedding list.
+
+Layout (offsets in the header are relative to the start of the data, the
+first 64-byte boundary after the header):
+
+- preamble: 8-byte magic and the header length (little-endian uint64)
+- header: JSON index with the population, the embedding mode and dimension,
+  and per agent its meta, the offset and length of its sections and its
+  rows of the embedding block
+- per-agent sections: scratch, nodes, inventory and the contents of its
+  embeddings, each UTF-8 JSON
+- embedding block: every agent's embedding vectors as one contiguous
+  rows x dim array (float64, float16 or int8), followed for int8 by the
+  float32 per-vector scales
+
+SnapshotAgentStore reads agents from a snapshot. The embedding block is
+memory-mapped copy-on-write, so a quantized memory stream is a view of its
+rows (nothing is read until a vector is used) and updates never reach the
+file. Saves go to another store (the default one unless given).
+
+Usage:
+    python -m generative_agent.population_snapshot export --population Synthetic --out snapshots/Synthetic.agsnap
+    python -m generative_agent.population_snapshot export --population Synthetic --out Synthetic_int8.agsnap --embedding-mode int8
+    python -m generative_agent.population_snapshot import --snapshot snapshots/Synthetic.agsnap
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from simulation_engine.settings import EMBEDDING_STORAGE_MODE
+from simulation_engine.global_methods import create_folder_if_not_there
+from generative_agent.modules.cognitive.memory_stream import QuantizedEmbeddings, convert_embeddings
+from generative_agent.agent_store import AgentStore, get_agent_store
+from generative_agent.generative_agent import GenerativeAgent
+
+MAGIC = b"AGSNAP01"
+PREAMBLE = struct.Struct("<8sQ")
+ALIGNMENT = 64
+SECTIONS = ("scratch", "nodes", "inventory", "contents")
+VECTOR_DTYPES = {"float64": np.float64, "float16": np.float16, "int8": np.int8}
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _embedding_arrays(embeddings: Any, mode: str):
+    """(contents, vectors, scales) of an agent's embeddings in the snapshot's mode."""
+    embeddings = convert_embeddings(embeddings, mode)
+    if isinstance(embeddings, QuantizedEmbeddings):
+        arrays = embeddings.to_arrays()
+        return arrays["contents"].tolist(), arrays["vectors"], arrays.get("scales")
+    contents = list(embeddings)
+    vectors = np.array([embeddings[content] for content in contents], dtype=np.float64)
+    return contents, vectors, None
+
+
+def export_population(population: str, path: str, store: Optional[AgentStore] = None,
+                      agent_ids: Optional[List[str]] = None,
+                      embedding_mode: str = EMBEDDING_STORAGE_MODE) -> int:
+    """
+    Write a population (or some of its agents) to a snapshot file.
+
+    Returns:
+        The number of agents written
+    """
+    store = store or get_agent_store()
+    agent_ids = agent_ids if agent_ids is not None else store.list_agents(population)
+
+    sections: List[bytes] = []
+    position = 0
+    index: Dict[str, Any] = {}
+    vector_blocks, scale_blocks = [], []
+    rows, dim = 0, None
+    for agent_id in agent_ids:
+        agent = GenerativeAgent(population, agent_id, embedding_mode=embedding_mode, store=store)
+        contents, vectors, scales = _embedding_arrays(agent.memory_stream.embeddings, embedding_mode)
+        if len(contents):
+            if dim is not None and vectors.shape[1] != dim:
+                raise ValueError(f"{agent_id}'s embeddings have {vectors.shape[1]} dimensions, expected {dim}")
+            dim = vectors.shape[1]
+            vector_blocks.append(vectors)
+            if scales is not None:
+                scale_blocks.append(scales)
+
+        components = {"scratch": agent.scratch.package(),
+                      "nodes": [node.package() for node in agent.memory_stream.seq_nodes],
+                      "inventory": agent.package_inventory(),
+                      "contents": contents}
+        entry = {"meta": agent.package(), "rows": [rows, len(contents)]}
+        for name in SECTIONS:
+            data = json.dumps(components[name]).encode("utf-8")
+            entry[name] = [position, len(data)]
+            sections.append(data)
+            position += len(data)
+        index[agent_id] = entry
+        rows += len(contents)
+
+    dtype = VECTOR_DTYPES[embedding_mode]
+    vectors_offset = _aligned(position)
+    scales_offset = _aligned(vectors_offset + rows * (dim or 0) * np.dtype(dtype).itemsize)
+    header = json.dumps({"version": 1,
+                         "population": population,
+                         "embedding_mode": embedding_mode,
+                         "dim": dim or 0,
+                         "rows": rows,
+                         "vectors": vectors_offset,
+                         "scales": scales_offset if embedding_mode == "int8" else None,
+                         "agent_ids": list(agent_ids),
+                         "agents": index}).encode("utf-8")
+    data_start = _aligned(PREAMBLE.size + len(header))
+
+    create_folder_if_not_there(path)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as snapshot_file:
+        snapshot_file.write(PREAMBLE.pack(MAGIC, len(header)))
+        snapshot_file.write(header)
+        snapshot_file.seek(data_start)
+        for data in sections:
+            snapshot_file.write(data)
+        snapshot_file.seek(data_start + vectors_offset)
+        for vectors in vector_blocks:
+            snapshot_file.write(np.ascontiguousarray(vectors, dtype=dtype).tobytes())
+        if embedding_mode == "int8":
+            snapshot_file.seek(data_start + scales_offset)
+            for scales in scale_blocks:
+                snapshot_file.write(np.ascontiguousarray(scales, dtype=np.float32).tobytes())
+    os.replace(temp_path, path)
+    return len(agent_ids)
+
+
+class SnapshotAgentStore(AgentStore):
+    """Read agents from a population snapshot; writes go to write_store."""
+
+    def __init__(self, path: str, write_store: Optional[AgentStore] = None):
+        self.path = path
+        self.write_store = write_store or get_agent_store()
+        with open(path, "rb") as snapshot_file:
+            magic, header_length = PREAMBLE.unpack(snapshot_file.read(PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a population snapshot")
+            self.header = json.loads(snapshot_file.read(header_length))
+            self._data = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.population = self.header["population"]
+        self.embedding_mode = self.header["embedding_mode"]
+        self._data_start = _aligned(PREAMBLE.size + header_length)
+
+        rows, dim = self.header["rows"], self.header["dim"]
+        self._vectors = self._scales = None
+        if rows and dim:
+            self._vectors = np.memmap(path, dtype=VECTOR_DTYPES[self.embedding_mode], mode="c",
+                                      offset=self._data_start + self.header["vectors"], shape=(rows, dim))
+            if self.header["scales"] is not None:
+                self._scales = np.memmap(path, dtype=np.float32, mode="c",
+                                         offset=self._data_start + self.header["scales"], shape=(rows,))
+
+    def __reduce__(self):
+        # The file is mapped again rather than pickled with the store
+        return (SnapshotAgentStore, (self.path, self.write_store))
+
+    def _entry(self, population: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        if population != self.population:
+            return None
+        return self.header["agents"].get(agent_id)
+
+    def _section(self, population: str, agent_id: str, name: str) -> Any:
+        offset, length = self._entry(population, agent_id)[name]
+        start = self._data_start + offset
+        return json.loads(self._data[start:start + length])
+
+    def list_populations(self) -> List[str]:
+        return [self.population]
+
+    def list_agents(self, population: str) -> List[str]:
+        return sorted(self.header["agent_ids"]) if population == self.population else []
+
+    def exists(self, population: str, agent_id: str) -> bool:
+        return self._entry(population, agent_id) is not None
+
+    def item_holders(self, population: str, item_name: str) -> List[Dict[str, Any]]:
+        holders = []
+        for agent_id in self.list_agents(population):
+            for item in self._section(population, agent_id, "inventory").get("items", []):
+                if item["name"] == item_name and item["quantity"] > 0:
+                    holders.append({"agent_id": agent_id, "quantity": item["quantity"], "value": item.get("value", 0.0)})
+        return holders
+
+    def read_meta(self, agent, population: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        # The agent was not read from the write store, so its first save
+        # there writes it whole.
+        agent._source_folder = None
+        agent._fork_parent = None
+        agent._fork_base = None
+        agent._store_marks = None
+        entry = self._entry(population, agent_id)
+        return dict(entry["meta"]) if entry else None
+
+    def read_scratch(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        return self._section(population, agent_id, "scratch")
+
+    def read_nodes(self, agent, population: str, agent_id: str) -> List[Dict[str, Any]]:
+        return self._section(population, agent_id, "nodes")
+
+    def read_embeddings(self, agent, population: str, agent_id: str, mode: str) -> Any:
+        contents = self._section(population, agent_id, "contents")
+        start, count = self._entry(population, agent_id)["rows"]
+        if not count:
+            return convert_embeddings({}, mode)
+        vectors = self._vectors[start:start + count]
+        if self.embedding_mode == "float64":
+            embeddings = {content: vector.tolist() for content, vector in zip(contents, vectors)}
+        else:
+            scales = self._scales[start:start + count] if self._scales is not None else None
+            embeddings = QuantizedEmbeddings.from_arrays(self.embedding_mode, contents, vectors, scales)
+        return convert_embeddings(embeddings, mode)
+
+    def read_inventory(self, agent, population: str, agent_id: str) -> Dict[str, Any]:
+        return self._section(population, agent_id, "inventory")
+
+    def initialize(self, agent, population: str, agent_id: str) -> bool:
+        return self.write_store.initialize(agent, population, agent_id)
+
+    def write(self, agent, population: str, agent_id: str):
+        self.write_store.write(agent, population, agent_id)
+
+    def write_inventories(self, agents: List[Any]):
+        self.write_store.write_inventories(agents)
+
+    def import_folder(self, population: str, agent_id: str, folder: str):
+        self.write_store.import_folder(population, agent_id, folder)
+
+
+def import_snapshot(path: str, store: Optional[AgentStore] = None) -> int:
+    """
+    Write every agent of a snapshot to a store (default: the one selected by
+    AGENT_STORE), e.g. to move a population to another machine.
+
+    Returns:
+        The number of agents written
+    """
+    snapshot = SnapshotAgentStore(path, write_store=store)
+    agent_ids = snapshot.list_agents(snapshot.population)
+    for agent_id in agent_ids:
+        agent = GenerativeAgent(snapshot.population, agent_id, embedding_mode=snapshot.embedding_mode, store=snapshot)
+        agent.save()
+    return len(agent_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export or import a population snapshot')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Write a population to a snapshot file')
+    export_parser.add_argument('--population', default='Synthetic', help='Population to export')
+    export_parser.add_argument('--out', required=True, help='Snapshot file to write')
+    export_parser.add_argument('--agents', nargs='+', default=None, help='Agent ids to export (default: every agent)')
+    export_parser.add_argument('--embedding-mode', default=EMBEDDING_STORAGE_MODE, choices=list(VECTOR_DTYPES),
+                               help='Storage of the embedding block')
+    import_parser = subparsers.add_parser('import', help='Write the agents of a snapshot to the agent store')
+    import_parser.add_argument('--snapshot', required=True, help='Snapshot file to read')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        count = export_population(args.population, args.out, agent_ids=args.agents, embedding_mode=args.embedding_mode)
+        print(f"Exported {count} agents of {args.population} to {args.out} ({os.path.getsize(args.out) / 1e6:.1f} MB)")
+    else:
+        count = import_snapshot(args.snapshot)
+        print(f"Imported {count} agents from {args.snapshot}")
+
+
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,9 @@ Usage:
 
     # Run with specific mode and parameters
     python main.py --mode simulation --steps 120 --weight-update 40 --production-update 60
+    python main.py --mode simulation --checkpoint-every 10
+    python main.py --mode simulation --resume output/checkpoints/run_20250101_120000/step_00110
+    python main.py --mode simulation --snapshot snapshots/Synthetic.agsnap
     python main.py --mode interview --agent rowan_greenwood
     python main.py --mode chat --agent jasmine_carter
     python main.py --mode build-agents
@@ -43,6 +46,9 @@ from simulation_engine.global_methods import *
 
 from agent_bank.navigator import *
 from generative_agent.generative_agent import *
+from generative_agent.agent_store import get_agent_store
+from generative_agent.population_snapshot import SnapshotAgentStore
+from generative_agent.create_agent import build_agents
 
 from generative_agent.modules.conversation_trade_analyzer import ConversationTradeAnalyzer
 from generative_agent.modules.conversation_interaction import ConversationBasedInteraction
@@ -51,29 +57,18 @@ from simulation_engine.simulation import Simulation
 
 def get_agent_names_from_population(population="Synthetic"):
   """
-  Dynamically get all agent names from a population directory.
+  Dynamically get all agent names of a population from the agent store.
 
   Args:
       population (str): Population name (default: "Synthetic")
 
   Returns:
-      List[str]: List of agent directory names in the population
+      List[str]: Sorted agent ids of the population
   """
-  import os
-  population_path = f"agent_bank/populations/{population}"
-
-  if not os.path.exists(population_path):
-    print(f"Warning: Population directory '{population_path}' does not exist")
-    return []
-
-  agent_names = []
-  for item in os.listdir(population_path):
-    item_path = os.path.join(population_path, item)
-    # Only include directories, exclude hidden files
-    if os.path.isdir(item_path) and not item.startswith('.'):
-      agent_names.append(item)
-
-  return sorted(agent_names)
+  agent_names = get_agent_store().list_agents(population)
+  if not agent_names:
+    print(f"Warning: Population '{population}' has no agents in the agent store")
+  return agent_names
 
 def load_all_agent_memories():
   """
@@ -122,7 +117,7 @@ def load_all_agent_memories():
   return agent_memories
 
 #from testing.questions.rowan_greenwood_questions import *
-def run_simulation(agent_names, total_steps, weight_update_cycle, production_cycle, testing_mode):
+def run_simulation(agent_names, total_steps, weight_update_cycle, production_cycle, testing_mode, concurrent=False, adaptive=False, resume_from=None, snapshot=None, checkpoint_interval=CHECKPOINT_INTERVAL):
   """
   Run a full multi-agent market simulation with all 8 agents.
 
@@ -133,11 +128,18 @@ def run_simulation(agent_names, total_steps, weight_update_cycle, production_cyc
   - All agent interactions, trades, and reflections
 
   The simulation outputs real-time events including conversations, trades,
-  reflections, and network dynamics.
+  reflections, and network dynamics. With concurrent=True every step runs a
+  round of disjoint agent pairs at the same time instead of a single walker.
+  With adaptive=True weight updates and production fire on market activity,
+  with the cycles as ceilings. With checkpoint_interval set a checkpoint is 
+  written every that many steps; with resume_from set to a checkpoint folder 
+  the run continues after the checkpoint's step, with its run parameters. 
+  With snapshot set to a population snapshot file the agents are loaded 
+  from it (warm start). 
   """
 
-  simulation = Simulation(agent_names=agent_names)
-  simulation.run_full_simulation(total_steps=total_steps, weight_update_cycle=weight_update_cycle, production_cycle=production_cycle, testing_mode=testing_mode)
+  simulation = Simulation(agent_names=agent_names, snapshot=snapshot)
+  simulation.run_full_simulation(total_steps=total_steps, weight_update_cycle=weight_update_cycle, production_cycle=production_cycle, testing_mode=testing_mode, concurrent=concurrent, adaptive=adaptive, checkpoint_interval=checkpoint_interval, resume_from=resume_from)
 
 def chat_session(generative_agent, stateless=False):
   """
@@ -196,13 +198,14 @@ def chat_session(generative_agent, stateless=False):
     #generative_agent.working_memory.end_interaction()
 
 
-def setup_agent_inventory(agent, agent_name):
+def setup_agent_inventory(agent, agent_name, save=True):
   """
   Set up initial inventory for an agent and clear trade history.
 
   Args:
       agent (GenerativeAgent): The agent to set up
       agent_name (str): Agent identifier to determine which inventory to load
+      save (bool): Save the agent to its own population (default: True)
 
   Clears existing inventory and records, then loads agent-specific items including:
   - Specialized products matching agent's profession
@@ -213,9 +216,9 @@ def setup_agent_inventory(agent, agent_name):
   Each agent receives 11+ unique SKUs reflecting their merchant specialization.
   """
   # Clear existing inventory and records
-  agent.inventory.items.clear()
-  agent.inventory.records.clear()
-  agent.save()  # Save the cleared inventory to JSON files
+  agent.inventory.clear()
+  if save:
+    agent.save()  # Save the cleared inventory to JSON files
 # Target: 11 product SKUs per agent (excluding digital cash)
 
   if agent_name == "rowan_greenwood":
@@ -350,16 +353,19 @@ def setup_agent_inventory(agent, agent_name):
       agent.add_to_inventory("digital cash", 10000, 1, 1.00, 0.00, "Starting business cash")
       print(f"  Note: No specific inventory configured for {agent_name}, added default digital cash only")
 
-  agent.save()  # Save the cleared inventory to JSON files
+  if save:
+    agent.save()  # Save the cleared inventory to JSON files
 
 
 def build_agent():
   """
   Build and initialize all agents with memories and inventories.
 
-  For each agent:
+  For each agent (BUILD_MAX_WORKERS agents at a time, see
+  generative_agent.create_agent.build_agents):
   1. Loads base agent from Synthetic_Base population
-  2. Injects predefined memories from memory modules (dynamically loaded)
+  2. Injects predefined memories from memory modules (dynamically loaded),
+     with batched importance scoring and embeddings
   3. Sets up specialized inventory with merchant products
   4. Saves to Synthetic population for simulation use
 
@@ -380,36 +386,20 @@ def build_agent():
   print(f"Found memories for {len(all_memories)} agents")
   print(f"Building agents: {', '.join(all_memories.keys())}\n")
 
-  built_count = 0
-  failed_count = 0
-
-  for agent_name, memories in all_memories.items():
-    try:
-      print(f"Building {agent_name}...")
-
-      # Load base agent from Synthetic_Base
-      agent = GenerativeAgent("Synthetic_Base", agent_name)
-
-      # Add memories
-      for memory in memories:
-        agent.remember(memory)
-
+  def prepare(agent_name):
+    def setup(agent):
       # Setup inventory (only if this agent has inventory configured)
       try:
-        setup_agent_inventory(agent, agent_name)
+        setup_agent_inventory(agent, agent_name, save=False)
       except Exception as e:
         print(f"  Warning: Could not setup inventory for {agent_name}: {e}")
         print(f"  Continuing without inventory setup...")
+    return all_memories[agent_name], setup
 
-      # Save to Synthetic population
-      agent.save("Synthetic", agent_name)
-
-      print(f"  ✓ {agent_name} built successfully")
-      built_count += 1
-
-    except Exception as e:
-      print(f"  ✗ Failed to build {agent_name}: {e}")
-      failed_count += 1
+  # Agents are built concurrently and saved to Synthetic once each
+  results = build_agents(list(all_memories), prepare)
+  built_count = sum(1 for status in results.values() if status == "SUCCESS")
+  failed_count = len(results) - built_count
 
   print(f"\n{'='*50}")
   print(f"Build complete: {built_count} successful, {failed_count} failed")
@@ -886,6 +876,9 @@ def main():
 Examples:
   python main.py                                                    # Run full simulation (default)
   python main.py --mode simulation --steps 200                      # Custom simulation length
+  python main.py --mode simulation --checkpoint-every 10             # Write a checkpoint every 10 steps
+  python main.py --mode simulation --resume output/checkpoints/run_X  # Resume from the newest checkpoint
+  python main.py --mode simulation --snapshot Synthetic.agsnap      # Warm start from a population snapshot
   python main.py --mode interview --agent rowan_greenwood           # Interview specific agent
   python main.py --mode chat --agent jasmine_carter                 # Chat with agent
   python main.py --mode build-agents                                # Initialize all agents
@@ -916,10 +909,29 @@ Examples:
   parser.add_argument('--testing', action='store_true',
                      help='Run in testing mode (don\'t save agents)')
 
+  parser.add_argument('--concurrent', action='store_true',
+                     help='Run disjoint agent pairs concurrently each step')
+
+  parser.add_argument('--adaptive', action='store_true',
+                     help='Trigger weight updates and production on market activity')
+
+  parser.add_argument('--checkpoint-every', type=int, default=CHECKPOINT_INTERVAL, metavar='STEPS',
+                     help='Write a simulation checkpoint every STEPS steps (default: CHECKPOINT_INTERVAL, 0 = off)')
+
+  parser.add_argument('--resume', type=str, default=None, metavar='CHECKPOINT',
+                     help='Resume a simulation from a checkpoint folder (or the newest checkpoint of a run folder)')
+
+  parser.add_argument('--snapshot', type=str, default=None, metavar='FILE',
+                     help='Load the agents from a population snapshot (see generative_agent.population_snapshot)')
+
   args = parser.parse_args()
 
-  # Get available agents dynamically from Synthetic population
-  agent_names = get_agent_names_from_population("Synthetic")
+  # Get available agents dynamically from Synthetic population, or from the snapshot
+  if args.snapshot:
+    snapshot = SnapshotAgentStore(args.snapshot)
+    agent_names = snapshot.list_agents(snapshot.population)
+  else:
+    agent_names = get_agent_names_from_population("Synthetic")
 
   if not agent_names:
     print("Error: No agents found in Synthetic population")
@@ -937,7 +949,12 @@ Examples:
       total_steps=args.steps,
       weight_update_cycle=args.weight_update,
       production_cycle=args.production_update,
-      testing_mode=args.testing
+      testing_mode=args.testing,
+      concurrent=args.concurrent,
+      adaptive=args.adaptive,
+      resume_from=args.resume,
+      snapshot=args.snapshot,
+      checkpoint_interval=args.checkpoint_every
     )
 
   elif args.mode == 'interview':
@@ -0,0 +1,157 @@
+"""
+Simulation Checkpoints
+
+A checkpoint is a folder holding everything Simulation.run_full_simulation
+needs to continue a run from the step after it was written:
+
+- state.json.gz: the simulation and loop state (network weights and their
+  history, cached partner scores, partner evidence, market ledger, cycle
+  accumulators, trigger policy and the random and numpy RNG states), as
+  gzipped JSON
+- agents/<agent id>/: a snapshot of every agent's storage, in the agent
+  bank folder layout whatever the agent store
+
+Checkpoints are written to a temporary folder and renamed into place, so a
+crash while writing one leaves the previous checkpoints intact. On resume
+the agents are read from the snapshots through a CheckpointAgentStore, and
+the checkpoint itself is never modified: until the resumed run saves them,
+the agent store keeps whatever state the agents had when the run stopped.
+"""
+
+import gzip
+import json
+import os
+import random
+import shutil
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from generative_agent.agent_store import AgentStore, FolderAgentStore, get_agent_store
+
+STATE_FILE = "state.json.gz"
+AGENTS_FOLDER = "agents"
+CHECKPOINT_PREFIX = "step_"
+
+
+def rng_state() -> Dict[str, Any]:
+    """State of the random and numpy global generators, as JSON-serializable lists."""
+    version, internal, gauss_next = random.getstate()
+    name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    return {
+        'random': [version, list(internal), gauss_next],
+        'numpy': [name, keys.tolist(), position, has_gauss, cached_gaussian]
+    }
+
+
+def set_rng_state(state: Dict[str, Any]):
+    """Restore the generators from rng_state()."""
+    version, internal, gauss_next = state['random']
+    random.setstate((version, tuple(internal), gauss_next))
+    name, keys, position, has_gauss, cached_gaussian = state['numpy']
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), position, has_gauss, cached_gaussian))
+
+
+def checkpoint_folder(root: str, step: int) -> str:
+    return os.path.join(root, f"{CHECKPOINT_PREFIX}{step:05d}")
+
+
+def write_checkpoint(root: str, step: int, state: Dict[str, Any], agents: List[Any]) -> str:
+    """
+    Write the checkpoint of a step under root.
+
+    Args:
+        root: Folder holding the run's checkpoints
+        step: Last completed simulation step
+        state: JSON-serializable simulation state
+        agents: Agents to snapshot
+
+    Returns:
+        The checkpoint folder
+    """
+    folder = checkpoint_folder(root, step)
+    staging = folder + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, AGENTS_FOLDER))
+
+    state = dict(state, agents=[{'population': agent.population, 'id': agent.id} for agent in agents])
+    for agent in agents:
+        agent.save_snapshot(os.path.join(staging, AGENTS_FOLDER, agent.id))
+    with gzip.open(os.path.join(staging, STATE_FILE), 'wt', encoding='utf-8') as f:
+        json.dump(state, f, default=str)
+
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(staging, folder)
+    return folder
+
+
+def read_checkpoint(folder: str) -> Dict[str, Any]:
+    """The state of a checkpoint folder (or of the newest checkpoint under a root folder)."""
+    if not os.path.exists(os.path.join(folder, STATE_FILE)):
+        checkpoints = list_checkpoints(folder)
+        if not checkpoints:
+            raise FileNotFoundError(f"No checkpoint found in {folder}")
+        folder = checkpoints[-1]
+    with gzip.open(os.path.join(folder, STATE_FILE), 'rt', encoding='utf-8') as f:
+        state = json.load(f)
+    state['checkpoint_folder'] = folder
+    return state
+
+
+class CheckpointAgentStore(FolderAgentStore):
+    """
+    Read the agents of a checkpoint from its snapshots
+    (<checkpoint>/agents/<agent id>/); writes go to write_store.
+
+    The reads keep the folder store's bookkeeping, so a forked agent is
+    written back as a fork of the same parent.
+    """
+
+    def __init__(self, checkpoint_folder: str, population: str, write_store: Optional[AgentStore] = None):
+        super().__init__(os.path.join(checkpoint_folder, AGENTS_FOLDER))
+        self.population = population
+        self.write_store = write_store or get_agent_store()
+
+    def folder(self, population: str, agent_id: str) -> str:
+        return f"{self.root}/{agent_id}"
+
+    def list_populations(self) -> List[str]:
+        return [self.population]
+
+    def list_agents(self, population: str) -> List[str]:
+        if population != self.population or not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.exists(f"{self.root}/{name}/meta.json"))
+
+    def exists(self, population: str, agent_id: str) -> bool:
+        return population == self.population and super().exists(population, agent_id)
+
+    def initialize(self, agent, population: str, agent_id: str) -> bool:
+        return self.write_store.initialize(agent, population, agent_id)
+
+    def write(self, agent, population: str, agent_id: str):
+        self.write_store.write(agent, population, agent_id)
+
+    def write_inventories(self, agents: List[Any]):
+        self.write_store.write_inventories(agents)
+
+    def import_folder(self, population: str, agent_id: str, folder: str):
+        self.write_store.import_folder(population, agent_id, folder)
+
+
+def list_checkpoints(root: str) -> List[str]:
+    """Checkpoint folders under root, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    names = sorted(name for name in os.listdir(root)
+                   if name.startswith(CHECKPOINT_PREFIX) and not name.endswith(".tmp")
+                   and os.path.exists(os.path.join(root, name, STATE_FILE)))
+    return [os.path.join(root, name) for name in names]
+
+
+def prune_checkpoints(root: str, keep: int):
+    """Delete all but the newest keep checkpoints under root."""
+    if keep is None or keep <= 0:
+        return
+    for folder in list_checkpoints(root)[:-keep]:
+        shutil.rmtree(folder, ignore_errors=True)
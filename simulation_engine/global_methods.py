@@ -321,6 +321,49 @@ def chunk_list(lst, q_chunk_size):
   return chunked_list
 
 
+def estimate_tokens(text):
+  """
+  Rough token count of a prompt (about four characters per token for 
+  English text), used to keep batched prompts under a token budget.
+
+  Parameters:
+  text (str): The text to measure.
+
+  Returns:
+  int: The estimated number of tokens.
+  """
+  return len(text) // 4 + 1
+
+
+def chunk_by_token_budget(items, texts, budget):
+  """
+  Splits items into consecutive chunks whose texts fit in a token budget. 
+  An item that is larger than the budget on its own gets its own chunk.
+
+  Parameters:
+  items (list): The items to be split into chunks.
+  texts (list): The prompt text of each item.
+  budget (int): The maximum estimated tokens per chunk.
+
+  Returns:
+  list: A list of sublists of items.
+  """
+  chunks = []
+  current = []
+  current_tokens = 0
+  for item, text in zip(items, texts):
+    tokens = estimate_tokens(text)
+    if current and current_tokens + tokens > budget:
+      chunks.append(current)
+      current = []
+      current_tokens = 0
+    current.append(item)
+    current_tokens += tokens
+  if current:
+    chunks.append(current)
+  return chunks
+
+
 def write_dict_to_json(data, filename):
     """
     Writes a dictionary to a JSON file.
@@ -338,6 +381,33 @@ def write_dict_to_json(data, filename):
         print(f"An error occurred: {e}")
 
 
+def write_json_files_atomically(files):
+    """
+    Writes several JSON files as one unit. Every payload is serialized before
+    anything touches the disk, then each file is written to a temporary file
+    and moved into place, so a serialization error leaves all of the files
+    unchanged and no file is ever left half-written.
+
+    Parameters:
+    files (dict): Maps each file path to the data to write there.
+    """
+    serialized = {path: json.dumps(data, indent=2) for path, data in files.items()}
+    temp_paths = []
+    try:
+        for path, text in serialized.items():
+            create_folder_if_not_there(path)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w') as json_file:
+                json_file.write(text)
+            temp_paths.append((temp_path, path))
+    except Exception:
+        for temp_path, _ in temp_paths:
+            os.remove(temp_path)
+        raise
+    for temp_path, path in temp_paths:
+        os.replace(temp_path, path)
+
+
 def read_json_to_dict(file_path):
     """
     Reads a JSON file and converts it to a Python dictionary.
@@ -206,6 +206,20 @@ def get_text_embedding(text: str,
   return response.data[0].embedding
 
 
+def get_text_embeddings(texts: List[str], 
+                        model: str = "text-embedding-3-small") -> List[List[float]]:
+  """Generate the embeddings of several texts with one OpenAI API request."""
+  if not texts: 
+    return []
+  if any(not isinstance(text, str) or not text.strip() for text in texts):
+    raise ValueError("Input texts must be non-empty strings.")
+
+  texts = [text.replace("\n", " ").strip() for text in texts]
+  client = OpenAI(api_key=OPENAI_API_KEY)
+  response = client.embeddings.create(model=model, input=texts)
+  return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
 
 
 
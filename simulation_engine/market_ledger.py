@@ -0,0 +1,223 @@
+"""
+Market Ledger
+
+Population-wide, append-only record of every executed trade. Each agent's
+inventory keeps its own records; the ledger is the market-wide view used for
+the leaderboard, agent stats and simulation outputs, so those no longer keep
+their own running totals or re-filter the interaction history.
+
+Entries are indexed by seller, buyer, item and step. Time-range queries use a
+step-sorted index (O(log n + result)); trades are also checked for
+conservation: between the two parties, the total digital cash and the total
+quantity of every traded item must be the same before and after the trade.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional
+
+CASH_ITEM = "digital cash"
+CONSERVATION_TOLERANCE = 1e-6
+
+
+def empty_agent_stats() -> Dict[str, float]:
+    return {'sales': 0, 'purchases': 0, 'net_value': 0, 'trade_count': 0}
+
+
+class MarketLedger:
+    """Append-only ledger of executed trades with cross-agent indexes."""
+
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+        self.conservation_violations: List[Dict[str, Any]] = []
+
+        self._by_seller: Dict[str, List[int]] = {}
+        self._by_buyer: Dict[str, List[int]] = {}
+        self._by_item: Dict[str, List[int]] = {}
+        # Entry ids sorted by step (steps are normally appended in order).
+        self._steps: List[float] = []
+        self._step_ids: List[int] = []
+        # Per-agent totals, updated as trades are appended.
+        self._agent_stats: Dict[str, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def snapshot(agents: List[Any]) -> Dict[str, float]:
+        """Combined item quantities of a group of agents, for conservation checks."""
+        totals: Dict[str, float] = {}
+        for agent in agents:
+            for item_name, quantity in agent.inventory.get_all_items().items():
+                totals[item_name] = totals.get(item_name, 0) + quantity
+        return totals
+
+    @staticmethod
+    def check_conservation(before: Dict[str, float], after: Dict[str, float],
+                           items: List[Dict[str, Any]]) -> List[str]:
+        """
+        Compare two snapshots of the trading parties on digital cash and the
+        traded items. Returns a description of every quantity that changed.
+        """
+        problems = []
+        names = {CASH_ITEM} | {item.get('name', '') for item in items if item.get('name')}
+        for name in sorted(names):
+            delta = after.get(name, 0) - before.get(name, 0)
+            if abs(delta) > CONSERVATION_TOLERANCE:
+                problems.append(f"{name} changed by {delta:+g}")
+        return problems
+
+    def record_trade(self, trade_result: Dict[str, Any], step: int,
+                     before: Optional[Dict[str, float]] = None,
+                     after: Optional[Dict[str, float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Append an executed trade to the ledger.
+
+        Args:
+            trade_result: Result of ConversationTradeAnalyzer.execute_trade
+            step: Simulation step of the trade
+            before: snapshot() of both parties before the trade (optional)
+            after: snapshot() of both parties after the trade (optional)
+
+        Returns:
+            The ledger entry (the trade result plus ledger fields), or None if
+            the trade was not executed.
+        """
+        if not trade_result or not trade_result.get('executed'):
+            return None
+
+        details = trade_result.get('trade_details') or {}
+        participants = details.get('participants', {})
+        items = details.get('items', [])
+        seller = participants.get('seller', '')
+        buyer = participants.get('buyer', '')
+        # Item values are the total price of the line, not a unit price.
+        total_value = sum(item.get('value', 0) for item in items)
+
+        conserved = None
+        if before is not None and after is not None:
+            problems = self.check_conservation(before, after, items)
+            conserved = not problems
+            if problems:
+                violation = {'trade_id': len(self.entries), 'step': step,
+                             'seller': seller, 'buyer': buyer, 'problems': problems}
+                self.conservation_violations.append(violation)
+                print(f"   → WARNING: trade {seller} → {buyer} did not conserve goods: {'; '.join(problems)}")
+
+        entry = {
+            **trade_result,
+            'trade_id': len(self.entries),
+            'step': step,
+            'seller': seller,
+            'buyer': buyer,
+            'total_value': total_value,
+            'conserved': conserved
+        }
+        self._append(entry)
+        return entry
+
+    def _append(self, entry: Dict[str, Any]):
+        """Append a ledger entry and update the indexes and agent stats."""
+        trade_id = entry['trade_id'] = len(self.entries)
+        step = entry['step']
+        seller = entry['seller']
+        buyer = entry['buyer']
+        total_value = entry['total_value']
+        items = (entry.get('trade_details') or {}).get('items', [])
+        self.entries.append(entry)
+
+        self._by_seller.setdefault(seller, []).append(trade_id)
+        self._by_buyer.setdefault(buyer, []).append(trade_id)
+        for item_name in {item.get('name', '') for item in items}:
+            self._by_item.setdefault(item_name, []).append(trade_id)
+        if not self._steps or step >= self._steps[-1]:
+            self._steps.append(step)
+            self._step_ids.append(trade_id)
+        else:
+            position = bisect_right(self._steps, step)
+            self._steps.insert(position, step)
+            self._step_ids.insert(position, trade_id)
+
+        for name in (seller, buyer):
+            if name not in self._agent_stats:
+                self._agent_stats[name] = empty_agent_stats()
+        self._agent_stats[seller]['sales'] += total_value
+        self._agent_stats[seller]['net_value'] += total_value
+        self._agent_stats[seller]['trade_count'] += 1
+        self._agent_stats[buyer]['purchases'] += total_value
+        self._agent_stats[buyer]['net_value'] -= total_value
+        self._agent_stats[buyer]['trade_count'] += 1
+
+    def _step_range_ids(self, start_step: Optional[float], end_step: Optional[float]) -> List[int]:
+        lo = 0 if start_step is None else bisect_left(self._steps, start_step)
+        hi = len(self._steps) if end_step is None else bisect_right(self._steps, end_step)
+        return sorted(self._step_ids[lo:hi])
+
+    def get_trades(self, seller: str = None, buyer: str = None, item_name: str = None,
+                   agent: str = None, start_step: float = None, end_step: float = None) -> List[Dict[str, Any]]:
+        """
+        Get ledger entries matching every given filter, in ledger order.
+
+        Args:
+            seller: Only trades sold by this agent
+            buyer: Only trades bought by this agent
+            item_name: Only trades including this item
+            agent: Only trades this agent took part in (either side)
+            start_step: Only trades with step >= start_step
+            end_step: Only trades with step <= end_step
+        """
+        candidates = []
+        if seller is not None:
+            candidates.append(self._by_seller.get(seller, []))
+        if buyer is not None:
+            candidates.append(self._by_buyer.get(buyer, []))
+        if item_name is not None:
+            candidates.append(self._by_item.get(item_name, []))
+        if agent is not None:
+            candidates.append(sorted(self._by_seller.get(agent, []) + self._by_buyer.get(agent, [])))
+        if start_step is not None or end_step is not None:
+            candidates.append(self._step_range_ids(start_step, end_step))
+
+        if not candidates:
+            return list(self.entries)
+
+        # Intersect starting from the smallest candidate list.
+        candidates.sort(key=len)
+        ids = candidates[0]
+        for other in candidates[1:]:
+            other_ids = set(other)
+            ids = [trade_id for trade_id in ids if trade_id in other_ids]
+        return [self.entries[trade_id] for trade_id in ids]
+
+    def agent_stats(self, agent_name: str = None) -> Dict[str, Any]:
+        """Cumulative stats of one agent, or of every agent keyed by name."""
+        if agent_name is not None:
+            return dict(self._agent_stats.get(agent_name, empty_agent_stats()))
+        return {name: dict(stats) for name, stats in self._agent_stats.items()}
+
+    def leaderboard(self) -> List[Dict[str, Any]]:
+        """Agent stats sorted by sales (descending)."""
+        leaderboard = [{'agent': name, **stats} for name, stats in self._agent_stats.items()]
+        return sorted(leaderboard, key=lambda x: x['sales'], reverse=True)
+
+    def get_conservation_violations(self, start_step: float = None, end_step: float = None) -> List[Dict[str, Any]]:
+        """Trades that failed the conservation check, optionally within a step range."""
+        return [violation for violation in self.conservation_violations
+                if (start_step is None or violation['step'] >= start_step)
+                and (end_step is None or violation['step'] <= end_step)]
+
+    @classmethod
+    def from_package(cls, data: Dict[str, Any]) -> 'MarketLedger':
+        """Rebuild a ledger (indexes and stats included) from an unfiltered package()."""
+        ledger = cls()
+        for entry in data.get('trades', []):
+            ledger._append(dict(entry))
+        ledger.conservation_violations = list(data.get('conservation_violations', []))
+        return ledger
+
+    def package(self, start_step: float = None, end_step: float = None) -> Dict[str, Any]:
+        """Ledger entries (optionally limited to a step range) and stats, for output files."""
+        return {
+            'trades': self.get_trades(start_step=start_step, end_step=end_step),
+            'agent_stats': self.agent_stats(),
+            'conservation_violations': self.get_conservation_violations(start_step, end_step)
+        }
@@ -12,16 +12,26 @@ Markov chain probabilities, with reflection when staying in same state.
 """
 
 import numpy as np
+import os
 import random
+import threading
 import time
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from collections import deque
 
 from simulation_engine.settings import *
 from simulation_engine.global_methods import *
 from generative_agent.generative_agent import *
+from generative_agent.agent_store import AgentStore, get_agent_store
+from generative_agent.parallel_load import load_agents_parallel
 from generative_agent.modules.conversation_trade_analyzer import ConversationTradeAnalyzer
 from generative_agent.modules.conversation_interaction import ConversationBasedInteraction
+from simulation_engine.market_ledger import MarketLedger
+from simulation_engine.transition_matrix import SparseTransitionMatrix, as_transition_matrix
+
+# Larger populations print a summary instead of the full matrix
+MAX_PRINTED_MATRIX_AGENTS = 20
 
 
 class MarkovAgentChain:
@@ -35,8 +45,21 @@ class MarkovAgentChain:
         # Event queue for frontend consumption
         self.event_queue = deque(maxlen=event_queue_maxlen)
 
-        # Cumulative trade stats for leaderboard
-        self.agent_stats = {}  # {agent_name: {sales: 0, purchases: 0, net_value: 0, trade_count: 0}}
+        # Every executed trade; source of the leaderboard and trade outputs
+        self.ledger = MarketLedger()
+
+        # Concurrent rounds: one lock per agent so no agent is in two
+        # interactions at once, and one for the shared history/events/ledger.
+        self._agent_locks: Dict[str, threading.Lock] = {}
+        self._agent_locks_guard = threading.Lock()
+        self._history_lock = threading.RLock()
+        # (matrix passed in, its sparse form) for callers that pass dense matrices
+        self._sparse_cache: Optional[Tuple[object, SparseTransitionMatrix]] = None
+
+    @property
+    def agent_stats(self) -> Dict[str, Dict]:
+        """Cumulative trade stats per agent: {agent_name: {sales, purchases, net_value, trade_count}}."""
+        return self.ledger.agent_stats()
 
     def _emit_event(self, event_type: str, data: Dict):
         """
@@ -51,45 +74,8 @@ class MarkovAgentChain:
             'type': event_type,
             'data': data
         }
-        self.event_queue.append(event)
-
-    def _update_agent_stats(self, trade_result: Dict):
-        """
-        Update cumulative agent statistics from a trade.
-
-        Args:
-            trade_result: Trade result dictionary
-        """
-        if not trade_result.get('executed'):
-            return
-
-        details = trade_result.get('trade_details', {})
-        participants = details.get('participants', {})
-        items = details.get('items', [])
-
-        seller = participants.get('seller')
-        buyer = participants.get('buyer')
-
-        if not seller or not buyer or not items:
-            return
-
-        # Calculate total trade value
-        total_value = sum(item.get('value', 0) * item.get('quantity', 1) for item in items)
-
-        # Initialize stats if needed
-        if seller not in self.agent_stats:
-            self.agent_stats[seller] = {'sales': 0, 'purchases': 0, 'net_value': 0, 'trade_count': 0}
-        if buyer not in self.agent_stats:
-            self.agent_stats[buyer] = {'sales': 0, 'purchases': 0, 'net_value': 0, 'trade_count': 0}
-
-        # Update stats
-        self.agent_stats[seller]['sales'] += total_value
-        self.agent_stats[seller]['net_value'] += total_value
-        self.agent_stats[seller]['trade_count'] += 1
-
-        self.agent_stats[buyer]['purchases'] += total_value
-        self.agent_stats[buyer]['net_value'] -= total_value
-        self.agent_stats[buyer]['trade_count'] += 1
+        with self._history_lock:
+            self.event_queue.append(event)
 
     def get_events(self, count: Optional[int] = None) -> List[Dict]:
         """
@@ -118,21 +104,15 @@ class MarkovAgentChain:
         Returns:
             List of agent stats sorted by sales (descending)
         """
-        leaderboard = []
-        for agent_name, stats in self.agent_stats.items():
-            leaderboard.append({
-                'agent': agent_name,
-                **stats
-            })
-        return sorted(leaderboard, key=lambda x: x['sales'], reverse=True)
+        return self.ledger.leaderboard()
 
-    def get_network_data(self, agents: List[GenerativeAgent], transition_matrix: np.ndarray) -> Dict:
+    def get_network_data(self, agents: List[GenerativeAgent], transition_matrix) -> Dict:
         """
         Get network graph data with agents as nodes and transition probabilities as edges.
 
         Args:
             agents: List of agents
-            transition_matrix: Transition probability matrix
+            transition_matrix: Transition probability matrix (sparse or dense)
 
         Returns:
             Dict with nodes and edges for network visualization
@@ -140,7 +120,7 @@ class MarkovAgentChain:
         nodes = []
         for i, agent in enumerate(agents):
             agent_name = agent.scratch.get_fullname()
-            stats = self.agent_stats.get(agent_name, {'sales': 0, 'purchases': 0, 'net_value': 0, 'trade_count': 0})
+            stats = self.ledger.agent_stats(agent_name)
             nodes.append({
                 'id': agent_name,
                 'index': i,
@@ -150,15 +130,12 @@ class MarkovAgentChain:
                 'trade_count': stats['trade_count']
             })
 
-        edges = []
-        for i in range(len(agents)):
-            for j in range(len(agents)):
-                if i != j and transition_matrix[i][j] > 0:
-                    edges.append({
-                        'source': agents[i].scratch.get_fullname(),
-                        'target': agents[j].scratch.get_fullname(),
-                        'weight': float(transition_matrix[i][j])
-                    })
+        agent_names = [agent.scratch.get_fullname() for agent in agents]
+        edges = [{
+            'source': agent_names[i],
+            'target': agent_names[j],
+            'weight': weight
+        } for i, j, weight in self._as_sparse(transition_matrix).edges()]
 
         return {
             'nodes': nodes,
@@ -167,7 +144,7 @@ class MarkovAgentChain:
     
     def create_agent_transition_matrix(self, num_agents: int, 
                                      self_reflection_probability: float = 0.3,
-                                     interaction_probability: float = 0.7) -> np.ndarray:
+                                     interaction_probability: float = 0.7) -> SparseTransitionMatrix:
         """
         Create transition matrix where each state represents an agent.
         
@@ -177,43 +154,98 @@ class MarkovAgentChain:
             interaction_probability: Probability of transitioning to other agents
             
         Returns:
-            np.ndarray: Transition matrix where matrix[i][j] = P(agent_i → agent_j)
+            SparseTransitionMatrix: matrix.get(i, j) = P(agent_i → agent_j); the
+            interaction probability is stored as a uniform background per row
         """
-        matrix = np.zeros((num_agents, num_agents))
-        
-        for i in range(num_agents):
-            # Probability of staying in same state (self-reflection)
-            matrix[i][i] = self_reflection_probability
-            
-            # Distribute interaction probability among other agents
-            if num_agents > 1:
-                other_prob = interaction_probability / (num_agents - 1)
-                for j in range(num_agents):
-                    if i != j:
-                        matrix[i][j] = other_prob
-        
-        # Normalize rows to ensure probabilities sum to 1
-        for i in range(num_agents):
-            row_sum = np.sum(matrix[i])
-            if row_sum > 0:
-                matrix[i] = matrix[i] / row_sum
-        
-        return matrix
+        return SparseTransitionMatrix.uniform(num_agents, self_reflection_probability, interaction_probability)
     
-    def select_next_agent_state(self, current_state: int, transition_matrix: np.ndarray) -> int:
+    def select_next_agent_state(self, current_state: int, transition_matrix) -> int:
         """
         Select next agent state based on Markov transition probabilities.
         
         Args:
             current_state: Current agent index (state)
-            transition_matrix: Transition probability matrix
+            transition_matrix: Transition probability matrix (sparse or dense)
             
         Returns:
             int: Next agent index (state)
         """
-        probabilities = transition_matrix[current_state]
-        return np.random.choice(len(probabilities), p=probabilities)
-    
+        return self._as_sparse(transition_matrix).sample(current_state)
+
+    def _as_sparse(self, transition_matrix) -> SparseTransitionMatrix:
+        """
+        Sparse form of the matrix. Dense matrices are converted once per
+        matrix object, so they must not be modified in place once sampled.
+        """
+        if isinstance(transition_matrix, SparseTransitionMatrix):
+            return transition_matrix
+        cached = self._sparse_cache
+        if cached is None or cached[0] is not transition_matrix:
+            cached = self._sparse_cache = (transition_matrix, as_transition_matrix(transition_matrix))
+        return cached[1]
+
+    def sample_disjoint_round(self, transition_matrix) -> List[Tuple[int, int]]:
+        """
+        Sample one concurrent round: every agent, in random order, draws its
+        next state from its row of the transition matrix restricted to the
+        agents not yet taken this round. Drawing itself means reflection;
+        drawing another agent pairs the two for a conversation.
+
+        Args:
+            transition_matrix: Transition probability matrix (sparse or dense)
+
+        Returns:
+            List of (i, j) interactions with pairwise disjoint agents; i == j
+            is a reflection. Agents with no probability mass left sit out.
+        """
+        matrix = self._as_sparse(transition_matrix)
+        num_agents = len(matrix)
+        # Available agents as a list with swap-removal for O(1) uniform picks
+        available = list(range(num_agents))
+        positions = {agent: agent for agent in available}
+
+        def take(agent: int):
+            position = positions.pop(agent, None)
+            if position is None:
+                return
+            last = available.pop()
+            if last != agent:
+                available[position] = last
+                positions[last] = position
+
+        interactions = []
+        for i in random.sample(range(num_agents), num_agents):
+            if i not in positions:
+                continue
+            j = matrix.sample_available(i, available, positions)
+            take(i)
+            if j is None:
+                continue
+            take(j)
+            interactions.append((i, j))
+        return interactions
+
+    def _agent_lock(self, agent: GenerativeAgent) -> threading.Lock:
+        with self._agent_locks_guard:
+            return self._agent_locks.setdefault(agent.scratch.get_fullname(), threading.Lock())
+
+    def _run_interaction(self, agents: List[GenerativeAgent], interaction: Tuple[int, int],
+                         context: str, step: int, max_turns: int, testing_mode: bool):
+        """Run one reflection (i == j) or conversation (i != j) holding the agents' locks."""
+        i, j = interaction
+        # Locks are always taken in index order so two interactions can never deadlock.
+        locks = [self._agent_lock(agents[k]) for k in sorted({i, j})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            if i == j:
+                self.agent_self_reflection(agents[i], context, step, testing_mode)
+            else:
+                self.two_agent_conversation(agents[i], agents[j], context, step, max_turns, testing_mode)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
     def agent_self_reflection(self, agent: GenerativeAgent, context: str, step: int, testing_mode: bool = True):
         """
         Handle agent self-reflection when staying in same state.
@@ -273,12 +305,13 @@ class MarkovAgentChain:
         })
 
         # Record reflection in history
-        self.interaction_history.append({
-            'type': 'reflection',
-            'step': step,
-            'agent': agent.scratch.get_fullname(),
-            'anchor': reflection_anchor
-        })
+        with self._history_lock:
+            self.interaction_history.append({
+                'type': 'reflection',
+                'step': step,
+                'agent': agent.scratch.get_fullname(),
+                'anchor': reflection_anchor
+            })
     
     def two_agent_conversation(self, agent1: GenerativeAgent, agent2: GenerativeAgent, 
                              context: str, step: int, max_turns: int = 8, 
@@ -316,9 +349,9 @@ class MarkovAgentChain:
         # Conversation loop
         for turn in range(max_turns):
             try:
-                # Current agent speaks
+                # Current agent speaks; Act is given the conversation turn, not the simulation step
                 response, sales_detected, ended = current_speaker.Act(
-                    conversation_id, curr_dialogue, context, turn
+                    conversation_id, curr_dialogue, context, time_step=turn
                 )
                 curr_dialogue.append([current_speaker.scratch.get_fullname(), response])
                 print(f"   {current_speaker.scratch.get_fullname()}: {response}")
@@ -344,12 +377,15 @@ class MarkovAgentChain:
                 # Handle trade detection
                 if sales_detected:
                     print(f"   → Sales detected at turn {turn}")
+                    holdings_before = MarketLedger.snapshot([agent1, agent2])
                     trade_result = self.trade_analyzer.execute_trade(
                         agents=[agent1, agent2],
                         conversation_id=conversation_id,
                         conversation_text=curr_dialogue,
                         context=context,
-                        time_step=turn,
+                        # Inventory records carry the simulation step: demand
+                        # forecasts and reorder points window on it.
+                        time_step=step,
                         testing_mode=testing_mode
                     )
                     if trade_result:
@@ -357,8 +393,10 @@ class MarkovAgentChain:
                         if trade_result.get('executed'):
                             print(f"   → Trade executed: {trade_result['trade_details']}")
 
-                            # Update agent stats and emit trade event
-                            self._update_agent_stats(trade_result)
+                            # Record the trade in the ledger and emit trade event
+                            with self._history_lock:
+                                self.ledger.record_trade(trade_result, step, holdings_before,
+                                                         MarketLedger.snapshot([agent1, agent2]))
                             self._emit_event('trade', {
                                 'markov_step': step,
                                 'conversation_turn': turn,
@@ -409,7 +447,8 @@ class MarkovAgentChain:
             'turns': len(curr_dialogue),
             'ended_naturally': conversation_ended
         }
-        self.interaction_history.append(interaction_result)
+        with self._history_lock:
+            self.interaction_history.append(interaction_result)
         
         return interaction_result
     
@@ -418,10 +457,13 @@ class MarkovAgentChain:
                         num_steps: int = 20,
                         self_reflection_prob: float = 0.3,
                         interaction_prob: float = 0.7,
-                        transition_matrix: Optional[np.ndarray] = None,
+                        transition_matrix=None,
                         conversation_max_turns: int = 8,
                         start_agent: Optional[int] = None,
-                        testing_mode: bool = True) -> Dict:
+                        testing_mode: bool = True,
+                        first_step: int = 1,
+                        concurrent: bool = False,
+                        max_workers: Optional[int] = None) -> Dict:
         """
         Run the Markov chain simulation with agents as states.
         
@@ -431,9 +473,17 @@ class MarkovAgentChain:
             num_steps: Number of Markov chain steps
             self_reflection_prob: Probability of staying in same state (reflection)
             interaction_prob: Probability of transitioning to other states
-            transition_matrix: Custom transition matrix (optional)
+            transition_matrix: Custom transition matrix (optional): a
+                SparseTransitionMatrix, its to_dict() form or a dense array
             conversation_max_turns: Max turns per 2-agent conversation
             testing_mode: Whether to save agent changes
+            first_step: Number of the first step (callers running the chain one
+                step at a time pass their own step so ledger steps are global)
+            concurrent: Run each step as a round of disjoint pairs/reflectors
+                sampled from the transition matrix, executed concurrently,
+                instead of a single walker
+            max_workers: Thread pool size for concurrent rounds (default:
+                CHAIN_MAX_WORKERS), never more than a round's interactions
             
         Returns:
             Dict: Complete simulation results
@@ -458,12 +508,19 @@ class MarkovAgentChain:
                 len(agents), self_reflection_prob, interaction_prob
             )
         
-        print("Transition Matrix (Agent States):")
-        agent_names = [agent.scratch.get_fullname() for agent in agents]
-        print("     ", "  ".join([f"{name[:8]:<8}" for name in agent_names]))
-        for i, row in enumerate(transition_matrix):
-            print(f"{agent_names[i][:8]:<8}", "  ".join([f"{prob:.3f}" for prob in row]))
-        print()
+        transition_matrix = self._as_sparse(transition_matrix)
+
+        # Single-step callers run the chain once per step with the same matrix
+        if num_steps > 1:
+            agent_names = [agent.scratch.get_fullname() for agent in agents]
+            if len(agents) <= MAX_PRINTED_MATRIX_AGENTS:
+                print("Transition Matrix (Agent States):")
+                print("     ", "  ".join([f"{name[:8]:<8}" for name in agent_names]))
+                for i in range(len(agents)):
+                    print(f"{agent_names[i][:8]:<8}", "  ".join([f"{prob:.3f}" for prob in transition_matrix.row_dense(i)]))
+            else:
+                print(f"Transition Matrix: {len(agents)} agents, {transition_matrix.nnz} stored transitions")
+            print()
 
         # Initialize chain state
         if start_agent is None:
@@ -472,24 +529,43 @@ class MarkovAgentChain:
             current_state = start_agent
 
         self.interaction_history = []
+        ledger_start = len(self.ledger)
         
+        # In concurrent mode every step is a round of disjoint interactions
+        max_workers = max_workers or CHAIN_MAX_WORKERS
+
         # Run Markov chain steps
-        for step in range(num_steps):
-            current_agent = agents[current_state]
+        for step in range(first_step - 1, first_step - 1 + num_steps):
+            if concurrent:
+                round_interactions = self.sample_disjoint_round(transition_matrix)
+                print(f"Step {step + 1}: round of {len(round_interactions)} concurrent interactions")
+                workers = max(1, min(max_workers, len(round_interactions)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(self._run_interaction, agents, interaction, context,
+                                               step + 1, conversation_max_turns, testing_mode)
+                               for interaction in round_interactions]
+                    for interaction, future in zip(round_interactions, futures):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            print(f"   → Interaction {interaction} failed: {e}")
+                next_state = current_state
+            else:
+                current_agent = agents[current_state]
 
-            # Select next state
-            next_state = self.select_next_agent_state(current_state, transition_matrix)
+                # Select next state
+                next_state = self.select_next_agent_state(current_state, transition_matrix)
 
-            if next_state == current_state:
-                # Stay in same state → Reflection
-                self.agent_self_reflection(current_agent, context, step + 1, testing_mode)
-            else:
-                # Transition to different state → Conversation
-                next_agent = agents[next_state]
-                self.two_agent_conversation(
-                    current_agent, next_agent, context, step + 1,
-                    conversation_max_turns, testing_mode
-                )
+                if next_state == current_state:
+                    # Stay in same state → Reflection
+                    self.agent_self_reflection(current_agent, context, step + 1, testing_mode)
+                else:
+                    # Transition to different state → Conversation
+                    next_agent = agents[next_state]
+                    self.two_agent_conversation(
+                        current_agent, next_agent, context, step + 1,
+                        conversation_max_turns, testing_mode
+                    )
 
             # Emit network update event periodically (every 5 steps)
             if (step + 1) % 5 == 0:
@@ -503,18 +579,17 @@ class MarkovAgentChain:
             # Move to next state
             current_state = next_state
             print()  # Add spacing between steps
-        
+
         # Generate summary
         conversation_count = len([h for h in self.interaction_history if h['type'] == 'conversation'])
         reflection_count = len([h for h in self.interaction_history if h['type'] == 'reflection'])
         
-        # Collect all trades from conversations
+        # Collect all attempted trades from conversations; executed ones come from the ledger
         all_trades = []
-        executed_trades = []
         for interaction in self.interaction_history:
             if interaction['type'] == 'conversation' and 'trades' in interaction:
                 all_trades.extend(interaction['trades'])
-                executed_trades.extend([t for t in interaction['trades'] if t.get('executed')])
+        executed_trades = self.ledger.entries[ledger_start:]
         
         print("=== Simulation Summary ===")
         print(f"Total conversations: {conversation_count}")
@@ -536,7 +611,7 @@ class MarkovAgentChain:
         
         return {
             'agents': [agent.scratch.get_fullname() for agent in agents],
-            'transition_matrix': transition_matrix.tolist() if hasattr(transition_matrix, 'tolist') else transition_matrix,
+            'transition_matrix': transition_matrix.to_dict(),
             'interaction_history': self.interaction_history,
             'conversation_count': conversation_count,
             'reflection_count': reflection_count,
@@ -549,12 +624,37 @@ class MarkovAgentChain:
         }
 
 
-def load_agents_for_chain(population: str, agent_names: List[str]) -> List[GenerativeAgent]:
-    """Load agents for Markov chain simulation."""
+def load_agents_for_chain(population: str, agent_names: List[str], load_mode: str = "lazy",
+                          store: Optional[AgentStore] = None,
+                          max_workers: int = AGENT_LOAD_WORKERS) -> List[GenerativeAgent]:
+    """
+    Load agents for Markov chain simulation.
+
+    Agents are loaded lazily by default: their memory streams are only parsed
+    the first time an agent reflects, converses or is scored. store reads them
+    from another store than the default one, e.g. a population snapshot.
+
+    Full loads of several agents run on max_workers processes (see
+    generative_agent.parallel_load); lazy and profile loads read little and
+    stay in this process, as does everything on a single core machine. An
+    agent that fails to load is reported and left out.
+    """
+    max_workers = min(max_workers, os.cpu_count() or 1)
+    if load_mode == "full" and max_workers > 1 and len(agent_names) > 1:
+        def report(done, total, name, agent, error):
+            if agent is not None:
+                print(f"[{done}/{total}] Loaded: {agent.scratch.get_fullname()}")
+            else:
+                print(f"[{done}/{total}] Failed to load {name}: {error}")
+
+        agents_by_name, _ = load_agents_parallel(population, agent_names, store or get_agent_store(),
+                                                 EMBEDDING_STORAGE_MODE, max_workers, progress=report)
+        return [agents_by_name[name] for name in agent_names if name in agents_by_name]
+
     agents = []
     for name in agent_names:
         try:
-            agent = GenerativeAgent(population, name)
+            agent = GenerativeAgent(population, name, load_mode=load_mode, store=store)
             agents.append(agent)
             print(f"Loaded: {agent.scratch.get_fullname()}")
         except Exception as e:
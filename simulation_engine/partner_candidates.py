@@ -0,0 +1,147 @@
+"""
+Partner Candidates
+
+Candidate generation for partner scoring. Before the network-weight cycle
+asks the LLM how much an agent wants to buy from each other agent, every
+agent gets a shortlist built from cheap signals:
+
+- trade volume: digital cash paid to / received from the partner, read from
+  the agent's own inventory records
+- fit: cosine similarity between an embedding of the agent's needs (self
+  description and the items it has bought) and an embedding of what the
+  partner offers (its non-cash inventory)
+- exploration: a few random partners outside the top of the ranking, so
+  agents keep discovering new partners
+
+Only shortlisted partners are scored by the LLM; Simulation gives the rest a
+smoothed prior score. Embeddings are cached by text, so an agent is only
+re-embedded when its needs or offer change.
+"""
+
+import random
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from simulation_engine.settings import PARTNER_SHORTLIST_SIZE, PARTNER_EXPLORATION_SLOTS
+
+CASH_ITEM = "digital cash"
+PAYMENT_ACTIONS = ("receive_payment", "make_payment")
+
+
+def trade_volumes(agent: Any) -> Dict[str, float]:
+    """Digital cash exchanged with each trade partner, from the agent's inventory records."""
+    volumes: Dict[str, float] = {}
+    for record in agent.inventory.get_records(PAYMENT_ACTIONS):
+        if record.trade_partner:
+            volumes[record.trade_partner] = volumes.get(record.trade_partner, 0.0) + abs(record.quantity)
+    return volumes
+
+
+def needs_text(agent: Any) -> str:
+    """What the agent is looking for: who it is and what it has bought before."""
+    bought = sorted({record.item_name for record in agent.inventory.get_records("buy_item")})
+    text = f"{agent.scratch.get_fullname()}: {agent.scratch.self_description}"
+    if bought:
+        text += f"\nBuys: {', '.join(bought)}"
+    return text
+
+
+def offer_text(agent: Any) -> str:
+    """What the agent has to sell."""
+    items = sorted(name for name in agent.inventory.get_all_items() if name != CASH_ITEM)
+    return f"{agent.scratch.get_fullname()} sells: {', '.join(items) if items else 'nothing'}"
+
+
+class PartnerShortlister:
+    """Top-K partner shortlists per agent from trade volume, needs/offer fit and exploration."""
+
+    def __init__(self, shortlist_size: int = PARTNER_SHORTLIST_SIZE,
+                 exploration_slots: int = PARTNER_EXPLORATION_SLOTS,
+                 embed: Optional[Callable[[str], List[float]]] = None):
+        """
+        Args:
+            shortlist_size: Partners kept per agent by the cheap signals
+            exploration_slots: Extra random partners per agent
+            embed: Text embedding function (default: get_text_embedding)
+        """
+        self.shortlist_size = shortlist_size
+        self.exploration_slots = exploration_slots
+        self._embed = embed
+        self._embedding_cache: Dict[str, np.ndarray] = {}
+        self._embedding_failed = False
+
+    def _embedding(self, text: str) -> Optional[np.ndarray]:
+        if text in self._embedding_cache:
+            return self._embedding_cache[text]
+        if self._embedding_failed:
+            return None
+        try:
+            if self._embed is None:
+                from simulation_engine.gpt_structure import get_text_embedding
+                self._embed = get_text_embedding
+            vector = np.asarray(self._embed(text), dtype=float)
+        except Exception as e:
+            # Without embeddings the fit signal is skipped for this run.
+            print(f"Partner shortlist: embeddings unavailable ({e}), ranking by trade volume only")
+            self._embedding_failed = True
+            return None
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm > 0 else vector
+        self._embedding_cache[text] = vector
+        return vector
+
+    def _fit_matrix(self, agents: List[Any]) -> Optional[np.ndarray]:
+        """fit[i, j] = cosine similarity of agent i's needs and agent j's offer."""
+        needs = [self._embedding(needs_text(agent)) for agent in agents]
+        offers = [self._embedding(offer_text(agent)) for agent in agents]
+        if any(vector is None for vector in needs + offers):
+            return None
+        return np.vstack(needs) @ np.vstack(offers).T
+
+    def shortlists(self, agents: List[Any],
+                   include: Optional[Dict[str, Iterable[str]]] = None) -> Dict[str, Set[str]]:
+        """
+        Shortlisted partner names per agent name.
+
+        Args:
+            agents: Every agent of the population
+            include: Partners to shortlist regardless of their signals (e.g.
+                pairs with new evidence), per agent name
+
+        Returns:
+            {agent name: set of partner names}; every other agent when the
+            population is small enough to score everyone
+        """
+        names = [agent.scratch.get_fullname() for agent in agents]
+        include = include or {}
+        if len(names) - 1 <= self.shortlist_size + self.exploration_slots:
+            return {name: {other for other in names if other != name} for name in names}
+
+        index = {name: i for i, name in enumerate(names)}
+        fit = self._fit_matrix(agents)
+        shortlists = {}
+        for i, (agent, name) in enumerate(zip(agents, names)):
+            # Each signal is scaled to [0, 1] within the agent's row.
+            score = np.zeros(len(names))
+            volumes = trade_volumes(agent)
+            if volumes:
+                top_volume = max(volumes.values())
+                for partner, volume in volumes.items():
+                    j = index.get(partner)
+                    if j is not None and top_volume > 0:
+                        score[j] += volume / top_volume
+            if fit is not None:
+                row = fit[i]
+                spread = row.max() - row.min()
+                if spread > 0:
+                    score += (row - row.min()) / spread
+            score[i] = -np.inf
+
+            top = np.argpartition(-score, self.shortlist_size - 1)[:self.shortlist_size]
+            chosen = {names[j] for j in top}
+            rest = [other for other in names if other != name and other not in chosen]
+            chosen.update(random.sample(rest, min(self.exploration_slots, len(rest))))
+            chosen.update(other for other in include.get(name, ()) if other != name and other in index)
+            shortlists[name] = chosen
+        return shortlists
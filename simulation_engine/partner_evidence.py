@@ -0,0 +1,113 @@
+"""
+Partner Evidence
+
+Tracks, per ordered pair of agents (scorer, partner), whether anything new
+since the last network-weight cycle refers to the partner: a conversation
+or trade between the two, or a new memory or reflection of the scorer that
+mentions the partner by name. Simulation.calculate_network_weights only
+re-scores those pairs and reuses its cached raw scores for the rest, so the
+cost of a weight update scales with activity instead of N².
+
+Memories are scanned incrementally: each agent's memory stream is only read
+from the first node added after the previous scan.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+class PartnerEvidenceTracker:
+    """Dirty set of (scorer, partner) pairs with new evidence since the last clear()."""
+
+    def __init__(self, agent_names: List[str]):
+        self.agent_names = list(agent_names)
+        # {scorer: partners with new evidence}
+        self._dirty: Dict[str, Set[str]] = {}
+        # {agent name: number of memory nodes already scanned}
+        self._memory_marks: Dict[str, int] = {}
+
+        # Agents are mentioned by full name, or by first name when no other
+        # agent shares it. One alternation over every alias keeps a memory
+        # scan at one regex pass per node.
+        first_names: Dict[str, int] = {}
+        for name in self.agent_names:
+            first = name.split()[0].lower() if name.split() else ""
+            first_names[first] = first_names.get(first, 0) + 1
+        self._aliases: Dict[str, str] = {}
+        for name in self.agent_names:
+            self._aliases[name.lower()] = name
+            first = name.split()[0] if name.split() else ""
+            if first and first != name and first_names[first.lower()] == 1:
+                self._aliases.setdefault(first.lower(), name)
+        alternation = "|".join(re.escape(alias) for alias in sorted(self._aliases, key=len, reverse=True))
+        self._mentions = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE) if alternation else None
+
+    def mark(self, scorer: str, partner: str):
+        if scorer != partner:
+            self._dirty.setdefault(scorer, set()).add(partner)
+
+    def mark_both(self, first: str, second: str):
+        self.mark(first, second)
+        self.mark(second, first)
+
+    def note_interactions(self, interactions: Iterable[Dict[str, Any]]):
+        """Conversations of the Markov chain mark both participants."""
+        for interaction in interactions:
+            participants = interaction.get('participants') or []
+            for i, first in enumerate(participants):
+                for second in participants[i + 1:]:
+                    self.mark_both(first, second)
+
+    def note_trades(self, trades: Iterable[Dict[str, Any]]):
+        """Market ledger entries mark buyer and seller."""
+        for trade in trades:
+            if trade.get('seller') and trade.get('buyer'):
+                self.mark_both(trade['seller'], trade['buyer'])
+
+    def scan_memories(self, agents: List[Any]):
+        """
+        Mark (agent, partner) for every memory or reflection added since the
+        previous scan that mentions the partner. The first scan of an agent
+        only records where its memory stream ends.
+        """
+        for agent in agents:
+            name = agent.scratch.get_fullname()
+            nodes = agent.memory_stream.seq_nodes
+            start = self._memory_marks.get(name)
+            self._memory_marks[name] = len(nodes)
+            if start is None:
+                continue
+            if self._mentions is None:
+                continue
+            for node in nodes[start:]:
+                for mention in self._mentions.findall(node.content):
+                    self.mark(name, self._aliases[mention.lower()])
+
+    def is_dirty(self, scorer: str, partner: str) -> bool:
+        return partner in self._dirty.get(scorer, ())
+
+    def dirty_partners(self, scorer: str) -> Set[str]:
+        return set(self._dirty.get(scorer, ()))
+
+    def dirty_pair_count(self) -> int:
+        return sum(len(partners) for partners in self._dirty.values())
+
+    def dirty_pairs(self) -> Set[Tuple[str, str]]:
+        return {(scorer, partner) for scorer, partners in self._dirty.items() for partner in partners}
+
+    def package(self) -> Dict[str, Any]:
+        """Dirty pairs and memory scan positions, for checkpoints."""
+        return {'dirty': {scorer: sorted(partners) for scorer, partners in self._dirty.items()},
+                'memory_marks': dict(self._memory_marks)}
+
+    def restore(self, data: Dict[str, Any]):
+        """Restore the state saved by package()."""
+        self._dirty = {scorer: set(partners) for scorer, partners in data.get('dirty', {}).items()}
+        self._memory_marks = dict(data.get('memory_marks', {}))
+
+    def clear(self, scorer: str = None):
+        """Forget the evidence of one scorer (after re-scoring it), or of everyone."""
+        if scorer is None:
+            self._dirty.clear()
+        else:
+            self._dirty.pop(scorer, None)
@@ -12,4 +12,79 @@ LLM_ANALYZE_VERS = "gpt-5"
 MAX_TOKENS_CONV = 500
 BASE_DIR = f"{Path(__file__).resolve().parent.parent}"
 POPULATIONS_DIR = f"{BASE_DIR}/agent_bank/populations"
-LLM_PROMPT_DIR = f"{BASE_DIR}/simulation_engine/prompt_template"
\ No newline at end of file
+LLM_PROMPT_DIR = f"{BASE_DIR}/simulation_engine/prompt_template"
+# How memory stream embeddings are held in memory and stored on disk. 
+# "float64" keeps the original JSON lists; "float16" and "int8" (per-vector 
+# scalar quantization) store an embeddings.npz next to nodes.json instead. 
+EMBEDDING_STORAGE_MODE = "float64"
+# Minimum confidence for a trade read by the rule-based extractor to be used 
+# without the LLM trade analysis call. None always calls the LLM. 
+TRADE_RULES_MIN_CONFIDENCE = 0.8
+# Outgoing transitions kept per agent in the sparse Markov transition matrix 
+# (the agents with the highest network weights). None keeps every weight, so 
+# the matrix is exact; a number trades the weakest partners for memory. 
+TRANSITION_TOP_K = None
+# Score all trading partners of an agent in one prompt (split by the token 
+# budget) instead of one LLM call per pair when updating network weights. 
+MARKOV_SCORING_BATCHED = True
+MARKOV_SCORING_TOKEN_BUDGET = 6000
+# Partner scoring in large populations: each agent only asks the LLM about a 
+# shortlist of its PARTNER_SHORTLIST_SIZE most promising partners (trade 
+# volume, needs/inventory embedding similarity) plus random exploration 
+# slots. The others keep their cached score smoothed toward the prior. 
+PARTNER_SHORTLIST_SIZE = 24
+PARTNER_EXPLORATION_SLOTS = 4
+PARTNER_PRIOR_SCORE = 50
+PARTNER_PRIOR_DECAY = 0.5
+# Adaptive update triggers (run_full_simulation(adaptive=True)). Network 
+# weights are recomputed once the trade value or the number of partner pairs 
+# with new evidence since the last update crosses its threshold; an agent 
+# produces an item it recently sold once its stock drops below the reorder 
+# point (units of it sold in the last PRODUCTION_REORDER_WINDOW steps, at 
+# least PRODUCTION_REORDER_MIN). The fixed cycles remain as a ceiling. 
+WEIGHT_UPDATE_TRADE_VOLUME = 200.0
+WEIGHT_UPDATE_EVIDENCE_PAIRS = 6
+WEIGHT_UPDATE_MIN_INTERVAL = 5
+PRODUCTION_REORDER_WINDOW = 20
+PRODUCTION_REORDER_MIN = 2
+PRODUCTION_MIN_INTERVAL = 5
+# Concurrent Markov chain rounds run their interactions on at most 
+# CHAIN_MAX_WORKERS threads (fewer when a round has fewer interactions). 
+CHAIN_MAX_WORKERS = 8
+# Production phase worker pool: agents, and the items of each agent, are 
+# planned concurrently on pools of PRODUCTION_MAX_WORKERS threads. 1 runs the 
+# production phase sequentially. 
+PRODUCTION_MAX_WORKERS = 8
+# Plan all items of an agent in one production prompt (one shared memory 
+# retrieval) instead of one LLM call per item. 
+PRODUCTION_PLANNING_BATCHED = True
+# Demand forecast of production planning: per-item sales velocity is 
+# exponentially smoothed (PRODUCTION_FORECAST_ALPHA) over the sales of the 
+# last PRODUCTION_FORECAST_WINDOW steps. Items whose stock covers the demand of 
+# the next PRODUCTION_FORECAST_HORIZON steps are not planned. "prior" passes 
+# the forecast and a suggested quantity to the planning prompt, "only" 
+# produces the suggested quantities without the LLM, None disables it. 
+PRODUCTION_FORECAST_MODE = "prior"
+PRODUCTION_FORECAST_ALPHA = 0.3
+PRODUCTION_FORECAST_HORIZON = 30
+PRODUCTION_FORECAST_WINDOW = 100
+# Simulation checkpoints (simulation state plus agent snapshots) are written 
+# every CHECKPOINT_INTERVAL steps under output/checkpoints/run_<timestamp>/; 
+# the newest CHECKPOINT_KEEP of a run are kept. 0 (the default) disables 
+# checkpoints; main.py --checkpoint-every turns them on for a run. 
+CHECKPOINT_INTERVAL = 0
+CHECKPOINT_KEEP = 3
+# Where agents are stored: "folder" (one folder of JSON files per agent under 
+# POPULATIONS_DIR) or "sqlite" (one WAL-mode database at AGENT_STORE_DB; copy 
+# populations into it with python -m generative_agent.agent_store --import). 
+AGENT_STORE = "folder"
+AGENT_STORE_DB = f"{BASE_DIR}/agent_bank/agents.db"
+# Full agent loads for the Markov chain run on AGENT_LOAD_WORKERS processes 
+# (embeddings come back through shared memory); 0 or 1 loads sequentially. 
+AGENT_LOAD_WORKERS = 4
+# Bulk agent builds (build-agents mode, create_agent --all): agents are built 
+# on BUILD_MAX_WORKERS threads; seed memories are scored IMPORTANCE_BATCH_SIZE 
+# per importance prompt and embedded EMBEDDING_BATCH_SIZE per request. 
+BUILD_MAX_WORKERS = 8
+IMPORTANCE_BATCH_SIZE = 20
+EMBEDDING_BATCH_SIZE = 256
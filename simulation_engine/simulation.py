@@ -4,15 +4,35 @@ import os
 import numpy as np
 from datetime import datetime
 from simulation_engine.markov_agent_chain import MarkovAgentChain, load_agents_for_chain
-from .settings import DEBUG
+from simulation_engine.transition_matrix import SparseTransitionMatrix
+from simulation_engine.partner_evidence import PartnerEvidenceTracker
+from simulation_engine.partner_candidates import PartnerShortlister
+from simulation_engine.update_triggers import AdaptiveTriggerPolicy
+from simulation_engine.market_ledger import MarketLedger
+from simulation_engine.checkpoint import (CheckpointAgentStore, write_checkpoint, read_checkpoint,
+                                          prune_checkpoints, rng_state, set_rng_state)
+from generative_agent.generative_agent import buying_interest_probabilities
+from generative_agent.population_snapshot import SnapshotAgentStore
+from .settings import (DEBUG, TRANSITION_TOP_K, PARTNER_PRIOR_SCORE, PARTNER_PRIOR_DECAY,
+                       CHECKPOINT_INTERVAL, CHECKPOINT_KEEP)
 import random
 
 
 class Simulation:
     """Manages the full agent simulation with production cycles and network weight calculation."""
 
-    def __init__(self, population: str = "Synthetic", agent_names: List[str] = None):
-        """Initialize simulation with agents."""
+    def __init__(self, population: str = "Synthetic", agent_names: List[str] = None, snapshot: str = None):
+        """
+        Initialize simulation with agents.
+
+        snapshot: Population snapshot file (see generative_agent.population_snapshot)
+            to load the agents from instead of the agent store; the population is
+            then the snapshot's. Agents are still saved to the agent store.
+        """
+        # Agents are read from this store; None is the default agent store
+        self.agent_store = SnapshotAgentStore(snapshot) if snapshot else None
+        if self.agent_store is not None:
+            population = self.agent_store.population
         if agent_names is None:
             agent_names = ["rowan_greenwood", "jasmine_carter", "mina_kim", "kemi_adebayo",
                           "bianca_silva", "mei_chen", "carlos_mendez", "pema_sherpa"]
@@ -21,7 +41,15 @@ class Simulation:
         self.agent_names = agent_names
         self.agents = []
         self.network_weights = {}
+        self.network_weights_version = 0  # Bumped whenever network_weights is replaced
+        self._transition_matrix_cache = None  # ((weights version, self-reflection prob), matrix)
         self.network_weights_history = []  # Store weights at each cycle
+        self.raw_partner_scores = {}  # {scorer: {partner: raw 0-100 score}} reused between weight cycles
+        self.prior_partner_scores = {}  # {scorer: {partner: smoothed prior}} for partners off the shortlist
+        self._partner_weights_cache = {}  # {scorer: weights} from the cached raw scores
+        self.partner_shortlister = PartnerShortlister()  # Limits LLM scoring to promising partners
+        self.partner_evidence = None  # PartnerEvidenceTracker, created once the agents are loaded
+        self._evidence_trade_step = 0  # Ledger trades up to this step were noted as evidence
         self.transition_matrices_history = []  # Store transition matrices at each weight cycle
         self.markov_chain = MarkovAgentChain()
         self.current_time_step = 0
@@ -31,16 +59,18 @@ class Simulation:
         self.output_dir = "output"
         self.create_output_directory()
 
-    def load_agents(self) -> bool:
+    def load_agents(self, load_mode: str = "lazy") -> bool:
         """Load all agents for the simulation."""
         print("Loading agents for simulation...")
-        self.agents = load_agents_for_chain(self.population, self.agent_names)
+        self.agents = load_agents_for_chain(self.population, self.agent_names, load_mode=load_mode,
+                                            store=self.agent_store)
 
         if len(self.agents) < 2:
             print("Error: Could not load required agents")
             return False
 
         print(f"Successfully loaded {len(self.agents)} agents")
+        self.partner_evidence = PartnerEvidenceTracker([agent.scratch.get_fullname() for agent in self.agents])
         return True
 
     def create_output_directory(self):
@@ -50,7 +80,7 @@ class Simulation:
             print(f"Created output directory: {self.output_dir}")
 
     def save_cycle_results(self, cycle_results: Dict[str, Any], production_results: Dict[str, Any],
-                          network_weights: Dict[str, Dict[str, float]], transition_matrix: 'np.ndarray' = None):
+                          network_weights: Dict[str, Dict[str, float]], transition_matrix: SparseTransitionMatrix = None):
         """Save cycle results to JSON files."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -93,7 +123,7 @@ class Simulation:
             "time_step": self.current_time_step,
             "timestamp": timestamp,
             "network_weights": network_weights,
-            "transition_matrix": transition_matrix.tolist() if transition_matrix is not None else None,
+            "transition_matrix": transition_matrix.to_dict() if transition_matrix is not None else None,
             "agent_names": [agent.scratch.get_fullname() for agent in self.agents]
         }
 
@@ -111,27 +141,73 @@ class Simulation:
         }
 
     def calculate_network_weights(self) -> Dict[str, Dict[str, float]]:
-        """Calculate network weights using Markov buying interest scores."""
+        """
+        Calculate network weights using Markov buying interest scores.
+
+        Only pairs with new evidence since the previous cycle (see
+        PartnerEvidenceTracker) or without a cached score are re-scored; the
+        cached raw scores of the other pairs are reused before the softmax.
+        In large populations only each agent's shortlist (see
+        PartnerShortlister) is scored by the LLM; the other partners' scores
+        are smoothed toward PARTNER_PRIOR_SCORE every cycle.
+        """
         print("Calculating network weights...")
         self.network_weights = {}
+        self.network_weights_version += 1
         agent_names = [agent.scratch.get_fullname() for agent in self.agents]
+        self.collect_partner_evidence()
+        shortlists = self.partner_shortlister.shortlists(
+            self.agents, include={name: self.partner_evidence.dirty_partners(name) for name in agent_names})
 
+        rescored_pairs = 0
         for agent in self.agents:
             agent_name = agent.scratch.get_fullname()
             other_agents = [name for name in agent_names if name != agent_name]
 
             if other_agents:
                 try:
-                    weights = agent.get_markov_buying_interest_scores(other_agents, temperature=12.0)
+                    cached_scores = self.raw_partner_scores.setdefault(agent_name, {})
+                    shortlist = shortlists.get(agent_name, set())
+                    stale = [name for name in other_agents if name in shortlist
+                             and (name not in cached_scores or self.partner_evidence.is_dirty(agent_name, name))]
+                    if stale:
+                        cached_scores.update(agent.get_markov_buying_interest_raw_scores(stale))
+                        rescored_pairs += len(stale)
+                    self.partner_evidence.clear(agent_name)
+
+                    # Partners left out of the shortlist drift from their last
+                    # score toward the prior
+                    prior_scores = self.prior_partner_scores.setdefault(agent_name, {})
+                    smoothed = False
+                    for name in other_agents:
+                        if name in shortlist:
+                            prior_scores.pop(name, None)
+                            continue
+                        previous = prior_scores.get(name, cached_scores.get(name, PARTNER_PRIOR_SCORE))
+                        prior_scores[name] = PARTNER_PRIOR_SCORE + PARTNER_PRIOR_DECAY * (previous - PARTNER_PRIOR_SCORE)
+                        smoothed = smoothed or prior_scores[name] != previous
+
+                    if not stale and not smoothed and agent_name in self._partner_weights_cache:
+                        # Nothing changed for this agent: its weights are the same
+                        weights = self._partner_weights_cache[agent_name]
+                    else:
+                        weights = buying_interest_probabilities(
+                            {name: prior_scores[name] if name in prior_scores else cached_scores[name]
+                             for name in other_agents},
+                            temperature=12.0)
+                        self._partner_weights_cache[agent_name] = weights
                     self.network_weights[agent_name] = weights
                     if DEBUG:
-                        print(f"  {agent_name}: calculated weights for {len(weights)} connections")
+                        print(f"  {agent_name}: calculated weights for {len(weights)} connections ({len(stale)} re-scored)")
                 except Exception as e:
                     print(f"Error calculating weights for {agent_name}: {e}")
                     # Default to uniform weights if calculation fails
                     uniform_weight = 1.0 / len(other_agents) if other_agents else 0.0
                     self.network_weights[agent_name] = {name: uniform_weight for name in other_agents}
 
+        total_pairs = len(agent_names) * (len(agent_names) - 1)
+        print(f"  Re-scored {rescored_pairs} of {total_pairs} agent pairs")
+
         # Save weights to history with cycle info
         weights_snapshot = {
             'cycle': self.cycle_count,
@@ -146,7 +222,7 @@ class Simulation:
         matrix_snapshot = {
             'cycle': self.cycle_count,
             'time_step': self.current_time_step,
-            'transition_matrix': transition_matrix.tolist(),
+            'transition_matrix': transition_matrix.to_dict(),
             'agent_names': [agent.scratch.get_fullname() for agent in self.agents],
             'type': 'updated_from_trading'
         }
@@ -154,10 +230,20 @@ class Simulation:
 
         return self.network_weights
 
+    def collect_partner_evidence(self):
+        """Note new memories and ledger trades since the previous call as partner evidence."""
+        if self.partner_evidence is None:
+            self.partner_evidence = PartnerEvidenceTracker([agent.scratch.get_fullname() for agent in self.agents])
+        self.partner_evidence.scan_memories(self.agents)
+        self.partner_evidence.note_trades(
+            self.markov_chain.ledger.get_trades(start_step=self._evidence_trade_step + 1, end_step=self.current_time_step))
+        self._evidence_trade_step = self.current_time_step
+
     def initialize_uniform_weights(self):
         """Initialize network weights with uniform distribution for all agents."""
         print("Initializing uniform network weights...")
         self.network_weights = {}
+        self.network_weights_version += 1
         agent_names = [agent.scratch.get_fullname() for agent in self.agents]
 
         for agent in self.agents:
@@ -184,7 +270,7 @@ class Simulation:
         matrix_snapshot = {
             'cycle': 0,
             'time_step': 0,
-            'transition_matrix': transition_matrix.tolist(),
+            'transition_matrix': transition_matrix.to_dict(),
             'agent_names': agent_names,
             'type': 'uniform_initial'
         }
@@ -192,60 +278,41 @@ class Simulation:
 
         return self.network_weights
 
-    def create_transition_matrix_from_weights(self, self_reflection_prob: float = 0.2) -> 'np.ndarray':
-        """Create transition matrix using current network weights."""
-        import numpy as np
-
-        num_agents = len(self.agents)
-        matrix = np.zeros((num_agents, num_agents))
-        agent_names = [agent.scratch.get_fullname() for agent in self.agents]
+    def create_transition_matrix_from_weights(self, self_reflection_prob: float = 0.2) -> SparseTransitionMatrix:
+        """
+        Create the sparse transition matrix from the current network weights
+        (only each agent's TRANSITION_TOP_K strongest connections, if set).
 
-        for i, agent_name in enumerate(agent_names):
-            # Set self-reflection probability
-            matrix[i][i] = self_reflection_prob
-
-            # Get this agent's network weights
-            agent_weights = self.network_weights.get(agent_name, {})
-
-            if agent_weights:
-                # Use network weights to determine interaction probabilities
-                total_weight = sum(agent_weights.values())
-                interaction_prob = 1.0 - self_reflection_prob
-
-                for j, other_agent_name in enumerate(agent_names):
-                    if i != j:  # Not self
-                        if total_weight > 0:
-                            # Scale network weight by interaction probability
-                            weight = agent_weights.get(other_agent_name, 0.0)
-                            matrix[i][j] = (weight / total_weight) * interaction_prob
-                        else:
-                            # Fallback to uniform if no weights
-                            matrix[i][j] = interaction_prob / (num_agents - 1)
-            else:
-                # Fallback to uniform distribution if no network weights
-                interaction_prob = 1.0 - self_reflection_prob
-                for j in range(num_agents):
-                    if i != j:
-                        matrix[i][j] = interaction_prob / (num_agents - 1)
-
-        # Normalize rows to ensure probabilities sum to 1
-        for i in range(num_agents):
-            row_sum = np.sum(matrix[i])
-            if row_sum > 0:
-                matrix[i] = matrix[i] / row_sum
+        The matrix only changes when the weights do, so it is cached per
+        network_weights_version; that also lets the Markov chain keep its
+        alias tables between steps.
+        """
+        key = (self.network_weights_version, self_reflection_prob, len(self.agents))
+        if self._transition_matrix_cache is not None and self._transition_matrix_cache[0] == key:
+            return self._transition_matrix_cache[1]
 
+        agent_names = [agent.scratch.get_fullname() for agent in self.agents]
+        matrix = SparseTransitionMatrix.from_weights(agent_names, self.network_weights, self_reflection_prob,
+                                                     top_k=TRANSITION_TOP_K)
+        self._transition_matrix_cache = (key, matrix)
         return matrix
 
-    def run_production_phase(self, time_step: int) -> Dict[str, Any]:
-        """Run production planning and execution for all agents."""
-        print("Running production phase for all agents...")
+    def run_production_phase(self, time_step: int, items_by_agent: Dict[str, List[str]] = None) -> Dict[str, Any]:
+        """
+        Run production planning and execution for all agents, or only for the
+        agents (and items) in items_by_agent.
+        """
+        if items_by_agent is None:
+            print("Running production phase for all agents...")
+        else:
+            print(f"Running production phase for {len(items_by_agent)} agents below their reorder point...")
 
         # Use the Plan class method to handle all agents
         from generative_agent.modules.cognitive.plan import Plan
         plan_module = Plan()
-        production_results = plan_module.execute_production_for_all_agents(self.agents, time_step)
+        production_results = plan_module.execute_production_for_all_agents(self.agents, time_step, items_by_agent)
 
-        print(f"Production phase completed for {len(self.agents)} agents")
+        print(f"Production phase completed for {len(production_results)} agents")
         return production_results
 
 
@@ -256,9 +323,45 @@ class Simulation:
             agent.save()
         print(f"Saved {len(self.agents)} agent states")
 
+    def package_checkpoint_state(self) -> Dict[str, Any]:
+        """Simulation state a checkpoint needs besides the run loop's own variables."""
+        return {
+            'population': self.population,
+            'current_time_step': self.current_time_step,
+            'cycle_count': self.cycle_count,
+            'network_weights': self.network_weights,
+            'network_weights_history': self.network_weights_history,
+            'transition_matrices_history': self.transition_matrices_history,
+            'raw_partner_scores': self.raw_partner_scores,
+            'prior_partner_scores': self.prior_partner_scores,
+            'evidence_trade_step': self._evidence_trade_step,
+            'partner_evidence': self.partner_evidence.package() if self.partner_evidence is not None else None,
+            'ledger': self.markov_chain.ledger.package(),
+            'rng': rng_state()
+        }
+
+    def restore_checkpoint_state(self, state: Dict[str, Any]):
+        """Restore package_checkpoint_state() once the agents are loaded."""
+        self.current_time_step = state['current_time_step']
+        self.cycle_count = state['cycle_count']
+        self.network_weights = state['network_weights']
+        self.network_weights_version += 1
+        self.network_weights_history = state['network_weights_history']
+        self.transition_matrices_history = state['transition_matrices_history']
+        self.raw_partner_scores = state['raw_partner_scores']
+        self.prior_partner_scores = state['prior_partner_scores']
+        self._partner_weights_cache = {}
+        self._evidence_trade_step = state['evidence_trade_step']
+        if state['partner_evidence'] is not None:
+            self.partner_evidence.restore(state['partner_evidence'])
+        self.markov_chain.ledger = MarketLedger.from_package(state['ledger'])
+        set_rng_state(state['rng'])
+
     def run_full_simulation(self, total_steps: int = 120,
                            weight_update_cycle: int = 20, production_cycle: int = 30,
-                           testing_mode: bool = False) -> Dict[str, Any]:
+                           testing_mode: bool = False, concurrent: bool = False,
+                           adaptive: bool = False, checkpoint_interval: int = CHECKPOINT_INTERVAL,
+                           resume_from: str = None) -> Dict[str, Any]:
         """
         Run the complete simulation with separate cycles for network weights and production.
 
@@ -267,30 +370,83 @@ class Simulation:
             weight_update_cycle: Number of steps between network weight updates
             production_cycle: Number of steps between production phases
             testing_mode: Whether to run in testing mode
+            concurrent: Run each step as a concurrent round of disjoint agent pairs
+            adaptive: Trigger weight updates and per-agent production on activity
+                (see AdaptiveTriggerPolicy); the cycles above become ceilings
+            checkpoint_interval: Write a checkpoint (see simulation_engine.checkpoint)
+                every this many steps; None or 0 disables checkpoints
+            resume_from: Checkpoint folder (or a run's checkpoint folder, for
+                its newest checkpoint) to continue from; the run parameters
+                above, checkpoint_interval included, are then taken from the
+                checkpoint
         """
         print("=== Starting Full Agent Simulation ===")
 
-        # Load agents
-        if not self.load_agents():
+        resumed = read_checkpoint(resume_from) if resume_from else None
+        if resumed is not None:
+            run = resumed['run']
+            total_steps = run['total_steps']
+            weight_update_cycle = run['weight_update_cycle']
+            production_cycle = run['production_cycle']
+            testing_mode = run['testing_mode']
+            concurrent = run['concurrent']
+            adaptive = run['adaptive']
+            checkpoint_interval = run.get('checkpoint_interval', checkpoint_interval)
+            print(f"Resuming from {resumed['checkpoint_folder']} after step {resumed['loop']['step']}")
+            # The agents are read from the checkpoint's snapshots; saves go to the agent store
+            self.agent_store = CheckpointAgentStore(resumed['checkpoint_folder'], resumed['population'])
+            self.population = resumed['population']
+            self.agent_names = [agent['id'] for agent in resumed['agents']]
+            checkpoint_root = os.path.dirname(resumed['checkpoint_folder'])
+        else:
+            checkpoint_root = f"{self.output_dir}/checkpoints/run_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        run = {'total_steps': total_steps, 'weight_update_cycle': weight_update_cycle,
+               'production_cycle': production_cycle, 'testing_mode': testing_mode,
+               'concurrent': concurrent, 'adaptive': adaptive, 'checkpoint_interval': checkpoint_interval}
+
+        # Load agents. Resumed agents are read whole, since the checkpoint
+        # they come from may be pruned while the run continues.
+        if not self.load_agents("full" if resumed is not None else "lazy"):
             return None
-
-        # Initialize with uniform network weights for first interaction
-        print("=== Phase 1: Initialize Uniform Network Weights ===")
-        self.initialize_uniform_weights()
-        print()
-
-        # Run simulation step by step with separate weight and production cycles
-        all_production_results = []
-        last_weight_update = 0
-        last_production_update = 0
-        current_agent = None
-
-        # Accumulate interactions for the current cycle
-        cycle_accumulated_interactions = []
-        cycle_accumulated_trades = []
-        cycle_start_step = 1
-
-        for step in range(1, total_steps + 1):
+        if resumed is not None and not testing_mode:
+            # The agent store may hold later states of the agents than the
+            # checkpoint; a crash before this completes leaves the checkpoint
+            # to resume from again.
+            self.save_all_agents()
+
+        policy = AdaptiveTriggerPolicy(weight_update_cycle, production_cycle) if adaptive else None
+        if resumed is None:
+            # Initialize with uniform network weights for first interaction
+            print("=== Phase 1: Initialize Uniform Network Weights ===")
+            self.initialize_uniform_weights()
+            print()
+
+            # Run simulation step by step with separate weight and production cycles
+            first_step = 1
+            all_production_results = []
+            last_weight_update = 0
+            last_production_update = 0
+            current_agent = None
+
+            # Accumulate interactions for the current cycle
+            cycle_accumulated_interactions = []
+            cycle_accumulated_trades = []
+            cycle_start_step = 1
+        else:
+            self.restore_checkpoint_state(resumed)
+            loop = resumed['loop']
+            first_step = loop['step'] + 1
+            all_production_results = loop['all_production_results']
+            last_weight_update = loop['last_weight_update']
+            last_production_update = loop['last_production_update']
+            current_agent = loop['current_agent']
+            cycle_accumulated_interactions = loop['cycle_accumulated_interactions']
+            cycle_accumulated_trades = loop['cycle_accumulated_trades']
+            cycle_start_step = loop['cycle_start_step']
+            if policy is not None:
+                policy.last_production = loop['last_production']
+
+        for step in range(first_step, total_steps + 1):
             self.current_time_step = step
             print(f"=== Step {step} ===")
 
@@ -308,7 +464,9 @@ class Simulation:
                 transition_matrix=transition_matrix,
                 conversation_max_turns=8,
                 start_agent=current_agent,
-                testing_mode=testing_mode
+                testing_mode=testing_mode,
+                first_step=step,
+                concurrent=concurrent
             )
 
             current_agent = step_results['final_state']
@@ -320,12 +478,28 @@ class Simulation:
                 cycle_accumulated_interactions.append(interaction)
 
             cycle_accumulated_trades.extend(step_results.get('all_trades', []))
+            self.partner_evidence.note_interactions(step_results.get('interaction_history', []))
 
-            # Check for weight update cycle
-            should_update_weights = (step - last_weight_update) >= weight_update_cycle
+            production_needs = None
+            if policy is None:
+                # Check for weight update cycle
+                should_update_weights = (step - last_weight_update) >= weight_update_cycle
 
-            # Check for production cycle
-            should_run_production = (step - last_production_update) >= production_cycle
+                # Check for production cycle
+                should_run_production = (step - last_production_update) >= production_cycle
+            else:
+                # Only the memories and trades added since the last step are scanned
+                self.collect_partner_evidence()
+                trade_volume = sum(trade['total_value'] for trade in self.markov_chain.ledger.get_trades(
+                    start_step=last_weight_update + 1, end_step=step))
+                reason = policy.weight_update_reason(step, last_weight_update, trade_volume,
+                                                     self.partner_evidence.dirty_pair_count())
+                should_update_weights = bool(reason)
+                if reason:
+                    print(f"  → Weight update triggered by {reason}")
+
+                production_needs = policy.production_needs(self.agents, step)
+                should_run_production = bool(production_needs)
 
             if should_update_weights or should_run_production:
                 print(f"=== Step {step}: Update Phase ===")
@@ -343,12 +517,16 @@ class Simulation:
                 production_results = None
                 if should_run_production:
                     print("  → Running production phase")
-                    production_results = self.run_production_phase(step)
+                    production_results = self.run_production_phase(step, production_needs)
                     all_production_results.append(production_results)
                     last_production_update = step
+                    if policy is not None:
+                        policy.record_production(list(production_needs), step)
 
                 # Phase 3: Save results to JSON files with accumulated interactions
-                # Create cycle results with accumulated data
+                # Create cycle results with accumulated data; executed trades
+                # come from the market ledger
+                cycle_executed_trades = self.markov_chain.ledger.get_trades(start_step=cycle_start_step, end_step=step)
                 cycle_results = {
                     'agents': step_results['agents'],
                     'transition_matrix': step_results['transition_matrix'],
@@ -356,9 +534,11 @@ class Simulation:
                     'conversation_count': len([i for i in cycle_accumulated_interactions if i['type'] == 'conversation']),
                     'reflection_count': len([i for i in cycle_accumulated_interactions if i['type'] == 'reflection']),
                     'total_trades_attempted': len(cycle_accumulated_trades),
-                    'total_trades_executed': len([t for t in cycle_accumulated_trades if t.get('executed')]),
+                    'total_trades_executed': len(cycle_executed_trades),
                     'all_trades': cycle_accumulated_trades,
-                    'executed_trades': [t for t in cycle_accumulated_trades if t.get('executed')],
+                    'executed_trades': cycle_executed_trades,
+                    'leaderboard': self.markov_chain.get_leaderboard(),
+                    'conservation_violations': self.markov_chain.ledger.get_conservation_violations(cycle_start_step, step),
                     'cycle_start_step': cycle_start_step,
                     'cycle_end_step': step,
                     'final_state': step_results['final_state'],
@@ -368,8 +548,7 @@ class Simulation:
                 # Get the latest transition matrix if weights were updated
                 latest_matrix = None
                 if should_update_weights and self.transition_matrices_history:
-                    latest_matrix_data = self.transition_matrices_history[-1]['transition_matrix']
-                    latest_matrix = np.array(latest_matrix_data)
+                    latest_matrix = self.create_transition_matrix_from_weights(self_reflection_prob=0.2)
 
                 self.save_cycle_results(cycle_results, production_results, updated_weights, latest_matrix)
 
@@ -383,6 +562,24 @@ class Simulation:
 
                 print()
 
+            if checkpoint_interval and step % checkpoint_interval == 0 and step < total_steps:
+                state = self.package_checkpoint_state()
+                state['run'] = run
+                state['loop'] = {
+                    'step': step,
+                    'all_production_results': all_production_results,
+                    'last_weight_update': last_weight_update,
+                    'last_production_update': last_production_update,
+                    'current_agent': int(current_agent) if current_agent is not None else None,
+                    'cycle_accumulated_interactions': cycle_accumulated_interactions,
+                    'cycle_accumulated_trades': cycle_accumulated_trades,
+                    'cycle_start_step': cycle_start_step,
+                    'last_production': policy.last_production if policy is not None else {}
+                }
+                folder = write_checkpoint(checkpoint_root, step, state, self.agents)
+                prune_checkpoints(checkpoint_root, CHECKPOINT_KEEP)
+                print(f"Saved checkpoint {folder}")
+
         print("=== Simulation Complete ===")
         print(f"Total time steps: {self.current_time_step}")
         print(f"Network weights updated {len(self.network_weights_history)} times")
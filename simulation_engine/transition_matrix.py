@@ -0,0 +1,273 @@
+"""
+Transition Matrix
+
+Sparse transition matrix of the Markov engine. Each row holds its explicit
+transitions in CSR form (indptr / indices / data) plus a "background" mass
+spread uniformly over every other agent, so a uniform row costs O(1) and a
+weighted row O(k) for its top-k neighbors: memory, sampling and
+serialization scale with the number of edges instead of N².
+
+Next states are sampled with Walker's alias method over a row's explicit
+entries (tables built lazily per row), so each draw is O(1). Sampling draws
+from np.random, so np.random.seed still makes runs reproducible.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def build_alias_table(probabilities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Walker alias tables (prob, alias) for a vector of non-negative weights."""
+    size = len(probabilities)
+    prob = np.ones(size)
+    alias = np.arange(size)
+    total = probabilities.sum()
+    if total <= 0:
+        return prob, alias
+    scaled = probabilities * (size / total)
+    small = [i for i in range(size) if scaled[i] < 1.0]
+    large = [i for i in range(size) if scaled[i] >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    # Whatever is left is 1 up to rounding error.
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+class SparseTransitionMatrix:
+    """
+    Row-stochastic N×N matrix where
+    P(i → j) = explicit[i, j] + (background[i] / (N - 1) if j != i else 0).
+    Arrays are read-only once built.
+    """
+
+    def __init__(self, num_states: int, indptr: np.ndarray, indices: np.ndarray,
+                 data: np.ndarray, background: Optional[np.ndarray] = None):
+        self.num_states = num_states
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=float)
+        self.background = (np.zeros(num_states) if background is None
+                           else np.asarray(background, dtype=float))
+        for array in (self.indptr, self.indices, self.data, self.background):
+            array.flags.writeable = False
+        # {row: (prob, alias)} built on first sample from the row
+        self._alias_tables: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, num_states: int, rows: Sequence[Tuple[Sequence[int], Sequence[float], float]]) -> 'SparseTransitionMatrix':
+        """Build from one (indices, probabilities, background) tuple per row; rows are normalized."""
+        indptr = np.zeros(num_states + 1, dtype=np.int64)
+        all_indices, all_data, background = [], [], np.zeros(num_states)
+        for i, (indices, probabilities, row_background) in enumerate(rows):
+            indices = np.asarray(indices, dtype=np.int64)
+            probabilities = np.asarray(probabilities, dtype=float)
+            if num_states < 2:
+                row_background = 0.0
+            total = probabilities.sum() + row_background
+            if total > 0:
+                probabilities = probabilities / total
+                row_background = row_background / total
+            order = np.argsort(indices, kind="stable")
+            all_indices.append(indices[order])
+            all_data.append(probabilities[order])
+            background[i] = row_background
+            indptr[i + 1] = indptr[i] + len(indices)
+        indices = np.concatenate(all_indices) if all_indices else np.zeros(0, dtype=np.int64)
+        data = np.concatenate(all_data) if all_data else np.zeros(0)
+        return cls(num_states, indptr, indices, data, background)
+
+    @classmethod
+    def uniform(cls, num_states: int, self_reflection_prob: float = 0.3,
+                interaction_prob: float = 0.7) -> 'SparseTransitionMatrix':
+        """Stay with self_reflection_prob, otherwise move to any other agent uniformly."""
+        rows = [([i], [self_reflection_prob], interaction_prob) for i in range(num_states)]
+        return cls.from_rows(num_states, rows)
+
+    @classmethod
+    def from_weights(cls, agent_names: List[str], network_weights: Dict[str, Dict[str, float]],
+                     self_reflection_prob: float = 0.2, top_k: Optional[int] = None) -> 'SparseTransitionMatrix':
+        """
+        The diagonal is self_reflection_prob; the rest of each row is the
+        agent's network weights (its top_k largest, if given) scaled to
+        1 - self_reflection_prob. Agents without weights, whose weights sum
+        to 0, or whose weights are the same for every other agent spread it
+        uniformly over the others.
+        """
+        num_agents = len(agent_names)
+        index = {name: i for i, name in enumerate(agent_names)}
+        interaction_prob = 1.0 - self_reflection_prob
+        rows = []
+        for i, agent_name in enumerate(agent_names):
+            targets, weights = [], []
+            for other_name, weight in (network_weights.get(agent_name) or {}).items():
+                j = index.get(other_name)
+                if j is not None and j != i and weight > 0:
+                    targets.append(j)
+                    weights.append(weight)
+            weights = np.asarray(weights, dtype=float)
+            total = weights.sum()
+            if total <= 0 or (len(weights) == num_agents - 1 and np.ptp(weights) == 0):
+                rows.append(([i], [self_reflection_prob], interaction_prob))
+                continue
+            targets = np.asarray(targets, dtype=np.int64)
+            if top_k is not None and len(weights) > top_k:
+                keep = np.argpartition(-weights, top_k - 1)[:top_k]
+                targets, weights = targets[keep], weights[keep]
+                total = weights.sum()
+            rows.append((np.append(targets, i),
+                         np.append(weights / total * interaction_prob, self_reflection_prob), 0.0))
+        return cls.from_rows(num_agents, rows)
+
+    @classmethod
+    def from_dense(cls, matrix: Any) -> 'SparseTransitionMatrix':
+        matrix = np.asarray(matrix, dtype=float)
+        rows = []
+        for row in matrix:
+            indices = np.flatnonzero(row)
+            rows.append((indices, row[indices], 0.0))
+        return cls.from_rows(matrix.shape[0], rows)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SparseTransitionMatrix':
+        return cls(data['shape'][0], data['indptr'], data['indices'], data['data'], data.get('background'))
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.num_states
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.num_states, self.num_states)
+
+    @property
+    def nnz(self) -> int:
+        """Number of explicitly stored transitions."""
+        return len(self.data)
+
+    def _explicit(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def _background_share(self, i: int) -> float:
+        return self.background[i] / (self.num_states - 1) if self.num_states > 1 else 0.0
+
+    def get(self, i: int, j: int) -> float:
+        """P(i → j)."""
+        indices, data = self._explicit(i)
+        position = np.searchsorted(indices, j)
+        value = float(data[position]) if position < len(indices) and indices[position] == j else 0.0
+        return value + (self._background_share(i) if j != i else 0.0)
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        """Dense row i (O(N)); prefer row() or get() for large populations."""
+        return self.row_dense(i)
+
+    def row_dense(self, i: int) -> np.ndarray:
+        row = np.full(self.num_states, self._background_share(i))
+        row[i] = 0.0
+        indices, data = self._explicit(i)
+        row[indices] += data
+        return row
+
+    def to_dense(self) -> np.ndarray:
+        return np.array([self.row_dense(i) for i in range(self.num_states)])
+
+    def edges(self, include_self: bool = False) -> Iterator[Tuple[int, int, float]]:
+        """(i, j, P(i → j)) for every non-zero transition; background rows are expanded."""
+        for i in range(self.num_states):
+            if self.background[i] > 0:
+                row = self.row_dense(i)
+                targets = np.flatnonzero(row)
+                probabilities = row[targets]
+            else:
+                targets, probabilities = self._explicit(i)
+            for j, probability in zip(targets, probabilities):
+                if (include_self or j != i) and probability > 0:
+                    yield i, int(j), float(probability)
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _uniform_other(self, i: int) -> int:
+        j = np.random.randint(self.num_states - 1)
+        return j + 1 if j >= i else j
+
+    def sample(self, i: int) -> int:
+        """Draw the next state from row i in O(1)."""
+        background = self.background[i]
+        if background > 0 and np.random.random() < background:
+            return self._uniform_other(i)
+        tables = self._alias_tables.get(i)
+        if tables is None:
+            tables = self._alias_tables[i] = build_alias_table(np.array(self._explicit(i)[1]))
+        indices = self._explicit(i)[0]
+        if not len(indices):
+            return i
+        prob, alias = tables
+        u = np.random.random() * len(indices)
+        column = min(int(u), len(indices) - 1)
+        return int(indices[column if u - column < prob[column] else alias[column]])
+
+    def sample_available(self, i: int, available: List[int], positions: Dict[int, int]) -> Optional[int]:
+        """
+        Draw the next state from row i restricted to the states in available
+        (positions maps state → index in available). Returns None if the row
+        has no probability mass left on them. O(row entries).
+        """
+        indices, data = self._explicit(i)
+        explicit = [(int(j), float(p)) for j, p in zip(indices, data) if int(j) in positions]
+        explicit_mass = sum(p for _, p in explicit)
+        others = len(available) - (1 if i in positions else 0)
+        background_mass = self._background_share(i) * others
+        total = explicit_mass + background_mass
+        if total <= 0:
+            return None
+        u = np.random.random() * total
+        if u >= explicit_mass and others > 0:
+            while True:
+                j = available[np.random.randint(len(available))]
+                if j != i:
+                    return j
+        for j, p in explicit:
+            u -= p
+            if u < 0:
+                return j
+        return explicit[-1][0]
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'format': 'csr',
+            'shape': [self.num_states, self.num_states],
+            'indptr': self.indptr.tolist(),
+            'indices': self.indices.tolist(),
+            'data': self.data.tolist(),
+            'background': self.background.tolist()
+        }
+
+
+def as_transition_matrix(matrix: Any) -> SparseTransitionMatrix:
+    """Accept a SparseTransitionMatrix, its to_dict() form, or a dense array / nested list."""
+    if isinstance(matrix, SparseTransitionMatrix):
+        return matrix
+    if isinstance(matrix, dict):
+        return SparseTransitionMatrix.from_dict(matrix)
+    return SparseTransitionMatrix.from_dense(matrix)
@@ -0,0 +1,105 @@
+"""
+Update Triggers
+
+Activity-triggered policy for the two expensive update phases of
+Simulation.run_full_simulation:
+
+- network weights are recomputed once the trade value executed since the
+  last update, or the number of (scorer, partner) pairs with new evidence,
+  crosses a threshold (but not more often than every min_interval steps)
+- production runs per agent, for the recently sold items whose stock has
+  dropped below their reorder point: the units of the item sold in the last
+  reorder_window steps, and at least reorder_min
+
+The fixed weight_update_cycle / production_cycle schedules remain as a
+ceiling: when one elapses with some activity but no trigger, the update runs
+anyway. Quiet periods trigger nothing.
+"""
+
+from typing import Any, Dict, List
+
+from simulation_engine.settings import (WEIGHT_UPDATE_TRADE_VOLUME, WEIGHT_UPDATE_EVIDENCE_PAIRS,
+                                        WEIGHT_UPDATE_MIN_INTERVAL, PRODUCTION_REORDER_WINDOW,
+                                        PRODUCTION_REORDER_MIN, PRODUCTION_MIN_INTERVAL)
+
+
+class AdaptiveTriggerPolicy:
+    """Decides when network weights are recomputed and which agents produce what."""
+
+    def __init__(self, weight_update_cycle: int, production_cycle: int,
+                 trade_volume_threshold: float = WEIGHT_UPDATE_TRADE_VOLUME,
+                 evidence_pairs_threshold: int = WEIGHT_UPDATE_EVIDENCE_PAIRS,
+                 weight_min_interval: int = WEIGHT_UPDATE_MIN_INTERVAL,
+                 reorder_window: int = PRODUCTION_REORDER_WINDOW,
+                 reorder_min: int = PRODUCTION_REORDER_MIN,
+                 production_min_interval: int = PRODUCTION_MIN_INTERVAL):
+        self.weight_update_cycle = weight_update_cycle
+        self.production_cycle = production_cycle
+        self.trade_volume_threshold = trade_volume_threshold
+        self.evidence_pairs_threshold = evidence_pairs_threshold
+        self.weight_min_interval = weight_min_interval
+        self.reorder_window = reorder_window
+        self.reorder_min = reorder_min
+        self.production_min_interval = production_min_interval
+        # {agent name: step of its last production}
+        self.last_production: Dict[str, int] = {}
+
+    def weight_update_reason(self, step: int, last_update: int, trade_volume: float, evidence_pairs: int) -> str:
+        """
+        Why the network weights should be recomputed at this step, or "" if
+        they should not.
+
+        Args:
+            step: Current step
+            last_update: Step of the last weight update
+            trade_volume: Total value of the trades executed since then
+            evidence_pairs: Number of partner pairs with new evidence since then
+        """
+        elapsed = step - last_update
+        if elapsed < self.weight_min_interval:
+            return ""
+        if trade_volume >= self.trade_volume_threshold:
+            return f"trade volume ${trade_volume:.2f}"
+        if evidence_pairs >= self.evidence_pairs_threshold:
+            return f"{evidence_pairs} partner pairs with new evidence"
+        if elapsed >= self.weight_update_cycle and (trade_volume > 0 or evidence_pairs > 0):
+            return f"{elapsed} steps since the last update"
+        return ""
+
+    def reorder_point(self, agent: Any, item_name: str, step: int) -> int:
+        """Units of the item the agent sold in the last reorder_window steps, at least reorder_min."""
+        sold = sum(record.quantity for record in agent.inventory.get_records(
+            "sell_item", item_name=item_name, start_step=step - self.reorder_window + 1, end_step=step))
+        return max(self.reorder_min, sold)
+
+    def production_needs(self, agents: List[Any], step: int) -> Dict[str, List[str]]:
+        """
+        Items each agent should produce now: {agent name: item names}.
+
+        An agent qualifies at most every production_min_interval steps, for
+        the recently sold items (the ones production planning considers)
+        whose stock is below the reorder point. When production_cycle steps
+        pass without that happening, every recently sold item is produced if
+        the agent sold anything since its last production.
+        """
+        needs = {}
+        for agent in agents:
+            name = agent.scratch.get_fullname()
+            last = self.last_production.get(name, 0)
+            if step - last < self.production_min_interval:
+                continue
+            recent_items = agent.get_items_to_produce_from_sales(max_items=5, time_step=step)
+            if not recent_items:
+                continue
+            items = [item for item in recent_items
+                     if agent.inventory.get_item_quantity(item) < self.reorder_point(agent, item, step)]
+            if not items and step - last >= self.production_cycle and \
+                    agent.inventory.get_records("sell_item", start_step=last + 1, end_step=step):
+                items = recent_items
+            if items:
+                needs[name] = items
+        return needs
+
+    def record_production(self, agent_names: List[str], step: int):
+        for name in agent_names:
+            self.last_production[name] = step
@@ -0,0 +1,69 @@
+"""
+Shared fixtures. Tests read the Synthetic population of the agent bank;
+anything that saves agents works on a temporary copy of it. Trades are made
+the way MarkovAgentChain makes them, from a scripted conversation instead of
+LLM utterances.
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+import generative_agent.agent_store as agent_store_module
+import generative_agent.population_fork as population_fork_module
+from generative_agent.agent_store import FolderAgentStore
+from generative_agent.generative_agent import GenerativeAgent
+from simulation_engine.markov_agent_chain import MarkovAgentChain
+from simulation_engine.settings import POPULATIONS_DIR
+
+
+@pytest.fixture
+def population_dir(tmp_path, monkeypatch):
+    """A copy of the Synthetic population that the default agent store reads and writes."""
+    root = tmp_path / "populations"
+    shutil.copytree(os.path.join(POPULATIONS_DIR, "Synthetic"), root / "Synthetic")
+    monkeypatch.setattr(population_fork_module, "POPULATIONS_DIR", str(root))
+    monkeypatch.setattr(agent_store_module, "_default_store", FolderAgentStore(str(root)))
+    return root
+
+
+@pytest.fixture
+def merchants(population_dir):
+    """(seller, buyer): Bianca Silva, who sells chlorine_tablets, and Mei Chen."""
+    seller = GenerativeAgent("Synthetic", "bianca_silva", load_mode="profile")
+    buyer = GenerativeAgent("Synthetic", "mei_chen", load_mode="profile")
+    return seller, buyer
+
+
+@pytest.fixture
+def chain_trade(monkeypatch):
+    """
+    chain_trade(chain, seller, buyer, step, item_name, quantity, price) runs
+    MarkovAgentChain.two_agent_conversation at the given step with a scripted
+    offer (seller, turn 0) and acceptance (buyer, turn 1).
+    """
+    def trade(chain: MarkovAgentChain, seller, buyer, step: int, item_name: str, quantity: int, price: float):
+        lines = {seller.scratch.get_fullname(): [f"I can sell you {quantity} {item_name} for ${price:.2f} each."],
+                 buyer.scratch.get_fullname(): ["Deal, I accept."]}
+
+        def act(agent):
+            def scripted(conversation_id, curr_dialogue, context="", time_step=0):
+                remaining = lines[agent.scratch.get_fullname()]
+                if not remaining:
+                    return "Goodbye.", False, True
+                return remaining.pop(0), agent is buyer, False
+            return scripted
+
+        for agent in (seller, buyer):
+            monkeypatch.setattr(agent, "Act", act(agent))
+            # end_conversation runs (it clears working memory) without the LLM summary
+            monkeypatch.setattr(agent.working_memory, "summarize_interaction", lambda agent: "Traded at the market.")
+            monkeypatch.setattr(agent, "remember", lambda *args, **kwargs: None)
+        chain.two_agent_conversation(seller, buyer, "market day", step, max_turns=3, testing_mode=True)
+    return trade
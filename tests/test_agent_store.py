@@ -0,0 +1,62 @@
+import pytest
+
+from generative_agent.agent_store import AgentStore, FolderAgentStore, SQLiteAgentStore
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.parallel_load import PreloadedAgentStore
+from generative_agent.population_snapshot import SnapshotAgentStore
+
+
+def test_backends_implement_the_interface():
+    for store_class in (FolderAgentStore, SQLiteAgentStore, SnapshotAgentStore, PreloadedAgentStore):
+        assert not store_class.__abstractmethods__, store_class
+
+
+def test_incomplete_store_fails_when_created():
+    class ReadOnlyStore(AgentStore):
+        def list_populations(self):
+            return []
+
+    with pytest.raises(TypeError, match="abstract"):
+        ReadOnlyStore()
+
+
+def test_sqlite_store_is_created(tmp_path):
+    store = SQLiteAgentStore(str(tmp_path / "agents.db"))
+    assert isinstance(store, AgentStore)
+    assert store.list_agents("Synthetic") == []
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, population_dir):
+    folders = FolderAgentStore(str(population_dir))
+    store = SQLiteAgentStore(str(tmp_path / "agents.db"))
+    for agent_id in ("bianca_silva", "mei_chen"):
+        store.import_folder("Synthetic", agent_id, folders.folder("Synthetic", agent_id))
+    return store
+
+
+def test_imported_agents_load_as_from_their_folders(sqlite_store):
+    from_folder = GenerativeAgent("Synthetic", "bianca_silva")
+    from_db = GenerativeAgent("Synthetic", "bianca_silva", store=sqlite_store)
+
+    assert sqlite_store.list_agents("Synthetic") == ["bianca_silva", "mei_chen"]
+    assert from_db.scratch.package() == from_folder.scratch.package()
+    assert [n.package() for n in from_db.memory_stream.seq_nodes] == \
+        [n.package() for n in from_folder.memory_stream.seq_nodes]
+    assert from_db.inventory.package() == from_folder.inventory.package()
+
+
+def test_sqlite_saves_are_visible_to_queries(sqlite_store):
+    agent = GenerativeAgent("Synthetic", "bianca_silva", store=sqlite_store)
+    stock = agent.get_inventory_quantity("chlorine_tablets")
+    records = len(agent.inventory.records)
+    agent.inventory.sell_item("chlorine_tablets", 1, 5, buyer="Market")
+    agent.save()
+    agent.save()
+
+    reloaded = GenerativeAgent("Synthetic", "bianca_silva", store=sqlite_store)
+    assert reloaded.get_inventory_quantity("chlorine_tablets") == stock - 1
+    assert len(reloaded.inventory.records) == records + 1
+    holders = sqlite_store.item_holders("Synthetic", "chlorine_tablets")
+    assert [holder["agent_id"] for holder in holders] == ["bianca_silva"]
+    assert holders[0]["quantity"] == stock - 1
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.modules.conversation_trade_analyzer import ConversationTradeAnalyzer
+from simulation_engine.global_methods import write_json_files_atomically
+
+
+@pytest.fixture
+def traders(population_dir):
+    return GenerativeAgent("Synthetic", "bianca_silva"), GenerativeAgent("Synthetic", "mei_chen")
+
+
+def trade(seller, buyer, quantity, value, item_name="chlorine_tablets"):
+    return {"participants": {"seller": seller.scratch.get_fullname(), "buyer": buyer.scratch.get_fullname()},
+            "items": [{"name": item_name, "quantity": quantity, "value": value}],
+            "time_step": 7}
+
+
+def read_inventory(population_dir, agent_id):
+    with open(population_dir / "Synthetic" / agent_id / "inventory.json") as json_file:
+        return json.load(json_file)
+
+
+def test_trade_moves_goods_and_cash_and_saves_both_sides(traders, population_dir):
+    seller, buyer = traders
+    result = ConversationTradeAnalyzer().execute_trade_atomic([seller, buyer], trade(seller, buyer, 5, 60.0))
+
+    assert result == (True, True)
+    assert seller.inventory.get_item_quantity("chlorine_tablets") == 45
+    assert seller.inventory.get_item_quantity("digital cash") == 1060
+    assert buyer.inventory.get_item_quantity("chlorine_tablets") == 5
+    assert buyer.inventory.get_item_quantity("digital cash") == 940
+    assert read_inventory(population_dir, "bianca_silva") == seller.package_inventory()
+    assert read_inventory(population_dir, "mei_chen") == buyer.package_inventory()
+
+
+def test_unaffordable_trade_changes_neither_side(traders, population_dir):
+    seller, buyer = traders
+    before = seller.inventory.package(), buyer.inventory.package()
+
+    result = ConversationTradeAnalyzer().execute_trade_atomic([seller, buyer], trade(seller, buyer, 5, 5000.0), True)
+
+    assert result == (True, False)
+    assert (seller.inventory.package(), buyer.inventory.package()) == before
+    assert buyer.scratch.total_sales_failures == 1
+
+
+def test_failure_while_applying_rolls_both_sides_back(traders, population_dir, monkeypatch):
+    seller, buyer = traders
+    before = seller.inventory.package(), buyer.inventory.package()
+    summaries = seller.inventory.get_transaction_summary(), buyer.inventory.get_transaction_summary()
+    on_disk = read_inventory(population_dir, "bianca_silva")
+
+    def broken_buy_item(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(buyer.inventory, "buy_item", broken_buy_item)
+
+    result = ConversationTradeAnalyzer().execute_trade_atomic([seller, buyer], trade(seller, buyer, 5, 60.0))
+
+    assert result == (False, False)
+    assert (seller.inventory.package(), buyer.inventory.package()) == before
+    assert (seller.inventory.get_transaction_summary(), buyer.inventory.get_transaction_summary()) == summaries
+    assert seller.inventory.get_total_inventory_value() == pytest.approx(
+        sum(i.get_total_value() for i in seller.inventory.items.values()))
+    assert read_inventory(population_dir, "bianca_silva") == on_disk
+
+
+def test_unserializable_payload_leaves_every_file_alone(tmp_path):
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+    write_json_files_atomically({str(first): {"n": 1}, str(second): {"n": 1}})
+
+    with pytest.raises(TypeError):
+        write_json_files_atomically({str(first): {"n": 2}, str(second): {"n": object()}})
+
+    assert json.loads(first.read_text()) == {"n": 1}
+    assert json.loads(second.read_text()) == {"n": 1}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["first.json", "second.json"]
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+import generative_agent.modules.cognitive.memory_stream as memory_stream_module
+import generative_agent.modules.cognitive.plan as plan_module
+from generative_agent.modules.cognitive.plan import Plan, ProductionPlan
+
+
+ITEMS = ["chlorine_tablets", "pool_shock", "ph_balancer"]
+
+
+@pytest.fixture
+def seller(merchants, monkeypatch):
+    monkeypatch.setattr(memory_stream_module, "get_text_embedding", lambda text: [1.0] * 1536)
+    seller = merchants[0]
+    # Sell all but one unit so the demand forecast does not screen the items out
+    for item_name in ITEMS:
+        seller.inventory.sell_item(item_name, seller.get_inventory_quantity(item_name) - 1, 8, buyer="Market")
+    return seller
+
+
+def answer(monkeypatch, response):
+    prompts = []
+    def gpt_request(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        if isinstance(response, Exception):
+            raise response
+        return response
+    monkeypatch.setattr(plan_module, "gpt_request", gpt_request)
+    return prompts
+
+
+def test_one_prompt_plans_every_item_in_order(seller, monkeypatch):
+    prompts = answer(monkeypatch, json.dumps({"plans": [
+        {"item_name": "PH_Balancer", "planned_quantity": 2, "reasoning": "slow"},
+        {"item_name": "chlorine_tablets", "planned_quantity": "12", "reasoning": "selling fast"},
+        {"item_name": "pool_shock", "planned_quantity": 5, "reasoning": "summer"}]}))
+
+    plans = seller.plan.create_production_plans_with_llm(seller, ITEMS, 9)
+
+    assert len(prompts) == 1
+    for item_name in ITEMS:
+        assert f"### {item_name}\n" in prompts[0]
+    assert [(p.item_name, p.planned_quantity, p.reasoning) for p in plans] == [
+        ("chlorine_tablets", 12, "selling fast"), ("pool_shock", 5, "summer"), ("ph_balancer", 2, "slow")]
+    assert seller.plan.production_plans == plans
+
+
+def test_recent_sales_planning_uses_the_batched_prompt(seller, monkeypatch):
+    answer(monkeypatch, json.dumps({"plans": [{"item_name": name, "planned_quantity": 1} for name in ITEMS]}))
+
+    plans = seller.create_production_plans_for_recent_sales(9, items=ITEMS, batched=True)
+
+    assert [plan["item_name"] for plan in plans] == ITEMS
+
+
+def test_failed_batched_call_plans_item_by_item(seller, monkeypatch):
+    answer(monkeypatch, RuntimeError("rate limited"))
+    planned = []
+    def create_production_plan_with_llm(self, agent, item_name, time_step, store=True, forecast=None):
+        planned.append(item_name)
+        return ProductionPlan({"item_name": item_name, "planned_quantity": 4, "time_step": time_step})
+    monkeypatch.setattr(Plan, "create_production_plan_with_llm", create_production_plan_with_llm)
+
+    plans = seller.create_production_plans_for_recent_sales(9, items=ITEMS, batched=True)
+
+    assert planned == ITEMS
+    assert [plan["planned_quantity"] for plan in plans] == [4, 4, 4]
+
+
+@pytest.fixture
+def planned_alone(monkeypatch):
+    """Items planned with their own prompt (4 units each), recorded in order."""
+    planned = []
+    def create_production_plan_with_llm(self, agent, item_name, time_step, store=True, forecast=None):
+        planned.append(item_name)
+        plan = ProductionPlan({"item_name": item_name, "planned_quantity": 4, "time_step": time_step})
+        if store:
+            self.production_plans.append(plan)
+        return plan
+    monkeypatch.setattr(Plan, "create_production_plan_with_llm", create_production_plan_with_llm)
+    return planned
+
+
+def test_items_missing_from_the_reply_are_planned_alone(seller, monkeypatch, planned_alone):
+    answer(monkeypatch, json.dumps({"plans": [
+        {"item_name": "pool_shock", "planned_quantity": "lots", "reasoning": "summer"},
+        {"item_name": "ph_balancer", "planned_quantity": 2, "reasoning": "slow"}]}))
+
+    plans = seller.plan.create_production_plans_with_llm(seller, ITEMS, 9)
+
+    assert planned_alone == ["chlorine_tablets", "pool_shock"]
+    assert [(p.item_name, p.planned_quantity) for p in plans] == [
+        ("chlorine_tablets", 4), ("pool_shock", 4), ("ph_balancer", 2)]
+    assert seller.plan.production_plans == plans
+
+
+def test_unparsed_reply_plans_every_item_alone(seller, monkeypatch, planned_alone):
+    answer(monkeypatch, "I would produce more chlorine tablets.")
+
+    plans = seller.plan.create_production_plans_with_llm(seller, ITEMS, 9)
+
+    assert planned_alone == ITEMS
+    assert [p.planned_quantity for p in plans] == [4, 4, 4]
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import generative_agent.modules.cognitive.memory_stream as memory_stream_module
+import simulation_engine.gpt_structure as gpt_structure
+from generative_agent.generative_agent import GenerativeAgent
+from simulation_engine.global_methods import chunk_by_token_budget, estimate_tokens
+
+
+OTHERS = ["Mei Chen", "Carlos Mendez", "Pema Sherpa", "Kemi Adebayo"]
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Answers every batched prompt with scores for the agents it lists, except Pema Sherpa."""
+    prompts = []
+    def gpt_request(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        listed = [name for name in OTHERS if f"### {name}\n" in prompt]
+        return json.dumps({"scores": {name: 10 * (OTHERS.index(name) + 1)
+                                      for name in listed if name != "Pema Sherpa"}})
+    monkeypatch.setattr(gpt_structure, "gpt_request", gpt_request)
+    monkeypatch.setattr(memory_stream_module, "get_text_embedding", lambda text: [1.0] * 1536)
+    return prompts
+
+
+def test_chunks_respect_the_budget():
+    texts = ["a" * 40, "b" * 40, "c" * 200, "d" * 4]
+    chunks = chunk_by_token_budget([0, 1, 2, 3], texts, 25)
+    assert chunks == [[0, 1], [2], [3]]
+    for chunk in chunks:
+        assert len(chunk) == 1 or sum(estimate_tokens(texts[i]) for i in chunk) <= 25
+
+
+def test_one_prompt_scores_every_partner(prompts):
+    agent = GenerativeAgent("Synthetic", "bianca_silva")
+    scores = agent.get_markov_buying_interest_raw_scores(OTHERS, batched=True)
+
+    assert len(prompts) == 1
+    assert scores == {"Mei Chen": 10.0, "Carlos Mendez": 20.0, "Pema Sherpa": 50, "Kemi Adebayo": 40.0}
+
+
+def test_small_budget_splits_the_partners(prompts):
+    agent = GenerativeAgent("Synthetic", "bianca_silva")
+    scores = agent.get_markov_buying_interest_raw_scores(OTHERS, batched=True, token_budget=1)
+
+    assert len(prompts) == len(OTHERS)
+    assert scores["Kemi Adebayo"] == 40.0
+
+    probabilities = agent.get_markov_buying_interest_scores(OTHERS, batched=True, token_budget=1)
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    assert max(probabilities, key=probabilities.get) == "Pema Sherpa"
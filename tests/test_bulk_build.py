@@ -0,0 +1,71 @@
+import pytest
+
+import generative_agent.modules.cognitive.memory_stream as memory_stream_module
+from generative_agent.create_agent import build_agents
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.modules.cognitive.memory_stream import MemoryStream
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Scripted importance prompts (every item scores 7) and embedding requests, counted."""
+    calls = {"importance": [], "embeddings": []}
+
+    def generate_importance_score(records):
+        calls["importance"].append(list(records))
+        return [7.0] * len(records), False
+
+    def get_text_embeddings(texts):
+        calls["embeddings"].append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(memory_stream_module, "generate_importance_score", generate_importance_score)
+    monkeypatch.setattr(memory_stream_module, "get_text_embeddings", get_text_embeddings)
+    monkeypatch.setattr(memory_stream_module, "get_text_embedding",
+                        lambda text: pytest.fail("memories are embedded in batches"))
+    return calls
+
+
+def test_memories_are_scored_and_embedded_in_batches(calls):
+    stream = MemoryStream([], {})
+    contents = [f"memory {i}" for i in range(5)] + ["memory 0"]
+    stream.remember_all(contents, time_step=3, importance_batch_size=2, embedding_batch_size=4)
+
+    assert [len(batch) for batch in calls["importance"]] == [2, 2, 2]
+    assert [len(batch) for batch in calls["embeddings"]] == [4, 1]
+    assert [node.content for node in stream.seq_nodes] == contents
+    assert all(node.importance == 7.0 for node in stream.seq_nodes)
+    assert stream.embeddings["memory 3"] == [8.0, 1.0]
+
+
+def test_unscored_batches_fall_back_to_one_prompt_per_memory(calls, monkeypatch):
+    def short_reply(records):
+        calls["importance"].append(list(records))
+        return [4.0], False
+    monkeypatch.setattr(memory_stream_module, "generate_importance_score", short_reply)
+
+    stream = MemoryStream([], {})
+    stream.remember_all(["a", "b", "c"], importance_batch_size=3)
+    assert calls["importance"] == [["a", "b", "c"], ["a"], ["b"], ["c"]]
+    assert [node.importance for node in stream.seq_nodes] == [4.0, 4.0, 4.0]
+
+
+def test_build_agents_saves_each_agent_once_and_reports_failures(population_dir, calls, monkeypatch):
+    saves = []
+    original_save = GenerativeAgent.save
+
+    def counted_save(self, *args, **kwargs):
+        saves.append(self.id)
+        return original_save(self, *args, **kwargs)
+    monkeypatch.setattr(GenerativeAgent, "save", counted_save)
+
+    results = build_agents(["bianca_silva", "nobody", "mei_chen"],
+                           lambda name: ([f"{name} opened the shop", f"{name} met a customer"], None),
+                           source_population="Synthetic", target_population="Synthetic_built", max_workers=2)
+
+    assert results["bianca_silva"] == results["mei_chen"] == "SUCCESS"
+    assert results["nobody"].startswith("ERROR")
+    assert sorted(saves) == ["bianca_silva", "mei_chen"]
+    built = GenerativeAgent("Synthetic_built", "mei_chen")
+    assert [node.content for node in built.memory_stream.seq_nodes][-2:] == \
+        ["mei_chen opened the shop", "mei_chen met a customer"]
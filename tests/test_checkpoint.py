@@ -0,0 +1,162 @@
+import os
+import random
+from types import SimpleNamespace
+
+import numpy as np
+
+from generative_agent.generative_agent import GenerativeAgent
+from simulation_engine.checkpoint import (CheckpointAgentStore, list_checkpoints, prune_checkpoints, read_checkpoint,
+                                          rng_state, set_rng_state, write_checkpoint)
+from simulation_engine.market_ledger import MarketLedger
+from simulation_engine.simulation import Simulation
+
+
+def snapshot_agent(agent_id):
+    def save_snapshot(folder):
+        os.makedirs(folder)
+        with open(os.path.join(folder, "meta.json"), "w") as f:
+            f.write(agent_id)
+    return SimpleNamespace(population="Synthetic", id=agent_id, save_snapshot=save_snapshot)
+
+
+def scripted_simulation(monkeypatch):
+    """A Simulation of Bianca Silva and Mei Chen whose chain steps each sell one chlorine tablet."""
+    simulation = Simulation(agent_names=["bianca_silva", "mei_chen"])
+    steps = []
+
+    def run_markov_chain(agents, first_step, **kwargs):
+        steps.append(first_step)
+        agents[0].inventory.sell_item("chlorine_tablets", 1, first_step, buyer="Market")
+        return {"agents": [agent.scratch.get_fullname() for agent in agents], "transition_matrix": {},
+                "interaction_history": [], "all_trades": [], "final_state": 0, "final_agent": "Bianca Silva"}
+    monkeypatch.setattr(simulation.markov_chain, "run_markov_chain", run_markov_chain)
+    return simulation, steps
+
+
+def run(simulation, **kwargs):
+    return simulation.run_full_simulation(total_steps=5, weight_update_cycle=100, production_cycle=100,
+                                          testing_mode=True, **kwargs)
+
+
+def test_rng_state_round_trip():
+    state = rng_state()
+    first = (random.random(), np.random.rand())
+    set_rng_state(state)
+    assert (random.random(), np.random.rand()) == first
+
+
+def test_checkpoints_are_read_newest_first_and_pruned(tmp_path):
+    root = str(tmp_path / "run")
+    agents = [snapshot_agent("bianca_silva"), snapshot_agent("mei_chen")]
+    for step in (10, 20, 30):
+        write_checkpoint(root, step, {"loop": {"step": step}}, agents)
+    # A checkpoint that crashed while being written is ignored
+    os.makedirs(os.path.join(root, "step_00040.tmp"))
+
+    state = read_checkpoint(root)
+    assert state["loop"]["step"] == 30
+    assert state["agents"] == [{"population": "Synthetic", "id": "bianca_silva"},
+                               {"population": "Synthetic", "id": "mei_chen"}]
+    assert read_checkpoint(list_checkpoints(root)[0])["loop"]["step"] == 10
+
+    prune_checkpoints(root, 2)
+    assert [os.path.basename(folder) for folder in list_checkpoints(root)] == ["step_00020", "step_00030"]
+
+
+def test_checkpoint_agents_are_read_from_their_snapshots(population_dir):
+    agent = GenerativeAgent("Synthetic", "bianca_silva")
+    stock = agent.get_inventory_quantity("chlorine_tablets")
+    folder = write_checkpoint(str(population_dir.parent / "run"), 10, {}, [agent])
+
+    agent.inventory.sell_item("chlorine_tablets", 1, 11, buyer="Market")
+    agent.save()
+
+    store = CheckpointAgentStore(folder, "Synthetic")
+    assert store.list_agents("Synthetic") == ["bianca_silva"]
+    assert not store.exists("Synthetic_Base", "bianca_silva")
+    restored = GenerativeAgent("Synthetic", "bianca_silva", store=store)
+    assert restored.get_inventory_quantity("chlorine_tablets") == stock
+    assert GenerativeAgent("Synthetic", "bianca_silva").get_inventory_quantity("chlorine_tablets") == stock - 1
+
+    # Saves go to the agent store, never into the checkpoint
+    restored.save()
+    assert GenerativeAgent("Synthetic", "bianca_silva").get_inventory_quantity("chlorine_tablets") == stock
+    assert GenerativeAgent("Synthetic", "bianca_silva", store=store).package() == restored.package()
+
+
+def test_ledger_is_rebuilt_from_its_package():
+    ledger = MarketLedger()
+    ledger.record_trade({"executed": True,
+                         "trade_details": {"participants": {"seller": "Bianca", "buyer": "Mei"},
+                                           "items": [{"name": "tea", "quantity": 2, "value": 10.0}]}}, step=3)
+    restored = MarketLedger.from_package(ledger.package())
+    assert restored.package() == ledger.package()
+    assert restored.get_trades(seller="Bianca") == ledger.get_trades(seller="Bianca")
+
+
+def test_checkpoints_are_off_by_default(population_dir, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulation, steps = scripted_simulation(monkeypatch)
+    run(simulation)
+    assert steps == [1, 2, 3, 4, 5]
+    assert not os.path.exists(tmp_path / "output" / "checkpoints")
+
+
+def test_checkpoints_every_interval(population_dir, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulation, _ = scripted_simulation(monkeypatch)
+    run(simulation, checkpoint_interval=2)
+
+    [run_folder] = os.listdir(tmp_path / "output" / "checkpoints")
+    root = str(tmp_path / "output" / "checkpoints" / run_folder)
+    assert [os.path.basename(folder) for folder in list_checkpoints(root)] == ["step_00002", "step_00004"]
+    state = read_checkpoint(root)
+    assert state["run"]["checkpoint_interval"] == 2
+    assert state["loop"]["step"] == 4
+
+
+def population_files(population_dir):
+    files = {}
+    for folder, _, names in os.walk(population_dir):
+        for name in names:
+            with open(os.path.join(folder, name), "rb") as population_file:
+                files[os.path.relpath(os.path.join(folder, name), population_dir)] = population_file.read()
+    return files
+
+
+def interrupted_run(population_dir, tmp_path, monkeypatch, testing_mode):
+    """Run 5 steps with a checkpoint every 2, then save the agents as they are after step 5."""
+    monkeypatch.chdir(tmp_path)
+    simulation, _ = scripted_simulation(monkeypatch)
+    simulation.run_full_simulation(total_steps=5, weight_update_cycle=100, production_cycle=100,
+                                   testing_mode=testing_mode, checkpoint_interval=2)
+    simulation.save_all_agents()
+    [run_folder] = os.listdir(tmp_path / "output" / "checkpoints")
+    return str(tmp_path / "output" / "checkpoints" / run_folder)
+
+
+def test_resume_in_testing_mode_leaves_the_population_alone(population_dir, tmp_path, monkeypatch):
+    root = interrupted_run(population_dir, tmp_path, monkeypatch, testing_mode=True)
+    before = population_files(population_dir)
+    stock_after_run = GenerativeAgent("Synthetic", "bianca_silva").get_inventory_quantity("chlorine_tablets")
+
+    simulation, steps = scripted_simulation(monkeypatch)
+    simulation.run_full_simulation(resume_from=root)
+
+    assert steps == [5]
+    # The resumed agents continue from the step 4 checkpoint and sell again in step 5
+    assert simulation.agents[0].get_inventory_quantity("chlorine_tablets") == stock_after_run
+    assert population_files(population_dir) == before
+
+
+def test_resume_writes_the_checkpoint_agents_to_the_store(population_dir, tmp_path, monkeypatch):
+    root = interrupted_run(population_dir, tmp_path, monkeypatch, testing_mode=False)
+    stock_after_run = GenerativeAgent("Synthetic", "bianca_silva").get_inventory_quantity("chlorine_tablets")
+
+    simulation, steps = scripted_simulation(monkeypatch)
+    simulation.run_full_simulation(resume_from=root)
+
+    assert steps == [5]
+    # The store is back at the step 4 checkpoint (step 5's sale is not saved)
+    assert GenerativeAgent("Synthetic", "bianca_silva").get_inventory_quantity("chlorine_tablets") == \
+        stock_after_run + 1
@@ -0,0 +1,88 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import simulation_engine.markov_agent_chain as markov_module
+from simulation_engine.markov_agent_chain import MarkovAgentChain
+
+
+def named(name):
+    return SimpleNamespace(scratch=SimpleNamespace(get_fullname=lambda: name))
+
+
+def test_round_pairs_are_disjoint():
+    np.random.seed(0)
+    chain = MarkovAgentChain()
+    matrix = chain.create_agent_transition_matrix(7, 0.2, 0.8)
+    for _ in range(50):
+        interactions = chain.sample_disjoint_round(matrix)
+        agents = [k for i, j in interactions for k in {i, j}]
+        assert len(agents) == len(set(agents))
+        assert set(agents) == set(range(7)) or len(set(range(7)) - set(agents)) == 1
+
+
+def test_agents_without_probability_mass_sit_out():
+    matrix = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, 1.0, 0.0]])
+    assert sorted(tuple(sorted(pair)) for pair in MarkovAgentChain().sample_disjoint_round(matrix)) == [(1, 2)]
+
+
+def test_no_agent_is_in_two_interactions_at_once(monkeypatch):
+    chain = MarkovAgentChain()
+    agents = [named(f"Agent {k}") for k in range(6)]
+    busy, overlaps, calls = set(), [], []
+    guard = threading.Lock()
+
+    def interact(*participants):
+        names = [agent.scratch.get_fullname() for agent in participants]
+        with guard:
+            overlaps.extend(name for name in names if name in busy)
+            busy.update(names)
+            calls.append(names)
+        time.sleep(0.01)
+        with guard:
+            busy.difference_update(names)
+
+    monkeypatch.setattr(chain, "agent_self_reflection", lambda agent, context, step, testing_mode: interact(agent))
+    monkeypatch.setattr(chain, "two_agent_conversation",
+                        lambda a, b, context, step, max_turns, testing_mode: interact(a, b))
+
+    chain.run_markov_chain(agents, num_steps=4, concurrent=True, max_workers=4)
+
+    assert overlaps == []
+    assert sum(len(names) for names in calls) >= 4 * 5
+
+
+def test_round_pools_are_capped_by_the_setting_and_the_round(monkeypatch):
+    chain = MarkovAgentChain()
+    agents = [named(f"Agent {k}") for k in range(9)]
+    pool_sizes, round_sizes = [], []
+    executor_class = markov_module.ThreadPoolExecutor
+
+    def sized_executor(max_workers):
+        pool_sizes.append(max_workers)
+        return executor_class(max_workers=max_workers)
+
+    sample_disjoint_round = chain.sample_disjoint_round
+
+    def sample(matrix):
+        interactions = sample_disjoint_round(matrix)
+        round_sizes.append(len(interactions))
+        return interactions
+
+    monkeypatch.setattr(markov_module, "ThreadPoolExecutor", sized_executor)
+    monkeypatch.setattr(markov_module, "CHAIN_MAX_WORKERS", 3)
+    monkeypatch.setattr(chain, "sample_disjoint_round", sample)
+    monkeypatch.setattr(chain, "agent_self_reflection", lambda *args: None)
+    monkeypatch.setattr(chain, "two_agent_conversation", lambda *args: None)
+
+    chain.run_markov_chain(agents, num_steps=3, concurrent=True)
+    assert pool_sizes == [min(3, size) for size in round_sizes]
+
+    pool_sizes.clear()
+    round_sizes.clear()
+    chain.run_markov_chain(agents[:2], num_steps=2, concurrent=True, max_workers=16,
+                           transition_matrix=np.array([[0.0, 1.0], [1.0, 0.0]]))
+    assert round_sizes == [1, 1]
+    assert pool_sizes == [1, 1]
@@ -0,0 +1,36 @@
+from simulation_engine.markov_agent_chain import MarkovAgentChain
+from generative_agent.modules.cognitive.demand_forecast import forecast_demand
+
+
+def sell_down_to(seller, buyer, chain, chain_trade, step, item_name, stock):
+    """Trade all but `stock` units of the item away at the given step."""
+    quantity = seller.get_inventory_quantity(item_name) - stock
+    chain_trade(chain, seller, buyer, step, item_name, quantity, 1.0)
+    assert seller.get_inventory_quantity(item_name) == stock
+
+
+def test_sales_are_recorded_with_the_simulation_step(merchants, chain_trade):
+    seller, buyer = merchants
+    sell_down_to(seller, buyer, MarkovAgentChain(), chain_trade, 50, "chlorine_tablets", 1)
+    sale = seller.inventory.get_records("sell_item", last_n=1)[0]
+    assert sale.time_step == 50
+
+
+def test_forecast_long_after_the_trade_turn(merchants, chain_trade):
+    seller, buyer = merchants
+    sell_down_to(seller, buyer, MarkovAgentChain(), chain_trade, 50, "chlorine_tablets", 1)
+    forecast = forecast_demand(seller, 50)["chlorine_tablets"]
+    assert forecast.velocity > 0
+    assert not forecast.covered
+    assert seller.get_items_to_produce_from_sales(time_step=50) == ["chlorine_tablets"]
+    assert seller.plan.get_items_to_produce(seller, time_step=50, forecast_mode="prior") == \
+        seller.plan.get_items_to_produce(seller, time_step=50, forecast_mode=None)
+
+
+def test_items_with_enough_stock_are_screened_out(merchants):
+    seller, _ = merchants
+    seller.inventory.sell_item("chlorine_tablets", 1, 10, buyer="Market")
+    forecast = forecast_demand(seller, 10)["chlorine_tablets"]
+    assert forecast.covered
+    assert seller.plan.get_items_to_produce(seller, time_step=10, forecast_mode="prior") == []
+    assert seller.plan.get_items_to_produce(seller, time_step=10, forecast_mode=None) == ["chlorine_tablets"]
@@ -0,0 +1,71 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from generative_agent.modules.conversation_trade_analyzer import ConversationTradeAnalyzer
+from generative_agent.modules.cognitive.inventory import Inventory
+
+
+def test_running_totals_follow_every_mutation():
+    inventory = Inventory([{"name": "salt", "quantity": 4, "value": 1.5, "production_cost": 0.5,
+                            "description": "", "created": 0, "last_modified": 0}])
+    inventory.add_item("tea", 10, 1, value=2.0)
+    inventory.add_item("tea", 10, 2, value=3.0)
+    inventory.sell_item("tea", 5, 3, buyer="Mei Chen", price_per_unit=4.0)
+    inventory.buy_item("soap", 2, 4, seller="Ana Costa", price_per_unit=1.25)
+    inventory.remove_item("salt", 1, 5)
+
+    assert inventory.get_total_items_count() == sum(i.quantity for i in inventory.items.values())
+    assert inventory.get_total_inventory_value() == pytest.approx(
+        sum(i.get_total_value() for i in inventory.items.values()))
+
+    inventory.clear()
+    assert inventory.get_total_items_count() == 0
+    assert inventory.get_total_inventory_value() == 0
+
+
+def test_views_are_rebuilt_after_a_mutation():
+    inventory = Inventory()
+    inventory.add_item("tea", 10, 1, value=2.0)
+    version = inventory.version
+    assert inventory.get_items_text() == str(inventory.get_all_items_with_values())
+    assert inventory.version == version
+
+    inventory.sell_item("tea", 4, 2, buyer="Mei Chen")
+    assert inventory.version != version
+    assert inventory.get_all_items_with_values()["tea"]["quantity"] == 6
+    assert "'quantity': 6" in inventory.get_items_text()
+
+
+def test_callers_cannot_corrupt_the_cached_view():
+    inventory = Inventory()
+    inventory.add_item("tea", 10, 1, value=2.0)
+    text = inventory.get_items_text()
+
+    items = inventory.get_all_items_with_values()
+    items["tea"]["quantity"] = 0
+    items["salt"] = {"quantity": 5}
+    assert inventory.get_all_items_with_values()["tea"]["quantity"] == 10
+    assert "salt" not in inventory.get_all_items_with_values()
+    assert inventory.get_items_text() == text
+
+
+def merchant(name, inventory):
+    return SimpleNamespace(scratch=SimpleNamespace(get_fullname=lambda: name),
+                           inventory=inventory,
+                           get_all_items_with_values=inventory.get_all_items_with_values)
+
+
+def test_analyzer_rerenders_inventories_only_when_they_change():
+    seller_inventory, buyer_inventory = Inventory(), Inventory()
+    seller_inventory.add_item("tea", 10, 1, value=2.0)
+    agents = [merchant("Bianca Silva", seller_inventory), merchant("Mei Chen", buyer_inventory)]
+    analyzer = ConversationTradeAnalyzer()
+
+    first = analyzer._inventories_json(agents)
+    assert analyzer._inventories_json(agents) is first
+    assert json.loads(first)["Bianca Silva"] == [{"name": "tea", "quantity": 10, "value": 2.0}]
+
+    buyer_inventory.buy_item("tea", 1, 2, seller="Bianca Silva", price_per_unit=2.0)
+    assert json.loads(analyzer._inventories_json(agents))["Mei Chen"][0]["quantity"] == 1
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.modules.cognitive.memory_stream import LazyMemoryStream
+
+
+def test_lazy_memory_stream_loads_each_part_on_first_access():
+    calls = []
+    nodes = [{"node_id": 0, "node_type": "observation", "content": "sold tea", "importance": 5,
+              "created": 1, "last_retrieved": 1, "pointer_id": None}]
+    stream = LazyMemoryStream(lambda: calls.append("nodes") or nodes,
+                              lambda: calls.append("embeddings") or {"sold tea": [1.0, 0.0]})
+    assert stream.is_materialized() == (False, False)
+
+    assert stream.count_observations() == 1
+    assert stream.id_to_node[0].content == "sold tea"
+    assert calls == ["nodes"]
+    assert stream.is_materialized() == (True, False)
+
+    assert stream.embeddings["sold tea"] == [1.0, 0.0]
+    assert stream.embeddings["sold tea"] == [1.0, 0.0]
+    assert calls == ["nodes", "embeddings"]
+
+
+def test_load_modes_read_the_same_agent(population_dir):
+    full = GenerativeAgent("Synthetic", "bianca_silva")
+    lazy = GenerativeAgent("Synthetic", "bianca_silva", load_mode="lazy")
+    profile = GenerativeAgent("Synthetic", "bianca_silva", load_mode="profile")
+
+    assert lazy.memory_stream.is_materialized() == (False, False)
+    assert "inventory" not in profile.__dict__
+    for agent in (lazy, profile):
+        assert agent.scratch.package() == full.scratch.package()
+        assert [n.package() for n in agent.memory_stream.seq_nodes] == \
+            [n.package() for n in full.memory_stream.seq_nodes]
+        assert agent.inventory.package() == full.inventory.package()
+
+
+def test_unknown_load_mode():
+    with pytest.raises(ValueError):
+        GenerativeAgent("Synthetic", "bianca_silva", load_mode="partial")
+
+
+def test_saving_a_lazy_agent_leaves_unloaded_memory_files_alone(population_dir):
+    folder = population_dir / "Synthetic" / "bianca_silva" / "memory_stream"
+    # Compact JSON: a rewrite would indent it
+    nodes = json.loads((folder / "nodes.json").read_text())
+    (folder / "nodes.json").write_text(json.dumps(nodes))
+    before = (folder / "nodes.json").read_text()
+
+    agent = GenerativeAgent("Synthetic", "bianca_silva", load_mode="lazy")
+    agent.save()
+    assert (folder / "nodes.json").read_text() == before
+
+    agent.save("Synthetic", "bianca_copy")
+    copy = population_dir / "Synthetic" / "bianca_copy" / "memory_stream"
+    assert (copy / "nodes.json").read_text() == before
+    assert json.loads((copy / "embeddings.json").read_text()) == \
+        json.loads((folder / "embeddings.json").read_text())
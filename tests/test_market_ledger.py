@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+
+from generative_agent.modules.cognitive.inventory import Inventory
+from simulation_engine.market_ledger import MarketLedger
+
+
+def executed(seller, buyer, *items):
+    return {"executed": True,
+            "trade_details": {"participants": {"seller": seller, "buyer": buyer},
+                              "items": [{"name": n, "quantity": q, "value": v} for n, q, v in items]}}
+
+
+def trader(**items):
+    inventory = Inventory()
+    for name, quantity in items.items():
+        inventory.add_item(name.replace("_", " "), quantity, 0, 1.0)
+    return SimpleNamespace(inventory=inventory)
+
+
+@pytest.fixture
+def ledger():
+    ledger = MarketLedger()
+    ledger.record_trade(executed("Bianca", "Mei", ("tea", 2, 10.0)), step=1)
+    ledger.record_trade(executed("Mei", "Ana", ("silk", 1, 80.0), ("tea", 1, 5.0)), step=4)
+    ledger.record_trade(executed("Bianca", "Ana", ("soap", 3, 6.0)), step=2)
+    return ledger
+
+
+def test_only_executed_trades_are_recorded():
+    ledger = MarketLedger()
+    assert ledger.record_trade({"executed": False}, step=1) is None
+    assert ledger.record_trade(None, step=1) is None
+    assert len(ledger) == 0
+
+
+def test_queries_intersect_filters_in_ledger_order(ledger):
+    assert [e["trade_id"] for e in ledger.get_trades()] == [0, 1, 2]
+    assert [e["trade_id"] for e in ledger.get_trades(seller="Bianca")] == [0, 2]
+    assert [e["trade_id"] for e in ledger.get_trades(item_name="tea")] == [0, 1]
+    assert [e["trade_id"] for e in ledger.get_trades(agent="Mei")] == [0, 1]
+    assert [e["trade_id"] for e in ledger.get_trades(start_step=2)] == [1, 2]
+    assert [e["trade_id"] for e in ledger.get_trades(buyer="Ana", end_step=3)] == [2]
+    assert ledger.get_trades(seller="Ana") == []
+
+
+def test_stats_use_line_totals(ledger):
+    assert ledger.agent_stats("Mei") == {"sales": 85.0, "purchases": 10.0, "net_value": 75.0, "trade_count": 2}
+    assert ledger.agent_stats("Nobody")["trade_count"] == 0
+    assert [row["agent"] for row in ledger.leaderboard()] == ["Mei", "Bianca", "Ana"]
+
+
+def test_conserving_trade_passes_the_check():
+    seller, buyer = trader(tea=5), trader(digital_cash=20)
+    before = MarketLedger.snapshot([seller, buyer])
+    seller.inventory.sell_item("tea", 2, 1, buyer="Mei", price_per_unit=5.0)
+    buyer.inventory.buy_item("tea", 2, 1, seller="Bianca", price_per_unit=5.0)
+
+    ledger = MarketLedger()
+    entry = ledger.record_trade(executed("Bianca", "Mei", ("tea", 2, 10.0)), 1,
+                                before, MarketLedger.snapshot([seller, buyer]))
+
+    assert entry["conserved"] is True
+    assert ledger.get_conservation_violations() == []
+
+
+def test_one_sided_trade_is_a_violation():
+    seller, buyer = trader(tea=5), trader(digital_cash=20)
+    before = MarketLedger.snapshot([seller, buyer])
+    seller.inventory.sell_item("tea", 2, 3, buyer="Mei", price_per_unit=5.0)
+
+    ledger = MarketLedger()
+    entry = ledger.record_trade(executed("Bianca", "Mei", ("tea", 2, 10.0)), 3,
+                                before, MarketLedger.snapshot([seller, buyer]))
+
+    assert entry["conserved"] is False
+    [violation] = ledger.get_conservation_violations(start_step=3, end_step=3)
+    assert violation["problems"] == ["digital cash changed by +10", "tea changed by -2"]
+    assert ledger.get_conservation_violations(end_step=2) == []
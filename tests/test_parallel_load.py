@@ -0,0 +1,55 @@
+import numpy as np
+
+from generative_agent.agent_store import FolderAgentStore
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.modules.cognitive.memory_stream import QuantizedEmbeddings, convert_embeddings
+from generative_agent.parallel_load import attach_embeddings, load_agents_parallel, share_embeddings
+
+
+EMBEDDINGS = {"sold tea": [0.5, -0.25, 1.0], "bought salt": [-1.0, 0.0, 0.125]}
+
+
+def test_float_embeddings_round_trip_through_shared_memory():
+    assert attach_embeddings(share_embeddings(EMBEDDINGS), "float64") == EMBEDDINGS
+
+
+def test_quantized_embeddings_round_trip_through_shared_memory():
+    quantized = convert_embeddings(EMBEDDINGS, "int8")
+    restored = attach_embeddings(share_embeddings(quantized), "int8")
+    assert isinstance(restored, QuantizedEmbeddings)
+    for content in EMBEDDINGS:
+        assert np.array_equal(restored[content], quantized[content])
+
+
+def test_empty_embeddings_need_no_block():
+    descriptor = share_embeddings({})
+    assert descriptor["name"] is None
+    assert attach_embeddings(descriptor, "float64") == {}
+
+
+def test_pool_loads_the_same_agents_and_reports_failures(population_dir):
+    store = FolderAgentStore(str(population_dir))
+    progress = []
+    agents, errors = load_agents_parallel("Synthetic", ["bianca_silva", "nobody", "mei_chen"], store, "float64",
+                                          max_workers=2, progress=lambda done, total, *rest: progress.append((done, total)))
+
+    assert sorted(agents) == ["bianca_silva", "mei_chen"]
+    assert list(errors) == ["nobody"]
+    assert sorted(progress) == [(1, 3), (2, 3), (3, 3)]
+    for agent_id, agent in agents.items():
+        sequential = GenerativeAgent("Synthetic", agent_id, store=store)
+        assert agent.scratch.package() == sequential.scratch.package()
+        assert [n.package() for n in agent.memory_stream.seq_nodes] == \
+            [n.package() for n in sequential.memory_stream.seq_nodes]
+        assert agent.memory_stream.embeddings == sequential.memory_stream.embeddings
+        assert agent.inventory.package() == sequential.inventory.package()
+
+
+def test_pool_loaded_agents_save_to_the_store(population_dir):
+    store = FolderAgentStore(str(population_dir))
+    agents, _ = load_agents_parallel("Synthetic", ["bianca_silva", "mei_chen"], store, "float64", max_workers=2)
+    seller = agents["bianca_silva"]
+    stock = seller.get_inventory_quantity("chlorine_tablets")
+    seller.inventory.sell_item("chlorine_tablets", 1, 5, buyer="Market")
+    seller.save()
+    assert GenerativeAgent("Synthetic", "bianca_silva", store=store).get_inventory_quantity("chlorine_tablets") == stock - 1
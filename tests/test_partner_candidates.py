@@ -0,0 +1,65 @@
+import random
+from types import SimpleNamespace
+
+from generative_agent.modules.cognitive.inventory import Inventory
+from simulation_engine.partner_candidates import PartnerShortlister, needs_text, offer_text, trade_volumes
+
+
+def merchant(k, item_name):
+    inventory = Inventory()
+    inventory.add_item("digital cash", 1000, 0, 1.0)
+    inventory.add_item(item_name, 10, 0, 2.0)
+    name = f"Agent {k:02d}"
+    return SimpleNamespace(scratch=SimpleNamespace(get_fullname=lambda: name, self_description=f"trader {k}"),
+                           inventory=inventory)
+
+
+def population(size=12):
+    return [merchant(k, "tea" if k % 2 else "salt") for k in range(size)]
+
+
+def test_trade_volume_and_texts_come_from_the_inventory():
+    agents = population(3)
+    agents[0].inventory.buy_item("tea", 2, 1, seller="Agent 01", price_per_unit=5.0)
+    agents[0].inventory.receive_payment(3.0, 2, payer="Agent 02")
+    agents[0].inventory.buy_item("tea", 1, 3, seller="Agent 01", price_per_unit=5.0)
+
+    assert trade_volumes(agents[0]) == {"Agent 01": 15.0, "Agent 02": 3.0}
+    assert needs_text(agents[0]) == "Agent 00: trader 0\nBuys: tea"
+    assert offer_text(agents[0]) == "Agent 00 sells: salt, tea"
+
+
+def test_small_populations_score_everyone():
+    agents = population(5)
+    shortlists = PartnerShortlister(shortlist_size=3, exploration_slots=1, embed=lambda text: [1.0]).shortlists(agents)
+    assert shortlists["Agent 00"] == {"Agent 01", "Agent 02", "Agent 03", "Agent 04"}
+
+
+def test_shortlist_ranks_by_volume_and_fit_plus_exploration():
+    random.seed(1)
+    agents = [merchant(k, "tea" if k in (3, 5) else "salt") for k in range(12)]
+    agents[0].inventory.buy_item("salt", 1, 1, seller="Agent 10", price_per_unit=50.0)
+    agents[0].inventory.buy_item("tea", 1, 2, seller="Agent 03", price_per_unit=1.0)
+    # Agent 00 has bought tea; Agents 03 and 05 sell it.
+    embed = lambda text: [1.0, 0.0] if "tea" in text else [0.0, 1.0]
+
+    shortlister = PartnerShortlister(shortlist_size=3, exploration_slots=2, embed=embed)
+    shortlist = shortlister.shortlists(agents, include={"Agent 00": {"Agent 08", "Agent 00"}})["Agent 00"]
+
+    assert {"Agent 03", "Agent 05", "Agent 10", "Agent 08"} <= shortlist
+    assert "Agent 00" not in shortlist
+    assert len(shortlist) <= 3 + 2 + 1
+
+
+def test_without_embeddings_volume_still_ranks(capsys):
+    agents = population()
+    agents[4].inventory.receive_payment(20.0, 1, payer="Agent 07")
+    def broken(text):
+        raise RuntimeError("no API key")
+
+    shortlister = PartnerShortlister(shortlist_size=2, exploration_slots=0, embed=broken)
+    shortlists = shortlister.shortlists(agents)
+
+    assert "Agent 07" in shortlists["Agent 04"]
+    assert all(len(partners) == 2 for partners in shortlists.values())
+    assert capsys.readouterr().out.count("embeddings unavailable") == 1
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from generative_agent.generative_agent import buying_interest_probabilities
+from simulation_engine.partner_evidence import PartnerEvidenceTracker
+from simulation_engine.simulation import Simulation
+
+
+NAMES = ["Bianca Silva", "Mei Chen", "Carlos Mendez", "Carlos Santos"]
+
+
+def scorer(name, memories=()):
+    agent = SimpleNamespace(scratch=SimpleNamespace(get_fullname=lambda: name),
+                            memory_stream=SimpleNamespace(seq_nodes=[SimpleNamespace(content=m) for m in memories]),
+                            scored=[])
+    def raw_scores(others):
+        agent.scored.append(list(others))
+        return {other: 60.0 for other in others}
+    agent.get_markov_buying_interest_raw_scores = raw_scores
+    return agent
+
+
+def remember(agent, content):
+    agent.memory_stream.seq_nodes.append(SimpleNamespace(content=content))
+
+
+def test_conversations_and_trades_mark_both_directions():
+    tracker = PartnerEvidenceTracker(NAMES)
+    tracker.note_interactions([{"type": "conversation", "participants": ["Bianca Silva", "Mei Chen"]},
+                               {"type": "reflection", "agent": "Carlos Mendez"}])
+    tracker.note_trades([{"seller": "Carlos Mendez", "buyer": "Mei Chen"}])
+
+    assert tracker.dirty_pairs() == {("Bianca Silva", "Mei Chen"), ("Mei Chen", "Bianca Silva"),
+                                     ("Carlos Mendez", "Mei Chen"), ("Mei Chen", "Carlos Mendez")}
+    tracker.clear("Mei Chen")
+    assert tracker.dirty_partners("Mei Chen") == set()
+    assert tracker.is_dirty("Bianca Silva", "Mei Chen")
+
+
+def test_only_new_memories_that_name_a_partner_count():
+    bianca = scorer("Bianca Silva", ["Mei Chen bought tablets"])
+    tracker = PartnerEvidenceTracker(NAMES)
+    tracker.scan_memories([bianca])
+    assert tracker.dirty_pairs() == set()
+
+    remember(bianca, "mei asked about pool shock")
+    remember(bianca, "Carlos waved; Carlos Santos smiled")
+    remember(bianca, "Bianca Silva restocked")
+    tracker.scan_memories([bianca])
+
+    # "Carlos" is shared, so only the full name counts; the scorer never marks itself.
+    assert tracker.dirty_partners("Bianca Silva") == {"Mei Chen", "Carlos Santos"}
+
+
+def test_probabilities_are_a_softmax_of_the_raw_scores():
+    probabilities = buying_interest_probabilities({"Mei Chen": 80, "Carlos Mendez": 50, "Carlos Santos": 50})
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+    assert probabilities["Carlos Mendez"] == pytest.approx(probabilities["Carlos Santos"])
+    assert probabilities["Mei Chen"] / probabilities["Carlos Mendez"] == pytest.approx(20.0855, rel=1e-4)
+
+
+def test_weight_cycles_rescore_only_pairs_with_new_evidence(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulation = Simulation()
+    simulation.agents = [scorer(name) for name in NAMES[:3]]
+    simulation.partner_evidence = PartnerEvidenceTracker(NAMES[:3])
+    bianca, mei, carlos = simulation.agents
+
+    simulation.calculate_network_weights()
+    assert [len(scored) for scored in (bianca.scored, mei.scored, carlos.scored)] == [1, 1, 1]
+    first_weights = simulation.network_weights
+
+    remember(mei, "Carlos Mendez offered a discount")
+    simulation.calculate_network_weights()
+
+    assert mei.scored[-1] == ["Carlos Mendez"]
+    assert len(bianca.scored) == len(carlos.scored) == 1
+    assert simulation.network_weights == first_weights
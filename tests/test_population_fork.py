@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.population_fork import fork_agent, fork_population, is_frozen
+
+
+def test_forking_writes_only_references(population_dir):
+    forked = fork_population("Synthetic", "Synthetic_cf1", ["bianca_silva", "mei_chen"])
+    assert forked == ["bianca_silva", "mei_chen"]
+    assert sorted(os.listdir(population_dir / "Synthetic_cf1" / "bianca_silva")) == ["fork.json", "meta.json"]
+    assert is_frozen(str(population_dir / "Synthetic" / "bianca_silva"))
+    assert not is_frozen(str(population_dir / "Synthetic" / "mina_kim"))
+
+
+def test_fork_reads_through_to_the_parent(population_dir):
+    fork_agent("Synthetic", "bianca_silva", "Synthetic_cf1")
+    parent = GenerativeAgent("Synthetic", "bianca_silva")
+    child = GenerativeAgent("Synthetic_cf1", "bianca_silva")
+
+    assert (child.population, child.id) == ("Synthetic_cf1", "bianca_silva")
+    assert child.scratch.package() == parent.scratch.package()
+    assert [n.package() for n in child.memory_stream.seq_nodes] == \
+        [n.package() for n in parent.memory_stream.seq_nodes]
+    assert child.inventory.package() == parent.inventory.package()
+
+
+def test_frozen_parent_cannot_be_saved(population_dir):
+    fork_agent("Synthetic", "bianca_silva", "Synthetic_cf1")
+    with pytest.raises(ValueError):
+        GenerativeAgent("Synthetic", "bianca_silva").save()
+
+
+def test_fork_saves_only_its_changes(population_dir):
+    fork_agent("Synthetic", "bianca_silva", "Synthetic_cf1")
+    parent_records = len(GenerativeAgent("Synthetic", "bianca_silva").inventory.records)
+    child = GenerativeAgent("Synthetic_cf1", "bianca_silva")
+    stock = child.get_inventory_quantity("chlorine_tablets")
+    child.inventory.sell_item("chlorine_tablets", 1, 5, buyer="Market")
+    child.save()
+
+    assert not os.path.exists(population_dir / "Synthetic_cf1" / "bianca_silva" / "scratch.json")
+    reloaded = GenerativeAgent("Synthetic_cf1", "bianca_silva")
+    assert reloaded.get_inventory_quantity("chlorine_tablets") == stock - 1
+    assert len(reloaded.inventory.records) == parent_records + 1
+    parent = GenerativeAgent("Synthetic", "bianca_silva")
+    assert parent.get_inventory_quantity("chlorine_tablets") == stock
+    assert len(parent.inventory.records) == parent_records
+
+
+def test_forks_of_forks_resolve_the_whole_chain(population_dir):
+    fork_agent("Synthetic", "bianca_silva", "Synthetic_cf1")
+    child = GenerativeAgent("Synthetic_cf1", "bianca_silva")
+    child.inventory.sell_item("chlorine_tablets", 1, 5, buyer="Market")
+    child.save()
+    stock = child.get_inventory_quantity("chlorine_tablets")
+
+    fork_agent("Synthetic_cf1", "bianca_silva", "Synthetic_cf2")
+    grandchild = GenerativeAgent("Synthetic_cf2", "bianca_silva")
+    assert grandchild.get_inventory_quantity("chlorine_tablets") == stock
+    assert grandchild.inventory.package() == child.inventory.package()
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+
+from generative_agent.agent_store import FolderAgentStore
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.population_snapshot import SnapshotAgentStore, export_population, import_snapshot
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, population_dir):
+    path = str(tmp_path / "synthetic.agsnap")
+    assert export_population("Synthetic", path, agent_ids=["bianca_silva", "mei_chen"], embedding_mode="int8") == 2
+    return path
+
+
+def test_snapshot_agents_match_the_store(snapshot_path):
+    snapshot = SnapshotAgentStore(snapshot_path)
+    assert snapshot.list_agents("Synthetic") == ["bianca_silva", "mei_chen"]
+    assert not snapshot.exists("Synthetic_Base", "bianca_silva")
+
+    from_store = GenerativeAgent("Synthetic", "bianca_silva", embedding_mode="int8")
+    warm = GenerativeAgent("Synthetic", "bianca_silva", embedding_mode="int8", store=snapshot)
+    assert warm.scratch.package() == from_store.scratch.package()
+    assert [n.package() for n in warm.memory_stream.seq_nodes] == \
+        [n.package() for n in from_store.memory_stream.seq_nodes]
+    assert warm.inventory.package() == from_store.inventory.package()
+    for content in from_store.memory_stream.embeddings:
+        assert np.allclose(warm.memory_stream.embeddings[content], from_store.memory_stream.embeddings[content])
+
+
+def test_saves_go_to_the_write_store_and_leave_the_file_alone(snapshot_path, tmp_path):
+    size = os.path.getsize(snapshot_path)
+    with open(snapshot_path, "rb") as snapshot_file:
+        before = snapshot_file.read()
+    write_store = FolderAgentStore(str(tmp_path / "written"))
+    snapshot = SnapshotAgentStore(snapshot_path, write_store=write_store)
+
+    agent = GenerativeAgent("Synthetic", "bianca_silva", embedding_mode="int8", store=snapshot)
+    stock = agent.get_inventory_quantity("chlorine_tablets")
+    agent.inventory.sell_item("chlorine_tablets", 1, 5, buyer="Market")
+    agent.save()
+
+    with open(snapshot_path, "rb") as snapshot_file:
+        assert snapshot_file.read() == before
+    assert os.path.getsize(snapshot_path) == size
+    saved = GenerativeAgent("Synthetic", "bianca_silva", store=write_store)
+    assert saved.get_inventory_quantity("chlorine_tablets") == stock - 1
+
+
+def test_import_snapshot_writes_every_agent(snapshot_path, tmp_path):
+    store = FolderAgentStore(str(tmp_path / "imported"))
+    assert import_snapshot(snapshot_path, store=store) == 2
+    assert store.list_agents("Synthetic") == ["bianca_silva", "mei_chen"]
+    assert GenerativeAgent("Synthetic", "mei_chen", store=store).scratch.package() == \
+        GenerativeAgent("Synthetic", "mei_chen").scratch.package()
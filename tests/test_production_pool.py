@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from generative_agent.modules.cognitive.plan import Plan, ProductionPlan
+
+
+ITEMS = {"Bianca Silva": ["chlorine_tablets", "pool_shock", "ph_balancer"],
+         "Mei Chen": ["silk_scarves", "silk_ties_men"]}
+
+
+@pytest.fixture
+def planned(merchants, monkeypatch):
+    """Plans 3 units of every item without the LLM, slowly enough to overlap, and tracks concurrency."""
+    state = {"active": 0, "peak": 0}
+    guard = threading.Lock()
+
+    def create_production_plan_with_llm(self, agent, item_name, time_step, store=True, forecast=None):
+        with guard:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.02)
+        with guard:
+            state["active"] -= 1
+        plan = ProductionPlan({"item_name": item_name, "planned_quantity": 3, "reasoning": "restock",
+                               "created": time_step, "time_step": time_step})
+        if store:
+            self.production_plans.append(plan)
+        return plan
+    monkeypatch.setattr(Plan, "create_production_plan_with_llm", create_production_plan_with_llm)
+
+    # Items are planned one by one, which is also what a failed batched prompt falls back to
+    def no_batched_planning(self, agent, item_names, time_step, store=True, forecasts=None):
+        raise RuntimeError("batched planning is not used in this test")
+    monkeypatch.setattr(Plan, "create_production_plans_with_llm", no_batched_planning)
+    for agent in merchants:
+        monkeypatch.setattr(agent, "execute_production_plan", lambda plan, time_step: True)
+        # Sell all but one unit so the demand forecast does not screen the items out
+        for item_name in ITEMS[agent.scratch.get_fullname()]:
+            agent.inventory.sell_item(item_name, agent.get_inventory_quantity(item_name) - 1, 6, buyer="Market")
+    return state
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_results_and_plans_keep_agent_and_item_order(merchants, planned, max_workers):
+    results = Plan().execute_production_for_all_agents(list(merchants), 7, ITEMS, max_workers=max_workers)
+
+    assert list(results) == ["Bianca Silva", "Mei Chen"]
+    for agent in merchants:
+        name = agent.scratch.get_fullname()
+        assert results[name]["items_considered"] == ITEMS[name]
+        assert results[name]["plans_executed"] == len(ITEMS[name])
+        assert [plan.item_name for plan in agent.plan.production_plans] == ITEMS[name]
+    if max_workers == 1:
+        assert planned["peak"] == 1
+    else:
+        assert 1 < planned["peak"] <= max_workers
+
+
+def test_agents_without_items_are_skipped(merchants, planned):
+    results = Plan().execute_production_for_all_agents(list(merchants), 7, {"Mei Chen": ["silk_scarves"]})
+    assert list(results) == ["Mei Chen"]
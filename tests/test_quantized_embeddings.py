@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+
+from generative_agent.generative_agent import GenerativeAgent
+from generative_agent.modules.cognitive.memory_stream import (
+    QuantizedEmbeddings, convert_embeddings, load_embeddings, save_embeddings)
+
+
+def random_embeddings(count=5, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"memory {i}": rng.normal(size=dim).tolist() for i in range(count)}
+
+
+@pytest.mark.parametrize("mode, tolerance", [("float16", 1e-2), ("int8", 2e-2)])
+def test_quantized_vectors_stay_close_to_full_precision(mode, tolerance):
+    embeddings = random_embeddings()
+    quantized = QuantizedEmbeddings(mode, embeddings)
+
+    assert len(quantized) == len(embeddings)
+    for content, vector in embeddings.items():
+        vector = np.asarray(vector)
+        error = np.max(np.abs(quantized[content] - vector)) / np.max(np.abs(vector))
+        assert error < tolerance
+
+
+def test_deleting_keeps_the_block_dense():
+    embeddings = random_embeddings()
+    quantized = QuantizedEmbeddings("int8", embeddings)
+    del quantized["memory 1"]
+
+    assert "memory 1" not in quantized
+    assert len(quantized) == 4
+    assert quantized.nbytes() == 4 * (8 + 4)
+    for content in quantized:
+        np.testing.assert_allclose(quantized[content], embeddings[content], atol=0.05)
+
+
+def test_convert_embeddings_between_modes():
+    embeddings = random_embeddings()
+    assert convert_embeddings(embeddings, "float64") is embeddings
+
+    quantized = convert_embeddings(embeddings, "float16")
+    assert convert_embeddings(quantized, "float16") is quantized
+    restored = convert_embeddings(quantized, "float64")
+    assert set(restored) == set(embeddings)
+    assert isinstance(restored["memory 0"], list)
+
+    with pytest.raises(ValueError):
+        convert_embeddings(embeddings, "int4")
+
+
+def test_saving_switches_the_embeddings_file(tmp_path):
+    embeddings = random_embeddings()
+    save_embeddings(QuantizedEmbeddings("int8", embeddings), str(tmp_path))
+    assert os.listdir(tmp_path) == ["embeddings.npz"]
+
+    loaded = load_embeddings(str(tmp_path), "int8")
+    assert loaded.mode == "int8"
+    for content in embeddings:
+        np.testing.assert_allclose(loaded[content], embeddings[content], atol=0.05)
+
+    save_embeddings(convert_embeddings(loaded, "float64"), str(tmp_path))
+    assert os.listdir(tmp_path) == ["embeddings.json"]
+
+
+def test_agent_saved_in_int8_reloads_in_any_mode(population_dir):
+    agent = GenerativeAgent("Synthetic", "bianca_silva", embedding_mode="int8")
+    agent.save("Synthetic", "bianca_int8")
+
+    folder = population_dir / "Synthetic" / "bianca_int8" / "memory_stream"
+    assert (folder / "embeddings.npz").exists()
+    assert not (folder / "embeddings.json").exists()
+
+    reloaded = GenerativeAgent("Synthetic", "bianca_int8")
+    assert set(reloaded.memory_stream.embeddings) == set(agent.memory_stream.embeddings)
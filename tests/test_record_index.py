@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+from generative_agent.modules.cognitive.inventory import Inventory
+from generative_agent.modules.cognitive.plan import Plan
+
+
+def shop():
+    inventory = Inventory()
+    inventory.add_item("tea", 20, 0, value=2.0)
+    inventory.add_item("salt", 20, 0, value=1.0)
+    inventory.sell_item("tea", 2, 3, buyer="Mei Chen", price_per_unit=2.0)
+    inventory.sell_item("salt", 1, 5, buyer="Ana Costa", price_per_unit=1.0)
+    inventory.buy_item("salt", 4, 7, seller="Bianca Silva", price_per_unit=0.5)
+    inventory.sell_item("tea", 3, 9, buyer="Ana Costa", price_per_unit=2.0)
+    return inventory
+
+
+def scan(inventory, actions, item_name=None, start_step=None, end_step=None):
+    return [r for r in inventory.records
+            if r.action in actions
+            and (item_name is None or r.item_name == item_name)
+            and (start_step is None or r.time_step >= start_step)
+            and (end_step is None or r.time_step <= end_step)]
+
+
+def test_indexed_queries_match_a_full_scan():
+    inventory = shop()
+    for actions in (["sell_item"], ["sell_item", "buy_item"], ["receive_payment", "make_payment"]):
+        for item_name in (None, "tea", "salt", "digital cash"):
+            for start_step, end_step in ((None, None), (4, None), (None, 7), (4, 7)):
+                assert inventory.get_records(actions, item_name, start_step, end_step) == \
+                    scan(inventory, actions, item_name, start_step, end_step)
+
+
+def test_trade_records_carry_their_action_and_partner():
+    inventory = shop()
+    sales = inventory.get_sales_history("tea")
+    assert [(s["quantity"], s["trade_partner"]) for s in sales] == [(2, "Mei Chen"), (3, "Ana Costa")]
+    assert inventory.get_purchase_history()[0]["trade_partner"] == "Bianca Silva"
+    assert inventory.count_records("add") == 2
+    assert inventory.get_transaction_summary() == {
+        "sell_item": 3, "buy_item": 1, "receive_payment": 3, "make_payment": 1,
+        "trade_failed": 0, "add": 2, "remove": 0}
+
+
+def test_out_of_order_steps_are_found_by_range():
+    inventory = shop()
+    inventory.sell_item("tea", 1, 4, buyer="Mei Chen")
+    inventory.sell_item("tea", 1, 1, buyer="Mei Chen")
+
+    in_range = inventory.get_records("sell_item", "tea", start_step=2, end_step=5)
+    assert [r.time_step for r in in_range] == [3, 4]
+    assert [r.time_step for r in inventory.get_records("sell_item", "tea", end_step=2)] == [1]
+    assert [r.time_step for r in inventory.get_records("sell_item", last_n=2)] == [4, 1]
+
+
+def test_records_loaded_from_disk_are_indexed():
+    inventory = shop()
+    package = inventory.package()
+    reloaded = Inventory(package["items"], package["records"])
+    assert reloaded.get_trade_history() == inventory.get_trade_history()
+
+    reloaded.clear()
+    assert reloaded.get_records("sell_item") == []
+    assert reloaded.count_records() == 0
+
+
+def test_items_to_produce_follow_the_most_recent_sales():
+    agent = SimpleNamespace(inventory=shop())
+    assert Plan().get_items_to_produce(agent, forecast_mode=None) == ["tea", "salt"]
+    assert Plan().get_items_to_produce(agent, max_items=1, forecast_mode=None) == ["tea"]
@@ -0,0 +1,43 @@
+import pytest
+
+from generative_agent.modules.cognitive.inventory import InventoryItem, InventoryRecord
+import generative_agent.modules.cognitive.memory_stream as memory_stream_module
+from generative_agent.modules.cognitive.memory_stream import ConceptNode, MemoryStream
+from generative_agent.modules.cognitive.plan import ProductionPlan
+
+
+NODE = {"node_id": 0, "node_type": "observation", "content": "sold tea", "importance": 5,
+        "created": 1, "last_retrieved": 1, "pointer_id": None}
+ITEM = {"name": "tea", "quantity": 3, "value": 2.5, "production_cost": 1.0,
+        "description": "green tea", "created": 0, "last_modified": 0}
+RECORD = {"record_id": 0, "action": "sell_item", "item_name": "tea", "quantity": 1,
+          "time_step": 4, "description": "sold tea", "trade_partner": "Mei Chen"}
+PLAN = {"item_name": "tea", "planned_quantity": 5, "reasoning": "steady demand",
+        "created": 2, "time_step": 2}
+
+
+@pytest.mark.parametrize("cls, data", [(ConceptNode, NODE), (InventoryItem, ITEM),
+                                       (InventoryRecord, RECORD), (ProductionPlan, PLAN)])
+def test_slotted_objects_package_unchanged(cls, data):
+    obj = cls(data)
+    assert not hasattr(obj, "__dict__")
+    assert obj.package() == data
+    with pytest.raises(AttributeError):
+        obj.unexpected = 1
+
+
+def test_record_strings_are_shared():
+    first = InventoryRecord(dict(RECORD, action="".join(["sell", "_item"])))
+    second = InventoryRecord(dict(RECORD, record_id=1))
+    assert first.action is second.action
+    assert first.trade_partner is second.trade_partner
+
+
+def test_stateful_retrieve_updates_last_retrieved(monkeypatch):
+    monkeypatch.setattr(memory_stream_module, "get_text_embedding", lambda text: [1.0, 0.0])
+    nodes = [NODE, dict(NODE, node_id=1, content="bought salt", created=2, last_retrieved=2)]
+    stream = MemoryStream(nodes, {"sold tea": [1.0, 0.0], "bought salt": [0.0, 1.0]})
+
+    stream.retrieve(["sold tea"], time_step=9, n_count=1, stateless=False, verbose=False)
+
+    assert [n.last_retrieved for n in stream.seq_nodes] == [9, 2]
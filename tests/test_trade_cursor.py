@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import generative_agent.modules.conversation_trade_analyzer as trade_module
+from generative_agent.modules.cognitive.inventory import Inventory
+from generative_agent.modules.cognitive.working_memory import WorkingMemory
+from generative_agent.modules.conversation_trade_analyzer import ConversationTradeAnalyzer
+
+
+def trader(name, **items):
+    inventory = Inventory()
+    for item_name, quantity in items.items():
+        inventory.add_item(item_name.replace("digital_cash", "digital cash"), quantity, 0, 1.0)
+    return SimpleNamespace(scratch=SimpleNamespace(get_fullname=lambda: name),
+                           inventory=inventory, working_memory=WorkingMemory())
+
+
+def spy_on_analysis(analyzer, monkeypatch):
+    def no_llm(*args, **kwargs):
+        raise AssertionError("the LLM should not be called")
+    monkeypatch.setattr(trade_module, "chat_safe_generate", no_llm)
+    texts = []
+    analyze_trade = analyzer.analyze_trade
+    def recording_analyze_trade(agents, conversation_text, time_step):
+        texts.append(conversation_text)
+        return analyze_trade(agents, conversation_text, time_step)
+    monkeypatch.setattr(analyzer, "analyze_trade", recording_analyze_trade)
+    return texts
+
+
+def test_each_trade_in_a_conversation_is_settled_once(monkeypatch):
+    seller = trader("Bianca Silva", chlorine_tablets=50, pool_shock=40)
+    buyer = trader("Mei Chen", digital_cash=1000)
+    analyzer = ConversationTradeAnalyzer()
+    texts = spy_on_analysis(analyzer, monkeypatch)
+    dialogue = [["Bianca Silva", "5 chlorine tablets for $15."], ["Mei Chen", "Deal."]]
+
+    first = analyzer.execute_trade([seller, buyer], "c1", dialogue, "market", time_step=1, testing_mode=True)
+    again = analyzer.execute_trade([seller, buyer], "c1", dialogue, "market", time_step=1, testing_mode=True)
+
+    assert first["executed"] and not again["executed"]
+    assert len(texts) == 1
+    assert seller.inventory.get_item_quantity("chlorine_tablets") == 45
+    assert seller.working_memory.trade_cursor == buyer.working_memory.trade_cursor == 2
+
+    dialogue += [["Bianca Silva", "Want 2 pool shocks for $30 too?"], ["Mei Chen", "Deal."]]
+    second = analyzer.execute_trade([seller, buyer], "c1", dialogue, "market", time_step=2, testing_mode=True)
+
+    assert second["executed"]
+    assert seller.inventory.get_item_quantity("chlorine_tablets") == 45
+    assert seller.inventory.get_item_quantity("pool_shock") == 38
+    assert "5 chlorine tablets for $15." not in texts[1]
+    assert "- Bianca Silva sold to Mei Chen: 5 chlorine_tablets ($15.0)" in texts[1]
+
+
+def test_cursor_survives_packaging_and_resets_with_the_interaction():
+    memory = WorkingMemory()
+    memory.settle_trades_through(4)
+    memory.settle_trades_through(2)
+    assert memory.trade_cursor == 4
+
+    restored = WorkingMemory()
+    restored.load_from_package(memory.package())
+    assert restored.trade_cursor == 4
+
+    restored.start_new_interaction("market", "c2")
+    assert restored.trade_cursor == 0
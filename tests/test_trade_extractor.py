@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+
+import generative_agent.modules.conversation_trade_analyzer as trade_module
+from generative_agent.modules.cognitive.inventory import Inventory
+from generative_agent.modules.conversation_trade_analyzer import ConversationTradeAnalyzer
+from generative_agent.modules.trade_extractor import RuleBasedTradeExtractor
+
+
+def trader(name, **items):
+    inventory = Inventory()
+    for item_name, (quantity, value) in items.items():
+        inventory.add_item(item_name.replace("digital_cash", "digital cash"), quantity, 0, value)
+    return SimpleNamespace(scratch=SimpleNamespace(get_fullname=lambda: name), inventory=inventory)
+
+
+@pytest.fixture
+def agents():
+    seller = trader("Bianca Silva", chlorine_tablets=(50, 3.0), pool_shock=(40, 15.0))
+    buyer = trader("Mei Chen", digital_cash=(1000, 1.0))
+    return [seller, buyer]
+
+
+def conversation(*turns):
+    return "".join(f"[{speaker}]: {message}\n" for speaker, message in turns)
+
+
+def test_offer_accepted_by_the_buyer(agents):
+    text = conversation(("Mei Chen", "What do you have today?"),
+                        ("Bianca Silva", "I can sell you 5 chlorine tablets for $3 each."),
+                        ("Mei Chen", "Deal, I'll take them."))
+
+    trade, confidence = RuleBasedTradeExtractor().extract(agents, text, 12)
+
+    assert confidence == 1.0
+    assert trade == {"participants": {"seller": "Bianca Silva", "buyer": "Mei Chen"},
+                     "items": [{"name": "chlorine_tablets", "quantity": 5, "value": 15.0}],
+                     "time_step": 12}
+
+
+def test_several_items_with_line_totals(agents):
+    text = conversation(("Bianca Silva", "Two pool shocks for $30 and ten chlorine tablets for $28."),
+                        ("Mei Chen", "Sounds good, paid."))
+
+    trade, confidence = RuleBasedTradeExtractor().extract(agents, text, 3)
+
+    assert confidence == 1.0
+    assert trade["items"] == [{"name": "pool_shock", "quantity": 2, "value": 30.0},
+                              {"name": "chlorine_tablets", "quantity": 10, "value": 28.0}]
+
+
+def test_rejected_offer_is_no_trade(agents):
+    text = conversation(("Bianca Silva", "5 chlorine tablets for $15."),
+                        ("Mei Chen", "No thanks, too expensive."))
+    assert RuleBasedTradeExtractor().extract(agents, text, 3) == (None, 0.0)
+
+
+def test_unaccepted_offer_is_no_trade(agents):
+    text = conversation(("Mei Chen", "Hi, what do you have today?"),
+                        ("Bianca Silva", "Great deal for you: 5 chlorine tablets for $3 each!"))
+    assert RuleBasedTradeExtractor().extract(agents, text, 3) == (None, 0.0)
+
+
+def test_offer_accepted_only_by_its_own_speaker_is_no_trade(agents):
+    text = conversation(("Mei Chen", "Hi, what do you have today?"),
+                        ("Bianca Silva", "5 chlorine tablets for $3 each."),
+                        ("Bianca Silva", "Deal? I'll confirm it for you."))
+    assert RuleBasedTradeExtractor().extract(agents, text, 3) == (None, 0.0)
+
+
+def test_counter_offer_needs_its_own_acceptance(agents):
+    turns = [("Bianca Silva", "I can sell you 5 chlorine tablets for $3 each."),
+             ("Mei Chen", "How about 5 chlorine tablets for $2 each?")]
+    assert RuleBasedTradeExtractor().extract(agents, conversation(*turns), 3) == (None, 0.0)
+
+    trade, confidence = RuleBasedTradeExtractor().extract(
+        agents, conversation(*turns, ("Bianca Silva", "Alright, deal.")), 3)
+    assert confidence == 1.0
+    assert trade["participants"] == {"seller": "Bianca Silva", "buyer": "Mei Chen"}
+    assert trade["items"] == [{"name": "chlorine_tablets", "quantity": 5, "value": 10.0}]
+
+
+def test_unclear_terms_lower_the_confidence(agents):
+    agents[1].inventory.add_item("chlorine_tablets", 2, 0, 3.0)
+    text = conversation(("Bianca Silva", "Chlorine tablets for $400."),
+                        ("Mei Chen", "Deal."))
+
+    trade, confidence = RuleBasedTradeExtractor().extract(agents, text, 3)
+
+    assert trade is not None
+    assert confidence < 0.8
+
+
+def test_analyzer_skips_the_llm_for_a_confident_reading(agents, monkeypatch):
+    def no_llm(*args, **kwargs):
+        raise AssertionError("the LLM should not be called")
+    monkeypatch.setattr(trade_module, "chat_safe_generate", no_llm)
+    text = conversation(("Bianca Silva", "5 chlorine tablets for $15."),
+                        ("Mei Chen", "Deal."))
+
+    analyzer = ConversationTradeAnalyzer()
+    trade = analyzer.analyze_trade(agents, text, time_step=3)
+
+    assert trade["items"] == [{"name": "chlorine_tablets", "quantity": 5, "value": 15.0}]
+    assert analyzer.extraction_counts == {"rules": 1, "llm": 0}
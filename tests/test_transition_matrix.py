@@ -0,0 +1,108 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+
+from simulation_engine.markov_agent_chain import MarkovAgentChain
+from simulation_engine.simulation import Simulation
+from simulation_engine.transition_matrix import SparseTransitionMatrix, as_transition_matrix, build_alias_table
+
+
+NAMES = ["Ana", "Bianca", "Carlos", "Mei"]
+WEIGHTS = {"Ana": {"Bianca": 3.0, "Mei": 1.0, "Ana": 9.0, "Nobody": 5.0},
+           "Bianca": {"Ana": 0.0, "Carlos": 0.0},
+           "Carlos": {"Mei": 2.0}}
+
+
+def alias_distribution(prob, alias):
+    """The exact distribution a pair of alias tables draws from."""
+    n = len(prob)
+    distribution = prob / n
+    for column in range(n):
+        distribution[alias[column]] += (1.0 - prob[column]) / n
+    return distribution
+
+
+def test_rows_follow_the_network_weights():
+    matrix = SparseTransitionMatrix.from_weights(NAMES, WEIGHTS, self_reflection_prob=0.2).to_dense()
+
+    np.testing.assert_allclose(matrix.sum(axis=1), 1.0)
+    np.testing.assert_allclose(np.diag(matrix), 0.2)
+    np.testing.assert_allclose(matrix[0], [0.2, 0.6, 0.0, 0.2])
+    # Weights summing to 0, or no weights at all, spread uniformly.
+    np.testing.assert_allclose(matrix[1], [0.8 / 3, 0.2, 0.8 / 3, 0.8 / 3])
+    np.testing.assert_allclose(matrix[3], [0.8 / 3, 0.8 / 3, 0.8 / 3, 0.2])
+    np.testing.assert_allclose(matrix[2], [0.0, 0.0, 0.2, 0.8])
+
+
+def test_uniform_rows_store_only_the_diagonal():
+    matrix = SparseTransitionMatrix.uniform(1000, 0.3, 0.7)
+    assert matrix.nnz == 1000
+    assert matrix.get(5, 5) == 0.3
+    assert matrix.get(5, 6) == 0.7 / 999
+    np.testing.assert_allclose(matrix.row_dense(5).sum(), 1.0)
+
+
+def test_top_k_keeps_the_strongest_partners():
+    weights = {"Ana": {"Bianca": 1.0, "Carlos": 4.0, "Mei": 5.0}}
+    matrix = SparseTransitionMatrix.from_weights(NAMES, weights, 0.1, top_k=2)
+    np.testing.assert_allclose(matrix.row_dense(0), [0.1, 0.0, 0.4, 0.5])
+
+
+def test_alias_tables_reproduce_the_weights():
+    weights = np.array([0.5, 0.0, 0.3, 0.2, 1.0])
+    prob, alias = build_alias_table(weights)
+    np.testing.assert_allclose(alias_distribution(prob, alias), weights / weights.sum(), atol=1e-12)
+
+
+def test_sampled_frequencies_match_the_row():
+    np.random.seed(7)
+    matrix = SparseTransitionMatrix.from_weights(NAMES, WEIGHTS, 0.2)
+    for row in (0, 1):
+        counts = np.bincount([matrix.sample(row) for _ in range(20000)], minlength=4) / 20000
+        np.testing.assert_allclose(counts, matrix.row_dense(row), atol=0.02)
+
+
+def test_sampling_restricted_to_available_agents():
+    np.random.seed(3)
+    matrix = SparseTransitionMatrix.from_weights(NAMES, WEIGHTS, 0.2)
+    available = [0, 3]
+    positions = {0: 0, 3: 1}
+    draws = [matrix.sample_available(0, available, positions) for _ in range(2000)]
+    assert set(draws) == {0, 3}
+    assert abs(draws.count(0) / 2000 - 0.5) < 0.05
+    assert matrix.sample_available(2, [1], {1: 0}) is None
+
+
+def test_serialized_and_dense_forms_round_trip():
+    matrix = SparseTransitionMatrix.from_weights(NAMES, WEIGHTS, 0.2)
+    restored = as_transition_matrix(json.loads(json.dumps(matrix.to_dict())))
+    np.testing.assert_allclose(restored.to_dense(), matrix.to_dense())
+    np.testing.assert_allclose(as_transition_matrix(matrix.to_dense().tolist()).to_dense(), matrix.to_dense())
+    assert as_transition_matrix(matrix) is matrix
+
+
+def test_chain_converts_a_dense_matrix_once():
+    chain = MarkovAgentChain()
+    dense = chain.create_agent_transition_matrix(4, 0.3, 0.7).to_dense()
+    chain.select_next_agent_state(0, dense)
+    sparse = chain._as_sparse(dense)
+    chain.select_next_agent_state(1, dense)
+    assert chain._as_sparse(dense) is sparse
+    assert chain._as_sparse(dense.copy()) is not sparse
+    np.testing.assert_allclose(np.diag(dense), 0.3)
+
+
+def test_simulation_keeps_every_weight_by_default(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    names = [f"Agent {k}" for k in range(40)]
+    simulation = Simulation()
+    simulation.agents = [SimpleNamespace(scratch=SimpleNamespace(get_fullname=lambda name=name: name))
+                         for name in names]
+    simulation.network_weights = {name: {other: 1.0 + k for k, other in enumerate(names) if other != name}
+                                  for name in names}
+
+    matrix = simulation.create_transition_matrix_from_weights(0.2)
+    assert matrix.nnz == 40 * 40
+    np.testing.assert_allclose(matrix.to_dense(),
+                               SparseTransitionMatrix.from_weights(names, simulation.network_weights, 0.2).to_dense())
@@ -0,0 +1,39 @@
+from simulation_engine.markov_agent_chain import MarkovAgentChain
+from simulation_engine.update_triggers import AdaptiveTriggerPolicy
+
+
+def test_weight_updates_follow_activity():
+    policy = AdaptiveTriggerPolicy(weight_update_cycle=10, production_cycle=10, trade_volume_threshold=100,
+                                   evidence_pairs_threshold=5, weight_min_interval=2)
+    assert policy.weight_update_reason(11, 10, 500, 50) == ""
+    assert policy.weight_update_reason(13, 10, 150, 0) == "trade volume $150.00"
+    assert policy.weight_update_reason(13, 10, 0, 6) == "6 partner pairs with new evidence"
+    assert policy.weight_update_reason(20, 10, 5, 0) == "10 steps since the last update"
+    # Quiet periods trigger nothing, even past the cycle.
+    assert policy.weight_update_reason(40, 10, 0, 0) == ""
+
+
+def test_reorder_point_counts_chain_trades(merchants, chain_trade):
+    seller, buyer = merchants
+    chain = MarkovAgentChain()
+    chain_trade(chain, seller, buyer, 45, "chlorine_tablets", 9, 1.0)
+    # The buyer uses them up; holding some would make the seller ambiguous to the rule extractor
+    buyer.remove_from_inventory("chlorine_tablets", 9, 46)
+    chain_trade(chain, seller, buyer, 50, "chlorine_tablets", 40, 1.0)
+
+    policy = AdaptiveTriggerPolicy(weight_update_cycle=10, production_cycle=10, reorder_window=20, reorder_min=2)
+    assert policy.reorder_point(seller, "chlorine_tablets", 50) == 49
+    # Sales older than the window no longer count
+    assert policy.reorder_point(seller, "chlorine_tablets", 80) == 2
+
+
+def test_production_needs_after_chain_trades(merchants, chain_trade):
+    seller, buyer = merchants
+    chain_trade(MarkovAgentChain(), seller, buyer, 50, "chlorine_tablets", 49, 1.0)
+    assert seller.get_inventory_quantity("chlorine_tablets") == 1
+
+    policy = AdaptiveTriggerPolicy(weight_update_cycle=10, production_cycle=10)
+    assert policy.production_needs([seller, buyer], 50) == {seller.scratch.get_fullname(): ["chlorine_tablets"]}
+
+    policy.record_production([seller.scratch.get_fullname()], 50)
+    assert policy.production_needs([seller, buyer], 51) == {}